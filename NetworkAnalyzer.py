@@ -1,18 +1,42 @@
-from flask import Flask, render_template_string, request, jsonify
-import anthropic
-import os
+from flask import Flask, Response, request, jsonify, stream_with_context
 from dotenv import load_dotenv
+import os
+from address_batch import validate_lines
+from address_validator import describe, extract_candidates, validate
+from compression_middleware import CompressionMiddleware
+from llm_gateway import GatewayBusy, gateway
+from model_router import router
+from serving import serve
+from template_registry import TemplateRegistry
 
-# Load environment variables from .env file
+# Load environment variables from .env file (the shared gateway reads ANTHROPIC_API_KEY)
 load_dotenv()
 
-# Get API key from environment variable
-client = anthropic.Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
+AGENT_NAME = "network_analyzer"
+
+# Verdicts are computed locally; set VALIDATOR_LLM_EXPLAIN=1 to have Claude add its study-buddy prose on top
+EXPLAIN_WITH_LLM = os.environ.get('VALIDATOR_LLM_EXPLAIN', '0') == '1'
+# Upper bound on rows per /validate/batch request
+BATCH_MAX_ROWS = int(os.environ.get('VALIDATE_BATCH_MAX_ROWS', 1000000))
 
 app = Flask(__name__)
+templates = TemplateRegistry(app)
+app.wsgi_app = CompressionMiddleware(app.wsgi_app, AGENT_NAME)
 
-def network_address_validator(message):
-    """NetworkValidator 2.0 - Your comprehensive network address study buddy"""
+def network_address_validator(message, explain=None):
+    """NetworkValidator 2.0 - Your comprehensive network address study buddy
+    
+    Returns (reply_text, verdicts). Addresses in the message are validated
+    locally; Claude is only asked when explain is on or the message holds no
+    address at all (a general question).
+    """
+    verdicts = [validate(candidate) for candidate in extract_candidates(message)]
+    local_reply = '\n\n'.join(describe(verdict) for verdict in verdicts)
+    if explain is None:
+        explain = EXPLAIN_WITH_LLM
+    if verdicts and not explain:
+        return local_reply, verdicts
+    
     system_prompt = """
     PERSONA: You are NetworkValidator, an enthusiastic network student who helps classmates validate and understand network addresses.
     
@@ -39,15 +63,29 @@ def network_address_validator(message):
     - Use examples to illustrate correct formats
     """
     
-    response = client.messages.create(
-        model="claude-3-5-haiku-20241022",
-        max_tokens=1000,
-        system=system_prompt,
-        messages=[
-            {"role": "user", "content": message}
-        ]
-    )
-    return response.content[0].text
+    content = message
+    if verdicts:
+        content += "\n\nLOCAL VALIDATION RESULTS (authoritative - explain them, do not contradict them):\n" + local_reply
+    
+    route = router.route(AGENT_NAME, 'chat')
+    try:
+        response = gateway.create(
+            AGENT_NAME,
+            route=route.name,
+            model=route.model,
+            max_tokens=1000,
+            system=system_prompt,
+            messages=[
+                {"role": "user", "content": content}
+            ]
+        )
+    except GatewayBusy:
+        if verdicts:
+            return local_reply, verdicts  # The verdict doesn't need Claude
+        raise
+    if verdicts:
+        return local_reply + '\n\n' + response.content[0].text, verdicts
+    return response.content[0].text, verdicts
 
 # HTML template for the web interface
 HTML_TEMPLATE = """
@@ -324,18 +362,20 @@ HTML_TEMPLATE = """
             document.getElementById('user-input').focus();
         }
 
-        function updateStats(message) {
-            // Simple heuristic to categorize the message
-            if (message.includes(':') && (message.includes('::') || message.split(':').length > 4)) {
-                ipv6Count++;
-                document.getElementById('ipv6-count').textContent = ipv6Count;
-            } else if (message.includes('.') && message.split('.').length === 4) {
-                ipv4Count++;
-                document.getElementById('ipv4-count').textContent = ipv4Count;
-            } else if (message.includes(':') || message.includes('-')) {
-                macCount++;
-                document.getElementById('mac-count').textContent = macCount;
-            }
+        function updateStats(verdicts) {
+            // The server classifies each address it found in the message
+            verdicts.forEach(function(verdict) {
+                if (verdict.kind === 'ipv6') {
+                    ipv6Count++;
+                    document.getElementById('ipv6-count').textContent = ipv6Count;
+                } else if (verdict.kind === 'ipv4') {
+                    ipv4Count++;
+                    document.getElementById('ipv4-count').textContent = ipv4Count;
+                } else if (verdict.kind === 'mac') {
+                    macCount++;
+                    document.getElementById('mac-count').textContent = macCount;
+                }
+            });
         }
 
         function addMessage(message, isUser) {
@@ -347,7 +387,6 @@ HTML_TEMPLATE = """
             
             if (isUser) {
                 messageDiv.innerHTML = '<strong>You [' + timestamp + ']:</strong> ' + message;
-                updateStats(message);
             } else {
                 messageDiv.innerHTML = '<strong>NetworkValidator [' + timestamp + ']:</strong> ' + message.replace(/\\n/g, '<br>');
             }
@@ -372,7 +411,7 @@ HTML_TEMPLATE = """
             document.getElementById('send-btn').disabled = true;
             
             try {
-                const response = await fetch('/chat', {
+                const response = await fetch('chat', {
                     method: 'POST',
                     headers: {
                         'Content-Type': 'application/json',
@@ -386,6 +425,7 @@ HTML_TEMPLATE = """
                     addMessage('Error: ' + data.error, false);
                 } else {
                     addMessage(data.response, false);
+                    updateStats(data.verdicts || []);
                 }
                 
             } catch (error) {
@@ -404,9 +444,11 @@ HTML_TEMPLATE = """
 </html>
 """
 
+templates.page('index', HTML_TEMPLATE)
+
 @app.route('/')
 def home():
-    return render_template_string(HTML_TEMPLATE)
+    return templates.serve('index', request)
 
 @app.route('/chat', methods=['POST'])
 def chat():
@@ -418,17 +460,47 @@ def chat():
             return jsonify({'error': 'No message provided'})
         
         # Get response from the bot
-        bot_response = network_address_validator(message)
+        bot_response, verdicts = network_address_validator(message, data.get('explain'))
         
-        return jsonify({'response': bot_response})
+        return jsonify({'response': bot_response, 'verdicts': [verdict._asdict() for verdict in verdicts]})
         
+    except GatewayBusy as e:
+        return jsonify({'error': str(e)}), 503
     except Exception as e:
         return jsonify({'error': str(e)})
 
+@app.route('/validate', methods=['POST'])
+def validate_address():
+    """Structured verdict for one address - local only, no Claude call"""
+    address = (request.get_json() or {}).get('address', '')
+    if not address:
+        return jsonify({'error': 'No address provided'}), 400
+    return jsonify(validate(address)._asdict())
+
+@app.route('/validate/batch', methods=['POST'])
+def validate_batch():
+    """Validate a worksheet of addresses, streaming one JSON result per row (NDJSON)
+    
+    Accepts {"addresses": [...]}, an uploaded file (form field "file") or a
+    plain-text body with one address per line. The body is read in full
+    before results stream back - most HTTP clients (browsers included) don't
+    read the response until they have finished sending, so answering mid-upload
+    can deadlock once the socket buffers fill.
+    """
+    if request.is_json:
+        lines = (request.get_json() or {}).get('addresses', [])
+    elif 'file' in request.files:
+        lines = request.files['file'].read().splitlines()
+    else:
+        lines = request.get_data().splitlines()
+    
+    return Response(stream_with_context(validate_lines(lines, max_rows=BATCH_MAX_ROWS)),
+                    mimetype='application/x-ndjson')
+
 if __name__ == '__main__':
     print("🚀 Starting NetworkValidator Web Interface...")
     print("🌐 Validates MAC, IPv4, and IPv6 addresses")
     print("🔍 Open your browser and go to: http://localhost:5000")
-    app.run(debug=True, host='0.0.0.0', port=5001)
+    serve(app, host='0.0.0.0', port=5001, debug=True)
 
 
@@ -119,9 +119,13 @@ else:
     print("  Agent 4: http://localhost:5004")
 
 # Create and run the menu server
-from flask import Flask, render_template_string
+from flask import Flask, request
+from compression_middleware import CompressionMiddleware
+from template_registry import TemplateRegistry
 
 app = Flask(__name__)
+templates = TemplateRegistry(app)
+app.wsgi_app = CompressionMiddleware(app.wsgi_app, 'launcher')
 
 MENU_HTML = """
 <!DOCTYPE html>
@@ -249,9 +253,11 @@ MENU_HTML = """
 </html>
 """
 
+templates.page('menu', MENU_HTML)
+
 @app.route('/')
 def home():
-    return render_template_string(MENU_HTML)
+    return templates.serve('menu', request)
 
 # Open browser after a delay
 def open_browser():
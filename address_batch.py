@@ -0,0 +1,168 @@
+"""
+Address Batch - Validate a whole worksheet of MAC / IPv4 / IPv6 addresses at once
+
+Addresses are packed into a fixed-width byte matrix (one row per address) and
+checked with NumPy column operations across all rows together: character
+class masks, separator positions, octet values accumulated column by column
+and hex-group run lengths. Only rows that fail (or are unusual, like an IPv6
+address with an IPv4 tail) go through address_validator.validate() one by
+one, which also supplies the reason shown to the student.
+
+NumPy is optional - without it every row uses validate(). Results are always
+the same either way.
+"""
+
+import json
+
+from address_validator import KIND_NAMES, validate
+
+try:
+    import numpy as np
+except ImportError:  # Optional: fall back to the scalar validator
+    np = None
+
+# Longest valid form is an IPv6 address with an IPv4 tail (45 characters)
+ROW_WIDTH = 48
+CHUNK_ROWS = 8192
+
+VALID_REASONS = {kind: f'valid {name}' for kind, name in KIND_NAMES.items()}
+
+
+def classify_valid(addresses):
+    """Kind ('mac', 'ipv4', 'ipv6') of each address that is valid, else None
+
+    Vectorized when NumPy is available; None rows still need validate() for
+    their kind and reason.
+    """
+    if np is None:
+        return [None] * len(addresses)
+
+    encoded = [address.encode('ascii', 'replace') for address in addresses]
+    rows = np.array(encoded, dtype=f'S{ROW_WIDTH}').view(np.uint8).reshape(len(encoded), ROW_WIDTH)
+    rows = np.hstack([rows, np.zeros((len(encoded), 1), dtype=np.uint8)])  # Always a terminating pad column
+    lengths = np.fromiter((len(e) for e in encoded), dtype=np.int32, count=len(encoded))
+    fits = lengths <= ROW_WIDTH
+
+    digit = (rows >= 48) & (rows <= 57)
+    hexdigit = digit | (((rows | 0x20) >= 97) & ((rows | 0x20) <= 102))
+    colon, dot, hyphen, pad = rows == 58, rows == 46, rows == 45, rows == 0
+
+    kinds = np.zeros(len(encoded), dtype=np.uint8)  # 0 unknown, 1 mac, 2 ipv4, 3 ipv6
+    kinds[fits & ipv4_rows(rows, digit, dot, pad)] = 2
+    kinds[fits & mac_rows(lengths, hexdigit, colon, dot, hyphen)] = 1
+    kinds[fits & ~dot.any(axis=1) & ipv6_rows(lengths, hexdigit, colon, pad)] = 3
+
+    names = (None, 'mac', 'ipv4', 'ipv6')
+    return [names[kind] for kind in kinds.tolist()]
+
+
+def ipv4_rows(rows, digit, dot, pad):
+    """Four dot-separated runs of 1-3 digits, each 0-255"""
+    ok = (digit | dot | pad).all(axis=1) & (dot.sum(axis=1) == 3) & ~pad[:, 0]
+    value = np.zeros(len(rows), dtype=np.int32)
+    run = np.zeros(len(rows), dtype=np.int32)
+    ended = np.zeros(len(rows), dtype=bool)
+    for column in range(rows.shape[1]):
+        is_digit = digit[:, column]
+        value = np.where(is_digit, value * 10 + (rows[:, column].astype(np.int32) - 48), value)
+        run = run + is_digit
+        # An octet ends at a dot, or at the first pad byte
+        boundary = dot[:, column] | (pad[:, column] & ~ended)
+        ok &= ~boundary | ((run >= 1) & (run <= 3) & (value <= 255))
+        value = np.where(boundary, 0, value)
+        run = np.where(boundary, 0, run)
+        ended |= pad[:, column]
+    return ok
+
+
+def mac_rows(lengths, hexdigit, colon, dot, hyphen):
+    """00:1A:2B:3C:4D:5E, 00-1A-2B-3C-4D-5E or 001A.2B3C.4D5E"""
+    pairs = [c for c in range(17) if c % 3 != 2]
+    pair_separators = [c for c in range(17) if c % 3 == 2]
+    pairs_ok = (lengths == 17) & hexdigit[:, pairs].all(axis=1)
+    colon_form = pairs_ok & colon[:, pair_separators].all(axis=1)
+    hyphen_form = pairs_ok & hyphen[:, pair_separators].all(axis=1)
+
+    quads = [c for c in range(14) if c not in (4, 9)]
+    dot_form = (lengths == 14) & hexdigit[:, quads].all(axis=1) & dot[:, [4, 9]].all(axis=1)
+    return colon_form | hyphen_form | dot_form
+
+
+def ipv6_rows(lengths, hexdigit, colon, pad):
+    """Hex groups of 1-4 digits: 8 of them, or 7 or fewer around a single '::'"""
+    ok = (hexdigit | colon | pad).all(axis=1) & (lengths >= 2) & colon.any(axis=1)
+
+    double = colon[:, :-1] & colon[:, 1:]
+    doubles = double.sum(axis=1)
+    ok &= doubles <= 1  # Also rules out ':::'
+
+    # A lone ':' may not start or end the address
+    index = np.arange(len(lengths))
+    last = np.clip(lengths - 1, 0, ROW_WIDTH - 1)
+    ok &= ~(colon[:, 0] & ~colon[:, 1])
+    ok &= ~(colon[index, last] & ~colon[index, np.maximum(last - 1, 0)])
+
+    run = np.zeros(len(lengths), dtype=np.int32)
+    longest = np.zeros(len(lengths), dtype=np.int32)
+    groups = np.zeros(len(lengths), dtype=np.int32)
+    for column in range(hexdigit.shape[1]):
+        is_hex = hexdigit[:, column]
+        groups += is_hex & (run == 0)
+        run = np.where(is_hex, run + 1, 0)
+        longest = np.maximum(longest, run)
+    ok &= longest <= 4
+    ok &= np.where(doubles == 1, groups <= 7, groups == 8)
+    return ok
+
+
+def row_result(row, address, kind):
+    """(NDJSON line, kind if valid else None) for one address"""
+    if kind is not None:
+        # Valid addresses are hex digits and separators only - no escaping needed
+        return f'{{"row": {row}, "input": "{address}", "kind": "{kind}", "valid": true, "reason": "{VALID_REASONS[kind]}"}}\n', kind
+    verdict = validate(address)
+    line = json.dumps({'row': row, 'input': address, 'kind': verdict.kind, 'valid': verdict.valid,
+                       'reason': verdict.reason}) + '\n'
+    return line, verdict.kind if verdict.valid else None
+
+
+def validate_lines(lines, max_rows=None):
+    """NDJSON results for an iterable of addresses, yielded a chunk of rows at a time
+
+    Blank lines are skipped; rows keep their 1-based line numbers. The last
+    line is {"summary": {...}} with the totals.
+    """
+    summary = {'rows': 0, 'valid': 0, 'invalid': 0, 'mac': 0, 'ipv4': 0, 'ipv6': 0,
+               'vectorized': np is not None, 'truncated': False}
+    chunk = []
+
+    def flush():
+        kinds = classify_valid([address for _, address in chunk])
+        out = []
+        for (row, address), kind in zip(chunk, kinds):
+            line, kind = row_result(row, address, kind)
+            if kind is not None:
+                summary['valid'] += 1
+                summary[kind] += 1
+            else:
+                summary['invalid'] += 1
+            out.append(line)
+        chunk.clear()
+        return ''.join(out)
+
+    for row, line in enumerate(lines, 1):
+        if isinstance(line, bytes):
+            line = line.decode('utf-8', 'replace')
+        address = line.strip()
+        if not address:
+            continue
+        if max_rows and summary['rows'] >= max_rows:
+            summary['truncated'] = True
+            break
+        summary['rows'] += 1
+        chunk.append((row, address))
+        if len(chunk) >= CHUNK_ROWS:
+            yield flush()
+    if chunk:
+        yield flush()
+    yield json.dumps({'summary': summary}) + '\n'
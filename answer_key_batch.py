@@ -0,0 +1,220 @@
+"""
+Answer Key Batch - Vectorized subnetting answer keys for whole problem sets
+
+The same answers subnet_engine.SubnetPlan gives for one problem, computed for
+arrays of (network address, subnets needed, hosts needed) at once with uint32
+NumPy column operations: classes from first-octet comparisons, borrowed bits
+as an exact integer log2 ceiling (frexp of n - 1), masks and block sizes from
+the precomputed /0-/32 prefix tables, and the nth subnet's ID and broadcast
+as block offsets from the network address.
+
+Rows that SubnetPlan would reject (class D/E, a negative subnet count, too
+many subnets, hosts that don't fit) get valid=False and zeros; 0 subnets
+needed is one subnet, as in SubnetPlan. Results are one array per column,
+saved with write_columns() as a .npz file (np.load gives the columns back).
+
+    python answer_key_batch.py generate 1000000 -o keys.npz
+    python answer_key_batch.py verify keys.npz
+
+Requires NumPy (pip install numpy).
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from subnet_engine import (DEFAULT_PREFIX, ORDINAL_PATTERN, PREFIX_MASKS, PREFIX_SIZES, SubnetPlan,
+                           int_to_ip, ip_to_int, mask_answer_key)
+
+CLASS_LETTERS = np.array(list('ABCDE'))
+CLASS_DEFAULT_PREFIX = np.array([DEFAULT_PREFIX.get(letter, 0) for letter in 'ABCDE'], dtype=np.uint8)
+MASK_TABLE = np.array(PREFIX_MASKS, dtype=np.uint32)
+SIZE_TABLE = np.array(PREFIX_SIZES, dtype=np.uint64)  # 2**32 does not fit a uint32
+
+
+def to_uint32(addresses):
+    """Dotted quads (or integers) -> uint32 array"""
+    addresses = np.asarray(addresses)
+    if addresses.dtype.kind in 'iu':
+        return addresses.astype(np.uint32)
+    return np.fromiter((ip_to_int(str(address)) for address in addresses), dtype=np.uint32, count=len(addresses))
+
+
+def log2_ceil(values):
+    """Smallest b with 2**b >= value, exactly (values up to 2**53)"""
+    _, exponent = np.frexp(np.maximum(values.astype(np.int64) - 1, 0).astype(np.float64))
+    return exponent.astype(np.uint8)
+
+
+def answer_columns(networks, subnets_needed, hosts_needed=None, subnet_numbers=None):
+    """{column: array} answer keys for every problem
+
+    hosts_needed may be None (no host check) or use 0 for "not given".
+    subnet_numbers is an optional (problems x k) array of 1-based subnet
+    numbers to compute subnet_id / broadcast columns for.
+    """
+    network = to_uint32(networks)
+    subnets = np.asarray(subnets_needed, dtype=np.int64)
+    hosts = np.zeros(len(network), dtype=np.int64) if hosts_needed is None else np.asarray(hosts_needed, dtype=np.int64)
+
+    first_octet = network >> 24
+    class_index = ((first_octet >= 128).astype(np.uint8) + (first_octet >= 192) + (first_octet >= 224)
+                   + (first_octet >= 240))
+    default_prefix = CLASS_DEFAULT_PREFIX[class_index]
+    borrowed = log2_ceil(subnets)
+    prefix = default_prefix.astype(np.int64) + borrowed
+    host_bits = 32 - prefix
+
+    valid = (class_index < 3) & (subnets >= 0) & (host_bits >= 2)
+    table_prefix = np.where(valid, prefix, 32)  # Safe table index for rejected rows
+    total = SIZE_TABLE[table_prefix]
+    valid &= (hosts <= 0) | (total - 2 >= hosts.astype(np.uint64))
+
+    prefix = np.where(valid, prefix, 0).astype(np.uint8)
+    total = np.where(valid, total, 0).astype(np.uint32)
+    # The octet where the subnet/host boundary falls, and the block size in it
+    interesting = np.where(prefix % 8 != 0, np.minimum(3, prefix // 8), np.maximum(1, prefix // 8) - 1).astype(np.uint8)
+    block = np.maximum(total >> (8 * (3 - interesting.astype(np.uint32))), 1).astype(np.uint32)
+
+    columns = {
+        'network': network,
+        'subnets_needed': subnets.astype(np.uint32),
+        'hosts_needed': np.maximum(hosts, 0).astype(np.uint32),
+        'valid': valid,
+        'class': np.where(valid, class_index, 255).astype(np.uint8),
+        'default_mask': np.where(valid, MASK_TABLE[default_prefix], 0).astype(np.uint32),
+        'borrowed_bits': np.where(valid, borrowed, 0).astype(np.uint8),
+        'host_bits': np.where(valid, host_bits, 0).astype(np.uint8),
+        'subnet_count': np.where(valid, np.left_shift(np.uint32(1), borrowed.astype(np.uint32)), 0).astype(np.uint32),
+        'total_addresses': total,
+        'usable_addresses': np.where(valid, total - np.uint32(2), 0).astype(np.uint32),
+        'custom_mask': np.where(valid, MASK_TABLE[prefix], 0).astype(np.uint32),
+        'prefix': prefix,
+        'default_prefix': np.where(valid, default_prefix, 0).astype(np.uint8),
+        'interesting_octet': interesting,
+        'block_size': np.where(valid, block, 0).astype(np.uint32)
+    }
+
+    if subnet_numbers is not None:
+        numbers = np.asarray(subnet_numbers, dtype=np.int64).reshape(len(network), -1)
+        in_range = valid[:, None] & (numbers >= 1) & (numbers <= columns['subnet_count'][:, None])
+        offsets = (np.maximum(numbers, 1) - 1).astype(np.uint64) * total[:, None]
+        subnet_id = (network[:, None].astype(np.uint64) + offsets).astype(np.uint32)
+        columns['subnet_numbers'] = numbers.astype(np.uint32)
+        columns['subnet_id'] = np.where(in_range, subnet_id, 0).astype(np.uint32)
+        columns['broadcast'] = np.where(in_range, subnet_id + total[:, None] - np.uint32(1), 0).astype(np.uint32)
+        columns['subnet_valid'] = in_range
+    return columns
+
+
+def from_problems(problems):
+    """answer_columns() for a PROBLEMS dict (either worksheet); subnet numbers come from its q9-q12 questions"""
+    rows = list(problems.values())
+    numbers = None
+    if all('questions' in problem for problem in rows):
+        numbers = [[int(ORDINAL_PATTERN.search(problem['questions'][f'q{q}']).group(1)) for q in range(9, 13)]
+                   for problem in rows]
+    return answer_columns([problem['network_address'] for problem in rows],
+                          [problem['subnets_needed'] for problem in rows],
+                          [problem.get('hosts_needed') or 0 for problem in rows], numbers)
+
+
+def row_answers(columns, i):
+    """Worksheet-style strings (mask_answer_key layout plus nth subnets) for one row, or None if invalid"""
+    if not columns['valid'][i]:
+        return None
+    plan = SubnetPlan(int_to_ip(int(columns['network'][i])), int(columns['subnets_needed'][i]))
+    answers = {
+        'part1': str(CLASS_LETTERS[columns['class'][i]]),
+        'part2': int_to_ip(int(columns['default_mask'][i])),
+        'part3': str(columns['borrowed_bits'][i]),
+        'part4': str(columns['host_bits'][i]),
+        'part5': str(columns['subnet_count'][i]),
+        'part6': str(columns['total_addresses'][i]),
+        'part7': str(columns['usable_addresses'][i]),
+        'part8': int_to_ip(int(columns['custom_mask'][i])),
+        'part9': str(columns['prefix'][i]),
+        'part10': plan.address_map()  # A string pattern - built per row on demand
+    }
+    if 'subnet_id' in columns:
+        answers['subnets'] = [{'n': int(n), 'subnet_id': int_to_ip(int(subnet_id)), 'broadcast': int_to_ip(int(broadcast)),
+                               'usable_range': f"{int_to_ip(int(subnet_id) + 1)} to {int_to_ip(int(broadcast) - 1)}"}
+                              for n, subnet_id, broadcast, ok in zip(columns['subnet_numbers'][i], columns['subnet_id'][i],
+                                                                     columns['broadcast'][i], columns['subnet_valid'][i]) if ok]
+    return answers
+
+
+def write_columns(path, columns, compress=False):
+    """Save the columns as one .npz file (np.load(path) maps names back to arrays)"""
+    (np.savez_compressed if compress else np.savez)(path, **columns)
+
+
+def random_problems(count, seed=0):
+    """(networks, subnets_needed, hosts_needed, subnet_numbers) for `count` random classful problems"""
+    rng = np.random.default_rng(seed)
+    class_index = rng.integers(0, 3, count)
+    first = np.choose(class_index, [rng.integers(1, 127, count), rng.integers(128, 192, count), rng.integers(192, 224, count)])
+    default_prefix = CLASS_DEFAULT_PREFIX[class_index].astype(np.int64)
+    network = ((first.astype(np.uint32) << 24) | rng.integers(0, 1 << 24, count, dtype=np.uint32)) & MASK_TABLE[default_prefix]
+
+    borrowed = rng.integers(1, 30 - default_prefix + 1)  # Always leaves >= 2 host bits
+    subnets = rng.integers(np.left_shift(1, borrowed - 1) + 1, np.left_shift(1, borrowed) + 1)
+    usable = SIZE_TABLE[default_prefix + borrowed].astype(np.int64) - 2
+    hosts = rng.integers(1, usable + 1)
+    numbers = rng.integers(1, np.left_shift(1, borrowed)[:, None] + 1, (count, 4))
+    return network, subnets, hosts, numbers
+
+
+def verify(columns, sample=1000, seed=0):
+    """Row indexes in a random sample whose answers differ from the scalar subnet engine"""
+    rng = np.random.default_rng(seed)
+    rows = len(columns['network'])
+    mismatched = []
+    for i in rng.choice(rows, size=min(sample, rows), replace=False).tolist():
+        problem = {'network_address': int_to_ip(int(columns['network'][i])),
+                   'subnets_needed': int(columns['subnets_needed'][i]),
+                   'hosts_needed': int(columns['hosts_needed'][i]) or None}
+        try:
+            expected = mask_answer_key(problem)
+            plan = SubnetPlan(problem['network_address'], problem['subnets_needed'], problem['hosts_needed'])
+        except ValueError:
+            expected = None
+        answers = row_answers(columns, i)
+        if expected is None or answers is None:
+            if expected is not answers:
+                mismatched.append(i)
+            continue
+        subnets = answers.pop('subnets', [])
+        if answers != expected or any(s['subnet_id'] != int_to_ip(plan.subnet_id(s['n']))
+                                      or s['broadcast'] != int_to_ip(plan.broadcast(s['n'])) for s in subnets):
+            mismatched.append(i)
+    return mismatched
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Bulk subnetting answer keys")
+    commands = parser.add_subparsers(dest='command', required=True)
+    generate = commands.add_parser('generate', help="Generate random problems and their answer keys")
+    generate.add_argument('count', type=int)
+    generate.add_argument('-o', '--output', default='answer_keys.npz')
+    generate.add_argument('--seed', type=int, default=0)
+    generate.add_argument('--compress', action='store_true')
+    check = commands.add_parser('verify', help="Spot-check a saved answer key file against the scalar engine")
+    check.add_argument('path')
+    check.add_argument('--sample', type=int, default=1000)
+    args = parser.parse_args()
+
+    if args.command == 'generate':
+        problems = random_problems(args.count, args.seed)
+        started = time.perf_counter()
+        columns = answer_columns(*problems)
+        elapsed = time.perf_counter() - started
+        write_columns(args.output, columns, args.compress)
+        print(f"{args.count} answer keys in {elapsed:.2f} s ({args.count / max(elapsed, 1e-9):,.0f}/s) -> {args.output}")
+    else:
+        with np.load(args.path) as saved:
+            columns = {name: saved[name] for name in saved.files}
+        mismatched = verify(columns, args.sample)
+        print(f"{len(mismatched)} mismatches in a sample of {min(args.sample, len(columns['network']))}"
+              + (f" (rows {mismatched[:10]})" if mismatched else ""))
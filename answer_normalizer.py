@@ -0,0 +1,197 @@
+"""
+Answer Normalizer - Parse student answers into canonical typed values
+
+The agents used to compare answers as squashed strings, which both accepted
+wrong answers ("2552552550" == "255.255.255.0", "c" found inside any range)
+and rejected right ones ("Class C", "210.220.3.0 - 210.220.3.63"). Here the
+expected answer is parsed once (compile_answer, cached) into an Answer -
+its kind plus a canonical value - and the student's text is parsed as that
+same kind, so grading is a single tuple comparison:
+
+- ip       dotted quad -> 32-bit int            "255.255.255.0"
+- cidr     (network int, prefix)                "192.168.1.64/26"
+- range    (first int, last int)                "a to b", "a - b", "a through b"
+- class    letter A-E                           "C", "Class C"
+- octets   bitmask of octets 1-4 (any order)    "Second, Third, and Fourth octets"
+- bits     N/s/h pattern, 32 characters         "N.N.N.sssshhhh"
+- binary   value of a 1-8 digit bit string      "00100001", "0010 0001"
+- number   int, alone or with its unit          "4", "4 bits", "62 hosts", "/28"
+- text     casefolded words (anything else)
+"""
+
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+from subnet_engine import ip_to_int
+
+Answer = namedtuple('Answer', ['kind', 'value'])
+
+IP = r'(?<![\d.])(\d{1,3}(?:\.\d{1,3}){3})(?![\d.]*\d)'  # Not part of a longer dotted number
+IP_TOKEN = re.compile(IP)
+CIDR = re.compile(IP + r'\s*/\s*(\d{1,2})\b')
+RANGE_SEPARATOR = r'\s*(?:to|through|thru|-|–|—)\s*'
+RANGE = re.compile(IP + RANGE_SEPARATOR + IP, re.IGNORECASE)
+CLASS_LETTER = re.compile(r'^\s*(?:class\s*)?([a-e])\s*[.!]?\s*$', re.IGNORECASE)
+CLASS_IN_TEXT = re.compile(r'\bclass\s+([a-e])\b', re.IGNORECASE)
+# Other standalone class letters ("Class C or B"); a lowercase "a" is the article
+CLASS_LETTER_TOKEN = re.compile(r'\b([b-eB-E]|A)\b')
+OCTET_WORDS = re.compile(r'\b(first|second|third|fourth|1st|2nd|3rd|4th)\b', re.IGNORECASE)
+OCTET_POSITION = {'first': 1, '1st': 1, 'second': 2, '2nd': 2, 'third': 3, '3rd': 3, 'fourth': 4, '4th': 4}
+# "first three octets", "last two octets" - a count, not positions; not guessed at
+OCTET_COUNT_WORDS = re.compile(r'\b(one|two|three|four|both|all|last)\b', re.IGNORECASE)
+BITS = re.compile(r'^\s*([nsh]+)\.([nsh]+)\.([nsh]+)\.([nsh]+)\s*$', re.IGNORECASE)
+BINARY = re.compile(r'^\s*([01]{1,4}(?:\s?[01]{1,4})?)\s*$')
+# The whole answer is the number, with an optional unit: "4", "4 bits", "62 hosts", "/28", "16,382"
+NUMBER = re.compile(r'^\s*/?(\d{1,3}(?:,\d{3})+|\d+)\s*(?:(?:usable\s+)?(?:bits?|hosts?|subnets?|addresses))?\s*[.!]?\s*$',
+                    re.IGNORECASE)
+WORDS = re.compile(r'[^\W_]+')
+
+
+# ---------------------------------------------------------------- parsers
+# Each returns the canonical value, or None when the text isn't that kind
+
+def parse_ip(text):
+    found = IP_TOKEN.findall(text)
+    if len(found) != 1 or CIDR.search(text) or RANGE.search(text):
+        return None
+    try:
+        return ip_to_int(found[0])
+    except ValueError:
+        return None
+
+
+def parse_cidr(text):
+    found = CIDR.findall(text)
+    if len(found) != 1 or int(found[0][1]) > 32:
+        return None
+    try:
+        return ip_to_int(found[0][0]), int(found[0][1])
+    except ValueError:
+        return None
+
+
+def parse_range(text):
+    found = RANGE.findall(text)
+    if len(found) != 1:
+        return None
+    try:
+        return ip_to_int(found[0][0]), ip_to_int(found[0][1])
+    except ValueError:
+        return None
+
+
+def parse_class(text):
+    match = CLASS_LETTER.match(text)
+    if match:
+        return match.group(1).upper()
+    # "class C or class B" and "Class C or B" are no answer
+    letters = {letter.upper() for letter in CLASS_IN_TEXT.findall(text) + CLASS_LETTER_TOKEN.findall(text)}
+    if not CLASS_IN_TEXT.search(text) or len(letters) != 1:
+        return None
+    return letters.pop()
+
+
+def parse_octets(text):
+    positions = {OCTET_POSITION[word.lower()] for word in OCTET_WORDS.findall(text)}
+    if not positions or 'octet' not in text.lower() or OCTET_COUNT_WORDS.search(text):
+        return None
+    return sum(1 << (position - 1) for position in positions)
+
+
+def parse_bits(text):
+    match = BITS.match(text)
+    if not match:
+        return None
+    pattern = ''
+    for octet in match.groups():
+        octet = octet.lower()
+        if len(octet) == 1:
+            octet *= 8  # N and H stand for a whole octet
+        if len(octet) != 8:
+            return None
+        pattern += octet
+    return pattern
+
+
+def parse_binary(text):
+    match = BINARY.match(text)
+    return int(match.group(1).replace(' ', ''), 2) if match else None
+
+
+def parse_number(text):
+    match = NUMBER.match(text)
+    return int(match.group(1).replace(',', '')) if match else None
+
+
+def parse_text(text):
+    return ' '.join(WORDS.findall(text.casefold())) or None
+
+
+PARSERS = {
+    'ip': parse_ip,
+    'cidr': parse_cidr,
+    'range': parse_range,
+    'class': parse_class,
+    'octets': parse_octets,
+    'bits': parse_bits,
+    'binary': parse_binary,
+    'number': parse_number,
+    'text': parse_text
+}
+
+
+# ---------------------------------------------------------------- answer keys
+
+def answer_kind(correct):
+    """Which kind an answer-key string is"""
+    text = correct.strip()
+    if BITS.match(text):
+        return 'bits'
+    if RANGE.fullmatch(text):
+        return 'range'
+    if CIDR.fullmatch(text):
+        return 'cidr'
+    if IP_TOKEN.fullmatch(text):
+        return 'ip'
+    if CLASS_LETTER.match(text):
+        return 'class'
+    if re.fullmatch(r'[01]{8}', text):
+        return 'binary'
+    if text.isdigit():
+        return 'number'
+    if OCTET_WORDS.search(text) and 'octet' in text.lower():
+        return 'octets'
+    return 'text'
+
+
+@lru_cache(maxsize=4096)
+def compile_answer(correct):
+    """Canonical Answer for an answer-key string (parsed once, then cached)"""
+    kind = answer_kind(correct)
+    return Answer(kind, PARSERS[kind](correct.strip()))
+
+
+def parse_as(kind, text):
+    """The student's text as an Answer of `kind`, or None if it isn't one"""
+    value = PARSERS[kind](str(text))
+    return Answer(kind, value) if value is not None else None
+
+
+def grade(user_answer, correct):
+    """(parsed, is_correct) - parsed is the student's Answer, or None when the text isn't that kind of answer"""
+    expected = compile_answer(correct)
+    parsed = parse_as(expected.kind, user_answer)
+    return parsed, parsed == expected
+
+
+def answers_match(user_answer, correct):
+    return grade(user_answer, correct)[1]
+
+
+def canonical(user_answer, correct):
+    """Stable text for the student's answer (for cache keys): its canonical value, or its casefolded words"""
+    parsed = parse_as(compile_answer(correct).kind, user_answer)
+    if parsed is not None:
+        return f"{parsed.kind}:{parsed.value}"
+    return f"text:{parse_text(str(user_answer)) or ''}"
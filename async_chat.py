@@ -0,0 +1,184 @@
+"""
+Async Chat - ASGI host where the agents' /chat awaits Claude instead of holding a thread
+
+Under a WSGI server every /chat request occupies a worker thread for the whole
+2-15 s Claude round trip, so concurrent conversations are capped by the thread
+count while the CPU idles. This host serves the same apps as unified_host.py
+(same prefixes, menu and session cookies), but POST /agentN/chat runs the
+agent's chat_async() on the event loop: grading and the session are handled
+in a Flask request context as usual, then the Claude call is awaited through
+gateway.acreate(), so a waiting student costs a coroutine, not a thread.
+The JSON in and out is exactly what the WSGI /chat returns.
+
+Every other route (pages, /chat_stream, /stats, ...) runs unchanged on a
+WSGI thread pool (a2wsgi). The gateway still limits upstream concurrency, so
+for hundreds of waiting students raise LLM_MAX_IN_FLIGHT / LLM_MAX_QUEUE.
+
+    pip install uvicorn a2wsgi
+    python async_chat.py [--port 5000]
+    uvicorn async_chat:build_application --factory --port 5000
+    python async_chat.py bench        # concurrent /chat: waitress threads vs this host
+"""
+
+import argparse
+import importlib
+import io
+import os
+import subprocess
+import sys
+
+from a2wsgi import WSGIMiddleware
+
+import unified_host
+
+# Threads for the routes that stay synchronous (page loads, SSE streams, /stats)
+WSGI_THREADS = int(os.environ.get('ASYNC_WSGI_THREADS', 16))
+
+
+async def read_body(receive):
+    body = b''
+    more = True
+    while more:
+        message = await receive()
+        body += message.get('body', b'')
+        more = message.get('more_body', False)
+    return body
+
+
+def request_environ(scope, prefix, body):
+    """WSGI environ for an ASGI request, with the mount prefix as SCRIPT_NAME"""
+    server = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': prefix,
+        'PATH_INFO': scope['path'][len(prefix):],
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': (scope.get('client') or ('', 0))[0],
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False
+    }
+    for name, value in scope['headers']:
+        name = name.decode('latin-1').upper().replace('-', '_')
+        if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            name = 'HTTP_' + name
+        value = value.decode('latin-1')
+        environ[name] = f"{environ[name]},{value}" if name in environ else value
+    return environ
+
+
+async def run_view(app, view, environ):
+    """Flask's request handling (session, error handlers, after_request) around an async view"""
+    with app.request_context(environ):
+        try:
+            try:
+                rv = app.preprocess_request()
+                if rv is None:
+                    rv = await view()
+            except Exception as e:
+                rv = app.handle_user_exception(e)
+            return app.finalize_request(rv)
+        except Exception as e:
+            return app.handle_exception(e)
+
+
+class AsyncChatHost:
+    """ASGI app: the async chat routes on the event loop, everything else on a WSGI thread pool"""
+
+    def __init__(self, wsgi_app, routes, workers=WSGI_THREADS):
+        self.routes = routes  # path -> (Flask app, mount prefix, async view)
+        self.wsgi = WSGIMiddleware(wsgi_app, workers=workers)
+
+    async def __call__(self, scope, receive, send):
+        route = None
+        if scope['type'] == 'http' and scope['method'] == 'POST':
+            route = self.routes.get(scope['path'])
+        if route is None:
+            return await self.wsgi(scope, receive, send)
+
+        app, prefix, view = route
+        environ = request_environ(scope, prefix, await read_body(receive))
+        response = await run_view(app, view, environ)
+        await send({
+            'type': 'http.response.start',
+            'status': response.status_code,
+            'headers': [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                        for name, value in response.headers.to_wsgi_list()]
+        })
+        await send({'type': 'http.response.body', 'body': response.get_data()})
+
+
+def build_application():
+    """unified_host's menu and apps, with every agent's chat_async() at <prefix>/chat"""
+    routes = {}
+    for prefix, module_name, _ in unified_host.MOUNTS:
+        module = importlib.import_module(module_name)
+        if hasattr(module, 'chat_async'):
+            routes[prefix + '/chat'] = (module.app, prefix, module.chat_async)
+    return AsyncChatHost(unified_host.build_application(), routes)
+
+
+# ---------------------------------------------------------------- benchmark
+
+def wrong_answer(n):
+    """An IPv4 Basics /chat body with a distinct wrong answer, so every one goes to Claude"""
+    return {'message': f'{n} wrong', 'attempt': 0,
+            'question': {'question': 'What class is 10.1.2.3?', 'answer': 'A'}}
+
+
+def bench(latency_ms=1000, requests=512, concurrency=256, base_port=5400):
+    """Concurrent /agent1/chat against a fixed-latency fake Claude: waitress threads vs the async host"""
+    from serving import run_load, wait_until_up
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    mock_port = base_port
+    env = dict(os.environ, ANTHROPIC_BASE_URL=f'http://127.0.0.1:{mock_port}', ANTHROPIC_API_KEY='mock',
+               LLM_MAX_IN_FLIGHT=str(concurrency), LLM_MAX_QUEUE=str(concurrency))
+    mock = subprocess.Popen([sys.executable, 'mock_anthropic_server.py', '--port', str(mock_port),
+                             '--latency', f'fixed:{latency_ms}'], cwd=here, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    hosts = [('waitress, 40 threads', ['unified_host.py', '--server', 'waitress', '--threads', '40']),
+             ('waitress, 256 threads', ['unified_host.py', '--server', 'waitress', '--threads', '256']),
+             ('async (uvicorn)', ['async_chat.py'])]
+    print(f"/agent1/chat, fake Claude {latency_ms} ms, {requests} requests from {concurrency} clients\n")
+    print(f"{'host':22} {'req/s':>7} {'p50 ms':>8} {'p95 ms':>8} {'errors':>6}")
+    try:
+        wait_until_up(f'http://127.0.0.1:{mock_port}/mock/stats')
+        for port, (name, command) in enumerate(hosts, base_port + 1):
+            process = subprocess.Popen([sys.executable] + command + ['--host', '127.0.0.1', '--port', str(port)],
+                                       cwd=here, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            try:
+                wait_until_up(f'http://127.0.0.1:{port}/agent1/')
+                throughput, p50, p95, errors = run_load(f'http://127.0.0.1:{port}/agent1/chat', requests, concurrency,
+                                                        wrong_answer, lambda reply: 'mock reply' in reply.get('response', ''))
+                print(f"{name:22} {throughput:7.1f} {p50:8.0f} {p95:8.0f} {errors:6}")
+            finally:
+                process.terminate()
+                process.wait()
+    finally:
+        mock.terminate()
+        mock.wait()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="All tutor apps on one ASGI server, with async /chat")
+    parser.add_argument('command', nargs='?', choices=['serve', 'bench'], default='serve')
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=5000)
+    parser.add_argument('--keepalive', type=int, default=int(os.environ.get('TUTOR_KEEPALIVE', 5)))
+    args = parser.parse_args()
+
+    if args.command == 'bench':
+        bench()
+    else:
+        import uvicorn
+        print(f"Networking Tutor Suite (async chat) on http://{args.host}:{args.port}/")
+        uvicorn.run(build_application(), host=args.host, port=args.port, timeout_keep_alive=args.keepalive,
+                    log_level='warning')
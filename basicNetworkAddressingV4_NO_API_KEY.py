@@ -3,19 +3,33 @@ IPv4 Networking Tutor Agent with Subnetting Matrix
 Matches Canvas Quiz Questions by Number
 """
 
-from flask import Flask, render_template_string, request, jsonify, session
-from anthropic import Anthropic
+from flask import Flask, request, jsonify, session
 import os
 import json
 from datetime import datetime
 import secrets
 import random
+from answer_normalizer import answers_match
+from compression_middleware import CompressionMiddleware
+from hint_cache import make_key
+from hint_prefetch import HintPrefetcher, prefetch_owner, run_off_loop
+from llm_gateway import GatewayBusy, gateway
+from llm_streaming import sse_response
+from model_router import router
+from question_generator import GENERATORS, generate, question_pool
+from serving import serve
+from template_registry import TemplateRegistry
+from tutor_metrics import metrics
 
 app = Flask(__name__)
 app.secret_key = secrets.token_hex(16)
+templates = TemplateRegistry(app)
 
-# Initialize Anthropic client
-client = Anthropic(api_key="APIKEY_HERE")
+AGENT_NAME = "basic_addressing"
+app.wsgi_app = CompressionMiddleware(app.wsgi_app, AGENT_NAME)
+
+# Optional (HINT_PREFETCH=1): generate the next hint level while the student types
+hint_prefetcher = HintPrefetcher(AGENT_NAME)
 
 # Subnetting Matrix Reference
 SUBNETTING_MATRIX = {
@@ -283,6 +297,7 @@ HTML_TEMPLATE = """<!DOCTYPE html>
 
         document.addEventListener('DOMContentLoaded', function() {
             document.getElementById('question-select-btn').addEventListener('click', selectQuestionNumber);
+            document.getElementById('practice-btn').addEventListener('click', newPracticeQuestion);
             document.getElementById('reset-btn').addEventListener('click', resetSession);
             document.getElementById('submit-btn').addEventListener('click', sendMessage);
             document.getElementById('user-input').addEventListener('keypress', function(e) {
@@ -299,13 +314,25 @@ HTML_TEMPLATE = """<!DOCTYPE html>
                 return;
             }
             
-            fetch('/get_question_by_number', {
+            loadQuestion('get_question_by_number', {quiz_type: quizType, question_number: questionNum});
+        }
+
+        function newPracticeQuestion() {
+            loadQuestion('new_question', {quiz_type: document.getElementById('quiz-type').value});
+        }
+
+        function loadQuestion(url, body) {
+            fetch(url, {
                 method: 'POST',
                 headers: {'Content-Type': 'application/json'},
-                body: JSON.stringify({quiz_type: quizType, question_number: questionNum})
+                body: JSON.stringify(body)
             })
             .then(function(r) { return r.json(); })
             .then(function(data) {
+                if (data.error) {
+                    alert('Error: ' + data.error);
+                    return;
+                }
                 currentQuestion = data.question;
                 currentAttempt = 0;
                 conversationHistory = [];
@@ -335,26 +362,44 @@ HTML_TEMPLATE = """<!DOCTYPE html>
             
             addMessage('user', message);
             
-            fetch('/chat', {
-                method: 'POST',
-                headers: {'Content-Type': 'application/json'},
-                body: JSON.stringify({
-                    message: message,
-                    question: currentQuestion,
-                    attempt: currentAttempt
-                })
-            })
-            .then(function(r) { return r.json(); })
-            .then(function(data) {
-                currentAttempt = data.attempt;
-                addMessage('bot', data.response);
-                updateAttemptIndicator();
-                
-                if (data.is_correct || currentAttempt >= 5) {
-                    document.getElementById('submit-btn').textContent = 'New Question';
-                    setTimeout(function() {
-                        document.getElementById('submit-btn').textContent = 'Submit';
-                    }, 3000);
+            var botMessage = null;
+            var botText = '';
+            var isCorrect = false;
+            
+            streamChat('chat_stream', {
+                message: message,
+                question: currentQuestion,
+                attempt: currentAttempt
+            }, {
+                meta: function(data) {
+                    currentAttempt = data.attempt;
+                    isCorrect = data.is_correct;
+                    updateAttemptIndicator();
+                },
+                token: function(data) {
+                    // Render the hint as it arrives instead of waiting for the whole reply
+                    if (!botMessage) {
+                        document.getElementById('loading').style.display = 'none';
+                        botMessage = createMessage('bot');
+                    }
+                    botText += data.text;
+                    botMessage.innerHTML = botText.replace(/\\n/g, '<br>');
+                    var chatContainer = document.getElementById('chat-container');
+                    chatContainer.scrollTop = chatContainer.scrollHeight;
+                },
+                error: function(data) {
+                    addMessage('bot', 'Sorry, error: ' + data.error);
+                },
+                done: function(data) {
+                    conversationHistory.push({role: 'bot', content: botText});
+                    console.log('Time to first token (ms):', data.ttft_ms, 'Total (ms):', data.total_ms);
+                    
+                    if (isCorrect || currentAttempt >= 5) {
+                        document.getElementById('submit-btn').textContent = 'New Question';
+                        setTimeout(function() {
+                            document.getElementById('submit-btn').textContent = 'Submit';
+                        }, 3000);
+                    }
                 }
             })
             .catch(function(err) {
@@ -368,6 +413,56 @@ HTML_TEMPLATE = """<!DOCTYPE html>
             });
         }
 
+        // POST to a Server-Sent Events endpoint and hand each event to handlers[event]
+        function streamChat(url, payload, handlers) {
+            return fetch(url, {
+                method: 'POST',
+                headers: {'Content-Type': 'application/json'},
+                body: JSON.stringify(payload)
+            })
+            .then(function(response) {
+                if (response.status === 503) {
+                    // Busy: refused before any event, so the attempt wasn't counted
+                    return response.json().then(function(data) { handlers.error(data); });
+                }
+                if (!response.ok || !response.body) {
+                    throw new Error('Stream request failed: ' + response.status);
+                }
+                var reader = response.body.getReader();
+                var decoder = new TextDecoder();
+                var buffer = '';
+                
+                function pump() {
+                    return reader.read().then(function(result) {
+                        if (result.done) return;
+                        buffer += decoder.decode(result.value, {stream: true});
+                        var boundary;
+                        while ((boundary = buffer.indexOf('\\n\\n')) !== -1) {
+                            var block = buffer.slice(0, boundary);
+                            buffer = buffer.slice(boundary + 2);
+                            var eventName = 'message';
+                            var eventData = '';
+                            block.split('\\n').forEach(function(line) {
+                                if (line.indexOf('event: ') === 0) eventName = line.slice(7);
+                                else if (line.indexOf('data: ') === 0) eventData += line.slice(6);
+                            });
+                            if (handlers[eventName]) handlers[eventName](JSON.parse(eventData));
+                        }
+                        return pump();
+                    });
+                }
+                return pump();
+            });
+        }
+
+        function createMessage(sender) {
+            var chatContainer = document.getElementById('chat-container');
+            var messageDiv = document.createElement('div');
+            messageDiv.className = 'message ' + sender + '-message';
+            chatContainer.appendChild(messageDiv);
+            return messageDiv;
+        }
+
         function addMessage(sender, text) {
             var chatContainer = document.getElementById('chat-container');
             var messageDiv = document.createElement('div');
@@ -400,7 +495,7 @@ HTML_TEMPLATE = """<!DOCTYPE html>
 
         function resetSession() {
             if (confirm('Reset and start fresh?')) {
-                fetch('/reset', {method: 'POST'})
+                fetch('reset', {method: 'POST'})
                 .then(function() { location.reload(); });
             }
         }
@@ -433,6 +528,7 @@ HTML_TEMPLATE = """<!DOCTYPE html>
             <label for="question-num" style="margin-left: 20px;">Question Number (1-10):</label>
             <input type="text" id="question-num" value="1" maxlength="2" style="width: 60px; padding: 10px; border-radius: 8px; border: 2px solid #667eea; text-align: center;">
             <button id="question-select-btn">Load Question</button>
+            <button id="practice-btn">Practice Question</button>
             <button id="reset-btn">Reset</button>
         </div>
         
@@ -458,7 +554,12 @@ HTML_TEMPLATE = """<!DOCTYPE html>
 </body>
 </html>"""
 
-def get_random_question(quiz_type):
+def get_random_question(quiz_type, seed=None):
+    """A generated practice question (replayable by seed); the Canvas bank stays on get_question_by_number"""
+    if quiz_type in GENERATORS:
+        if seed is not None:
+            return generate(quiz_type, int(seed))
+        return question_pool.take(quiz_type)
     questions = QUIZ_BANK.get(quiz_type, [])
     if questions:
         return random.choice(questions)
@@ -472,9 +573,8 @@ def get_question_by_number(quiz_type, question_number):
     return None
 
 def check_answer(user_answer, correct_answer):
-    user_clean = user_answer.strip().upper().replace(" ", "").replace(".", "")
-    correct_clean = correct_answer.strip().upper().replace(" ", "").replace(".", "")
-    return user_clean == correct_clean
+    """Compared as parsed values (IP, class, binary, octets...), see answer_normalizer"""
+    return answers_match(user_answer, correct_answer)
 
 def get_hint_level_prompt(attempt, question, correct_answer):
     if attempt == 1:
@@ -490,9 +590,38 @@ def get_hint_level_prompt(attempt, question, correct_answer):
         msg += "Be very encouraging about their effort."
         return msg
 
+def hint_request(attempt, question_data, answer_line):
+    """Claude request for the hint at this attempt level"""
+    correct_answer = question_data['answer']
+    hint_prompt = get_hint_level_prompt(attempt, question_data['question'], correct_answer)
+    
+    messages = [{
+        "role": "user",
+        "content": "Question: " + question_data['question'] + "\nCorrect Answer: " + correct_answer + "\n" + answer_line + "\nAttempt: " + str(attempt) + " of 5\n\n" + hint_prompt
+    }]
+    
+    route = router.route(AGENT_NAME, 'hint', level=attempt)
+    return {
+        'route': route.name,
+        'model': route.model,
+        'max_tokens': 1024,
+        'system': SYSTEM_PROMPT,
+        'messages': messages
+    }
+
+def prefetch_key(question_data, attempt):
+    return make_key(question_data['question'], question_data['answer'], attempt)
+
+def start_prefetch(turn):
+    """Kick off the speculative next-level hint once this reply is on its way"""
+    if 'prefetch' in turn:
+        hint_prefetcher.schedule(**turn['prefetch'])
+
+templates.page('index', HTML_TEMPLATE)
+
 @app.route('/')
 def home():
-    return render_template_string(HTML_TEMPLATE)
+    return templates.serve('index', request)
 
 @app.route('/new_question', methods=['POST'])
 def new_question():
@@ -502,7 +631,7 @@ def new_question():
         
         print("[DEBUG] New question:", quiz_type)
         
-        question_data = get_random_question(quiz_type)
+        question_data = get_random_question(quiz_type, data.get('seed'))
         if not question_data:
             return jsonify({'error': 'No questions available'}), 400
         
@@ -543,65 +672,136 @@ def get_question_by_number_route():
         print("[ERROR]", str(e))
         return jsonify({'error': str(e)}), 500
 
-@app.route('/chat', methods=['POST'])
-def chat():
-    data = request.json
+def prepare_turn(data):
+    """Grade one answer and work out what (if anything) to ask Claude
+    
+    Returns (turn, None) or (None, error_message). A turn with a 'response'
+    is answered locally; otherwise 'request' holds the Claude call to make.
+    """
     user_message = data.get('message', '')
     question_data = data.get('question')
     current_attempt = data.get('attempt', 0)
     
     if not question_data:
-        return jsonify({'error': 'No active question'}), 400
+        return None, 'No active question'
     
     current_attempt += 1
     correct_answer = question_data['answer']
     
     is_correct = check_answer(user_message, correct_answer)
     
+    owner = prefetch_owner(session)
     if is_correct:
+        hint_prefetcher.discard(owner)
         celebrations = [
             "YES! Correct! The answer is " + correct_answer + ". You got it on attempt " + str(current_attempt) + "!",
             "Perfect! " + correct_answer + " is right! Attempt " + str(current_attempt),
             "Excellent! " + correct_answer + " is correct! Great work!",
             "Fantastic! " + correct_answer + " - you nailed it!"
         ]
-        response_text = random.choice(celebrations)
-        
-        return jsonify({
-            'response': response_text,
-            'is_correct': True,
-            'attempt': current_attempt
-        })
+        return {'response': random.choice(celebrations), 'is_correct': True, 'attempt': current_attempt}, None
     
-    hint_prompt = get_hint_level_prompt(current_attempt, question_data['question'], correct_answer)
+    turn = {'is_correct': False, 'attempt': current_attempt}
+    if current_attempt < 5:
+        turn['prefetch'] = {
+            'owner': owner,
+            'key': prefetch_key(question_data, current_attempt + 1),
+            'request_kwargs': hint_request(current_attempt + 1, question_data,
+                                           "Student's Previous Answer (incorrect): " + user_message)
+        }
     
-    messages = [{
-        "role": "user",
-        "content": "Question: " + question_data['question'] + "\nCorrect Answer: " + correct_answer + "\nStudent Answer: " + user_message + "\nAttempt: " + str(current_attempt) + " of 5\n\n" + hint_prompt
-    }]
+    prefetched_hint = hint_prefetcher.take(owner, prefetch_key(question_data, current_attempt))
+    if prefetched_hint is not None:
+        turn['response'] = prefetched_hint
+        return turn, None
     
-    try:
-        response = client.messages.create(
-            model="claude-sonnet-4-20250514",
-            max_tokens=1024,
-            system=SYSTEM_PROMPT,
-            messages=messages
-        )
-        
-        bot_response = response.content[0].text
-        
+    turn['request'] = hint_request(current_attempt, question_data, "Student Answer: " + user_message)
+    return turn, None
+
+def chat_reply(turn, bot_response):
+    """The /chat JSON for a finished turn"""
+    start_prefetch(turn)
+    return jsonify({
+        'response': bot_response,
+        'is_correct': turn['is_correct'],
+        'attempt': turn['attempt']
+    })
+
+def chat_error(turn, e):
+    if isinstance(e, GatewayBusy):
         return jsonify({
-            'response': bot_response,
+            'response': str(e),
             'is_correct': False,
-            'attempt': current_attempt
-        })
-        
+            'attempt': turn['attempt']
+        }), 503
+    return jsonify({
+        'response': "Sorry, error: " + str(e),
+        'is_correct': False,
+        'attempt': turn['attempt']
+    })
+
+@app.route('/chat', methods=['POST'])
+def chat():
+    turn, error = prepare_turn(request.json)
+    if error:
+        return jsonify({'error': error}), 400
+    
+    if 'response' in turn:
+        return chat_reply(turn, turn['response'])
+    
+    try:
+        response = gateway.create(AGENT_NAME, **turn['request'])
+        return chat_reply(turn, response.content[0].text)
     except Exception as e:
-        return jsonify({
-            'response': "Sorry, error: " + str(e),
-            'is_correct': False,
-            'attempt': current_attempt
-        })
+        return chat_error(turn, e)
+
+async def chat_async():
+    """/chat for the ASGI host (async_chat.py): same JSON, but the Claude call is awaited"""
+    # prepare_turn can wait on this student's hint prefetch - not on the event loop
+    turn, error = await run_off_loop(prepare_turn, request.json)
+    if error:
+        return jsonify({'error': error}), 400
+    
+    if 'response' in turn:
+        return chat_reply(turn, turn['response'])
+    
+    try:
+        response = await gateway.acreate(AGENT_NAME, **turn['request'])
+        return chat_reply(turn, response.content[0].text)
+    except Exception as e:
+        return chat_error(turn, e)
+
+@app.route('/chat_stream', methods=['POST'])
+def chat_stream():
+    """Same as /chat, but the hint arrives token-by-token over Server-Sent Events"""
+    turn, error = prepare_turn(request.json)
+    if error:
+        return jsonify({'error': error}), 400
+    
+    meta = {'is_correct': turn['is_correct'], 'attempt': turn['attempt']}
+    if 'response' in turn:
+        start_prefetch(turn)
+        return sse_response(meta, [turn['response']])
+    
+    def on_complete(text):
+        start_prefetch(turn)
+    
+    try:
+        chunks = gateway.open_stream(AGENT_NAME, **turn['request'])
+    except GatewayBusy as e:
+        # No meta event, so the page keeps its attempt count
+        return jsonify({'error': str(e)}), 503
+    return sse_response(meta, chunks, on_complete=on_complete, agent=AGENT_NAME)
+
+@app.route('/stats')
+def stats():
+    """Latency, call counts and shared LLM gateway gauges for this agent"""
+    snapshot = metrics.snapshot(prefix=AGENT_NAME + '.')
+    snapshot['gateway'] = gateway.stats()
+    snapshot['routing'] = router.stats()
+    snapshot['prefetch'] = hint_prefetcher.stats()
+    snapshot['question_pool'] = question_pool.stats()
+    return jsonify(snapshot)
 
 @app.route('/reset', methods=['POST'])
 def reset():
@@ -620,4 +820,4 @@ if __name__ == '__main__':
     print("\nSet ANTHROPIC_API_KEY environment variable!")
     print("=" * 60)
     
-    app.run(debug=False, host='localhost', port=5001, use_reloader=False)
\ No newline at end of file
+    serve(app, host='localhost', port=5001, debug=False, use_reloader=False)
\ No newline at end of file
@@ -0,0 +1,169 @@
+"""
+Compression Middleware - gzip/brotli responses and 304s for the tutor apps
+
+The agent pages are 6-20 KB of inline HTML, CSS and JS, sent uncompressed on
+every reload. Wrapping an app's wsgi_app with CompressionMiddleware:
+- negotiates br (when the brotli package is installed) or gzip from
+  Accept-Encoding and adds Vary: Accept-Encoding
+- remembers responses the view marked with an ETag (the pre-rendered pages
+  from template_registry, the matrix pages) compressed once per (route,
+  encoding), with an ETag and Last-Modified; repeat requests and 304s for
+  them are answered from that cache without calling the view
+- compresses other GET responses on the fly and gives them a body ETag, so
+  an unchanged /problem page still revalidates to a 304
+- leaves streams alone: SSE, NDJSON and anything without a Content-Length
+  pass straight through, as do POSTs, errors and tiny bodies
+
+    app.wsgi_app = CompressionMiddleware(app.wsgi_app, AGENT_NAME)
+
+Counters (<name>.http_cache_hits, .http_not_modified, .http_compressed,
+.http_passthrough) land in tutor_metrics, so they show up on /stats.
+"""
+
+import gzip
+import hashlib
+import os
+import threading
+from collections import OrderedDict, namedtuple
+from datetime import datetime, timezone
+
+from werkzeug.datastructures import Headers
+from werkzeug.http import http_date, is_resource_modified, parse_accept_header, quote_etag, unquote_etag
+
+from tutor_metrics import metrics
+
+try:
+    import brotli
+except ImportError:  # Optional: gzip only
+    brotli = None
+
+MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', '512'))
+CACHE_ENTRIES = int(os.environ.get('COMPRESS_CACHE_ENTRIES', '256'))
+COMPRESSIBLE = ('text/html', 'text/css', 'text/plain', 'text/javascript', 'application/javascript',
+                'application/json', 'image/svg+xml')
+CONDITIONAL_HEADERS = ('HTTP_IF_NONE_MATCH', 'HTTP_IF_MODIFIED_SINCE')
+# Headers a 304 must not carry - it has no body
+BODY_HEADERS = ('content-length', 'content-encoding', 'content-type')
+# Replaced when encoding; Date is left to the server, so a replayed entry gets a fresh one
+# (a frozen Date would make a max-age page look stale)
+REPLACED_HEADERS = ('content-length', 'content-encoding', 'etag', 'date')
+
+Encoded = namedtuple('Encoded', ['body', 'headers', 'etag', 'last_modified'])
+
+
+def encodings():
+    return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+
+def compress(body, encoding, cached):
+    """Best compression for bodies that are compressed once, a fast level for per-request ones"""
+    if encoding == 'br':
+        return brotli.compress(body, quality=11 if cached else 5)
+    if encoding == 'gzip':
+        return gzip.compress(body, compresslevel=9 if cached else 6, mtime=0)
+    return body
+
+
+class CompressionMiddleware:
+    """WSGI wrapper adding compression, validators and a per-route cache of encoded pages"""
+
+    def __init__(self, app, name='app', min_size=MIN_SIZE, max_entries=CACHE_ENTRIES):
+        self.app = app
+        self.name = name
+        self.min_size = min_size
+        self.max_entries = max_entries
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def count(self, event):
+        metrics.incr(f'{self.name}.http_{event}')
+
+    def negotiate(self, environ):
+        """'br', 'gzip' or None (identity) for this request's Accept-Encoding"""
+        accepted = parse_accept_header(environ.get('HTTP_ACCEPT_ENCODING', ''))
+        return accepted.best_match(encodings())
+
+    def __call__(self, environ, start_response):
+        if environ.get('REQUEST_METHOD') != 'GET':
+            return self.app(environ, start_response)
+
+        encoding = self.negotiate(environ)
+        key = (environ.get('PATH_INFO', ''), environ.get('QUERY_STRING', ''), encoding)
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None:
+                self._cache.move_to_end(key)
+        if entry is not None:
+            self.count('cache_hits')
+            return self.respond(entry, environ, start_response)
+
+        # The view always gets an unconditional request so there is a full body to encode;
+        # the conditional headers are checked here, against the encoded ETag
+        captured = {}
+
+        def capture(status, headers, exc_info=None):
+            captured['status'] = status
+            captured['headers'] = Headers(headers)
+            return start_response(status, headers, exc_info) if exc_info else None
+
+        inner = {name: value for name, value in environ.items() if name not in CONDITIONAL_HEADERS}
+        app_iter = self.app(inner, capture)
+        headers = captured['headers']  # Flask/Werkzeug call start_response before returning the body
+
+        if not self.should_buffer(captured['status'], headers):
+            self.count('passthrough')
+            start_response(captured['status'], headers.to_wsgi_list())
+            return app_iter
+
+        try:
+            body = b''.join(app_iter)
+        finally:
+            if hasattr(app_iter, 'close'):
+                app_iter.close()
+
+        cacheable = ('ETag' in headers and 'Set-Cookie' not in headers
+                     and 'cookie' not in headers.get('Vary', '').lower())
+        entry = self.encode(body, headers, encoding if len(body) >= self.min_size else None, cacheable)
+        if cacheable:
+            with self._lock:
+                self._cache[key] = entry
+                while len(self._cache) > self.max_entries:
+                    self._cache.popitem(last=False)
+        return self.respond(entry, environ, start_response)
+
+    def should_buffer(self, status, headers):
+        """Only complete 200 bodies of a text type; streams never have a Content-Length"""
+        mimetype = headers.get('Content-Type', '').split(';')[0].strip().lower()
+        return (status.startswith('200') and mimetype in COMPRESSIBLE and 'Content-Length' in headers
+                and 'Content-Encoding' not in headers)
+
+    def encode(self, body, headers, encoding, cached):
+        """Encoded response for `body`, with an ETag per encoding (the view's, else the body's hash)"""
+        base_etag, weak = unquote_etag(headers.get('ETag') or 'W/"%s"' % hashlib.sha256(body).hexdigest()[:32])
+        etag = f'{base_etag}-{encoding}' if encoding else base_etag
+        headers = Headers([(name, value) for name, value in headers.items()
+                           if name.lower() not in REPLACED_HEADERS])
+
+        encoded = compress(body, encoding, cached)
+        if encoding:
+            headers['Content-Encoding'] = encoding
+            self.count('compressed')
+        vary = [value.strip() for value in headers.get('Vary', '').split(',') if value.strip()]
+        headers['Vary'] = ', '.join(vary + ['Accept-Encoding'])
+        headers['ETag'] = quote_etag(etag, weak)
+
+        last_modified = None
+        if cached:
+            last_modified = datetime.now(timezone.utc).replace(microsecond=0)
+            headers.setdefault('Last-Modified', http_date(last_modified))
+        headers['Content-Length'] = str(len(encoded))
+        return Encoded(encoded, headers.to_wsgi_list(), etag, last_modified)
+
+    def respond(self, entry, environ, start_response):
+        if not is_resource_modified(environ, etag=entry.etag, last_modified=entry.last_modified):
+            self.count('not_modified')
+            start_response('304 Not Modified', [(name, value) for name, value in entry.headers
+                                                 if name.lower() not in BODY_HEADERS])
+            return []
+        start_response('200 OK', entry.headers)
+        return [entry.body]
@@ -0,0 +1,83 @@
+"""
+Conversation Window - Keep a tutoring conversation inside a token budget
+
+The full history stays on the server; only the window goes to Claude:
+- the last HISTORY_KEEP_TURNS exchanges verbatim
+- everything older collapsed into a deterministic digest, one line per part
+  ("Part 3 (Number of subnet bits): solved after 2 wrong attempts")
+
+History entries may carry bookkeeping keys ('part', 'label', 'is_correct',
+'is_attempt') for the digest; only role/content are sent upstream.
+"""
+
+import os
+
+# Rough English/markup average - good enough for budgeting without a network round trip
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(content):
+    """Approximate token count of a message's content (string or content blocks)"""
+    if isinstance(content, str):
+        return len(content) // CHARS_PER_TOKEN + 1
+    return sum(estimate_tokens(block.get('text', '')) for block in content)
+
+
+class ConversationWindow:
+    """Token-budgeted view of a conversation history"""
+
+    def __init__(self, max_tokens=None, keep_turns=None):
+        self.max_tokens = max_tokens or int(os.environ.get('HISTORY_TOKEN_BUDGET', 6000))
+        self.keep_turns = keep_turns or int(os.environ.get('HISTORY_KEEP_TURNS', 4))
+
+    def digest(self, entries):
+        """One line per part seen in the dropped entries, in the order they came up"""
+        parts = {}
+        for entry in entries:
+            if entry['role'] != 'user' or 'part' not in entry:
+                continue
+            summary = parts.setdefault(entry['part'], {'label': entry.get('label', ''), 'misses': 0, 'questions': 0, 'solved': False})
+            if entry.get('is_correct'):
+                summary['solved'] = True
+            elif entry.get('is_attempt'):
+                summary['misses'] += 1
+            else:
+                summary['questions'] += 1
+
+        lines = []
+        for part, summary in parts.items():
+            name = part.replace('part', 'Part ')
+            if summary['label']:
+                name += f" ({summary['label']})"
+            if summary['solved']:
+                status = f"solved after {summary['misses']} wrong attempt(s)"
+            else:
+                status = f"not solved yet, {summary['misses']} wrong attempt(s)"
+            if summary['questions']:
+                status += f", {summary['questions']} question(s) asked"
+            lines.append(f"- {name}: {status}")
+        return "EARLIER IN THIS SESSION (older messages summarized):\n" + "\n".join(lines)
+
+    def build(self, history, new_entry):
+        """Messages for the next call: trimmed history plus the new user entry
+
+        Returns (messages, dropped) where dropped is the number of history
+        entries folded into the digest.
+        """
+        entries = list(history) + [new_entry]
+        total = sum(estimate_tokens(entry['content']) for entry in entries)
+
+        keep_from = 0
+        if total > self.max_tokens:
+            # Keep whole user/assistant exchanges, newest first, while they fit
+            keep_from = max(0, len(history) - 2 * self.keep_turns)
+            kept = sum(estimate_tokens(entry['content']) for entry in entries[keep_from:])
+            while kept > self.max_tokens and keep_from + 2 <= len(history):
+                kept -= estimate_tokens(entries[keep_from]['content']) + estimate_tokens(entries[keep_from + 1]['content'])
+                keep_from += 2
+
+        messages = [{'role': entry['role'], 'content': entry['content']} for entry in entries[keep_from:]]
+        if keep_from:
+            digest = self.digest(entries[:keep_from])
+            messages[0]['content'] = f"{digest}\n\n{messages[0]['content']}"
+        return messages, keep_from
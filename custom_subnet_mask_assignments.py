@@ -3,16 +3,35 @@ Custom Subnet Mask Tutor Agent - Based on Professor Bodden's Methodology
 Helps students work through 6 custom subnet mask problems with 10 parts each
 """
 
-from flask import Flask, render_template_string, request, jsonify, session
-from anthropic import Anthropic
+from flask import Flask, request, jsonify, session
 import os
 import secrets
+from answer_normalizer import answers_match, canonical
+from compression_middleware import CompressionMiddleware
+from hint_cache import HintCache, make_key, prompt_version
+from hint_prefetch import HintPrefetcher, prefetch_owner, run_off_loop
+from llm_gateway import GatewayBusy, gateway
+from llm_streaming import sse_response
+from misconceptions import misconception_hint, record
+from model_router import router
+from prompt_cache import cacheable_system
+from serving import serve
+from subnet_engine import MASK_PART_CONCEPTS, derive_answer_keys, explain, mask_answer_key, plan_for
+from subnet_matrix import matrix_response
+from template_registry import TemplateRegistry
+from tutor_metrics import metrics
 
 app = Flask(__name__)
 app.secret_key = secrets.token_hex(16)
+templates = TemplateRegistry(app)
 
-# Initialize Anthropic client
-client = Anthropic(api_key=os.environ.get("ANTHROPIC_API_KEY"))
+AGENT_NAME = "custom_masks"
+app.wsgi_app = CompressionMiddleware(app.wsgi_app, AGENT_NAME)
+
+# Identical wrong answers for the same part get the same hint - serve repeats from memory
+hint_cache = HintCache()
+# Optional (HINT_PREFETCH=1): generate the next hint level while the student types
+hint_prefetcher = HintPrefetcher(AGENT_NAME)
 
 # Powers of 2 Matrix Reference
 POWERS_OF_2 = {
@@ -145,6 +164,9 @@ PART_DESCRIPTIONS = {
     "part10": "Custom address map (Letters)"
 }
 
+# Grading uses keys computed by the subnet engine; the typed keys above are cross-checked at startup
+ANSWER_KEYS = derive_answer_keys(PROBLEMS, mask_answer_key)
+
 # System Prompt - Teaching Style
 SYSTEM_PROMPT = """You are an enthusiastic and patient Cisco networking tutor teaching custom subnet mask assignments. You help students work through subnet problems using a step-by-step methodology with the Subnetting Matrix.
 
@@ -220,6 +242,8 @@ IMPORTANT TEACHING PHRASES:
 
 Be encouraging! Use Professor Bodden's casual, supportive tone. Celebrate learning from mistakes, and always guide students back to the matrix."""
 
+SYSTEM_PROMPT_VERSION = prompt_version(SYSTEM_PROMPT)
+
 # HTML Template with improved UI
 HTML_TEMPLATE = """<!DOCTYPE html>
 <html>
@@ -459,7 +483,7 @@ HTML_TEMPLATE = """<!DOCTYPE html>
         });
 
         function loadProblem(problemNum) {
-            fetch('/load_problem', {
+            fetch('load_problem', {
                 method: 'POST',
                 headers: {'Content-Type': 'application/json'},
                 body: JSON.stringify({problem_number: problemNum})
@@ -533,7 +557,7 @@ HTML_TEMPLATE = """<!DOCTYPE html>
             currentAttempt = 0;
             renderParts();
             
-            fetch('/select_part', {
+            fetch('select_part', {
                 method: 'POST',
                 headers: {'Content-Type': 'application/json'},
                 body: JSON.stringify({
@@ -564,40 +588,55 @@ HTML_TEMPLATE = """<!DOCTYPE html>
             
             addMessage('user', message);
             
-            fetch('/chat', {
-                method: 'POST',
-                headers: {'Content-Type': 'application/json'},
-                body: JSON.stringify({
-                    problem_number: currentProblem,
-                    part: currentPart,
-                    answer: message,
-                    attempt: currentAttempt
-                })
-            })
-            .then(r => r.json())
-            .then(data => {
-                console.log('Response data:', data);
-                console.log('Current part:', currentPart);
-                console.log('Is correct:', data.is_correct);
-                console.log('Address class:', data.address_class);
-                
-                currentAttempt = data.attempt;
-                addMessage('bot', data.response);
-                
-                if (data.is_correct) {
-                    completedParts.add(currentPart);
-                    renderParts();
+            let botMessage = null;
+            let botText = '';
+            
+            streamChat('chat_stream', {
+                problem_number: currentProblem,
+                part: currentPart,
+                answer: message,
+                attempt: currentAttempt
+            }, {
+                meta: data => {
+                    console.log('Response data:', data);
+                    console.log('Current part:', currentPart);
+                    console.log('Is correct:', data.is_correct);
+                    console.log('Address class:', data.address_class);
+                    
+                    currentAttempt = data.attempt;
+                    
+                    if (data.is_correct) {
+                        completedParts.add(currentPart);
+                        renderParts();
+                        
+                        // If Part 2 (Default Subnet Mask) is correct, open matrix in new tab
+                        if (currentPart === 'part2' && data.address_class) {
+                            console.log('Opening matrix for class:', data.address_class);
+                            const matrixUrl = 'matrix/' + data.address_class;
+                            console.log('Matrix URL:', matrixUrl);
+                            window.open(matrixUrl, '_blank');
+                        }
+                    }
                     
-                    // If Part 2 (Default Subnet Mask) is correct, open matrix in new tab
-                    if (currentPart === 'part2' && data.address_class) {
-                        console.log('Opening matrix for class:', data.address_class);
-                        const matrixUrl = '/matrix/' + data.address_class;
-                        console.log('Matrix URL:', matrixUrl);
-                        window.open(matrixUrl, '_blank');
+                    updateAttemptIndicator();
+                },
+                token: data => {
+                    // Render the hint as it arrives instead of waiting for the whole reply
+                    if (!botMessage) {
+                        document.getElementById('loading').style.display = 'none';
+                        botMessage = addMessage('bot', '');
                     }
+                    botText += data.text;
+                    botMessage.innerHTML = botText.replace(/\\n/g, '<br>');
+                    const chatContainer = document.getElementById('chat-container');
+                    chatContainer.scrollTop = chatContainer.scrollHeight;
+                },
+                error: data => {
+                    addMessage('bot', `Sorry, I encountered an error: ${data.error}`);
+                },
+                done: data => {
+                    console.log('Time to first token (ms):', data.ttft_ms, 'Total (ms):', data.total_ms);
                 }
-                
-                updateAttemptIndicator();
             })
             .catch(error => {
                 console.error('Error:', error);
@@ -611,6 +650,48 @@ HTML_TEMPLATE = """<!DOCTYPE html>
             });
         }
 
+        // POST to a Server-Sent Events endpoint and hand each event to handlers[event]
+        function streamChat(url, payload, handlers) {
+            return fetch(url, {
+                method: 'POST',
+                headers: {'Content-Type': 'application/json'},
+                body: JSON.stringify(payload)
+            })
+            .then(response => {
+                if (response.status === 503) {
+                    // Busy: refused before any event, so the attempt wasn't counted
+                    return response.json().then(data => handlers.error(data));
+                }
+                if (!response.ok || !response.body) {
+                    throw new Error('Stream request failed: ' + response.status);
+                }
+                const reader = response.body.getReader();
+                const decoder = new TextDecoder();
+                let buffer = '';
+                
+                function pump() {
+                    return reader.read().then(result => {
+                        if (result.done) return;
+                        buffer += decoder.decode(result.value, {stream: true});
+                        let boundary;
+                        while ((boundary = buffer.indexOf('\\n\\n')) !== -1) {
+                            const block = buffer.slice(0, boundary);
+                            buffer = buffer.slice(boundary + 2);
+                            let eventName = 'message';
+                            let eventData = '';
+                            block.split('\\n').forEach(line => {
+                                if (line.startsWith('event: ')) eventName = line.slice(7);
+                                else if (line.startsWith('data: ')) eventData += line.slice(6);
+                            });
+                            if (handlers[eventName]) handlers[eventName](JSON.parse(eventData));
+                        }
+                        return pump();
+                    });
+                }
+                return pump();
+            });
+        }
+
         function addMessage(sender, text) {
             const chatContainer = document.getElementById('chat-container');
             const messageDiv = document.createElement('div');
@@ -618,6 +699,7 @@ HTML_TEMPLATE = """<!DOCTYPE html>
             messageDiv.innerHTML = text.replace(/\\n/g, '<br>');
             chatContainer.appendChild(messageDiv);
             chatContainer.scrollTop = chatContainer.scrollHeight;
+            return messageDiv;
         }
 
         function updateAttemptIndicator() {
@@ -639,7 +721,7 @@ HTML_TEMPLATE = """<!DOCTYPE html>
 
         function resetSession() {
             if (confirm('Reset all progress and start fresh?')) {
-                fetch('/reset', {method: 'POST'})
+                fetch('reset', {method: 'POST'})
                 .then(() => location.reload());
             }
         }
@@ -647,23 +729,19 @@ HTML_TEMPLATE = """<!DOCTYPE html>
 </body>
 </html>"""
 
-def normalize_answer(answer):
-    """Normalize answers for comparison"""
-    return str(answer).strip().upper().replace(" ", "").replace(".", "")
-
 def check_answer(user_answer, correct_answer):
-    """Check if student answer matches correct answer"""
-    return normalize_answer(user_answer) == normalize_answer(correct_answer)
+    """Check if student answer matches correct answer (compared as parsed values, see answer_normalizer)"""
+    return answers_match(user_answer, correct_answer)
 
-def get_hint_prompt(attempt, part, problem_data):
-    """Generate progressive hints based on attempt number"""
+def get_problem_context(part, problem_data):
+    """Problem/part context - identical for every attempt at this part"""
     part_desc = PART_DESCRIPTIONS.get(part, "")
-    correct = problem_data['answers'][part]
+    correct = mask_answer_key(problem_data)[part]
     subnets = problem_data['subnets_needed']
     hosts = problem_data['hosts_needed']
     address = problem_data['network_address']
     
-    context = f"""
+    return f"""
 Problem Context:
 - Network Address: {address}
 - Subnets Needed: {subnets}
@@ -671,21 +749,63 @@ Problem Context:
 - Current Part: {part_desc}
 - Correct Answer: {correct}
 """
+
+def get_hint_instruction(attempt, part, problem_data):
+    """How much help to give on this attempt"""
+    correct = mask_answer_key(problem_data)[part]
     
     if attempt == 1:
-        return context + "\nGive a gentle hint. Ask what they know about this concept. Reference the Powers of 2 Matrix if relevant. Do NOT give the answer."
+        return "\nGive a gentle hint. Ask what they know about this concept. Reference the Powers of 2 Matrix if relevant. Do NOT give the answer."
     elif attempt == 2:
-        return context + "\nShow which formula or concept to use. Reference the Powers of 2 Matrix. Give an example but not the complete answer."
+        return "\nShow which formula or concept to use. Reference the Powers of 2 Matrix. Give an example but not the complete answer."
     elif attempt == 3:
-        return context + "\nWalk through the first half of the solution. Show the setup and initial calculations. Let them finish."
+        return "\nWalk through the first half of the solution. Show the setup and initial calculations. Let them finish."
     elif attempt == 4:
-        return context + "\nProvide detailed step-by-step work, but stop just before the final answer. Let them complete the last step."
+        return "\nProvide detailed step-by-step work, but stop just before the final answer. Let them complete the last step."
     else:
-        return context + f"\nGive the complete answer '{correct}' with full explanation. Show all work using the Powers of 2 Matrix and formulas. Be very encouraging about their effort!"
+        return f"\nGive the complete answer '{correct}' with full explanation. Show all work using the Powers of 2 Matrix and formulas. Be very encouraging about their effort!"
+
+def get_hint_prompt(attempt, part, problem_data):
+    """Generate progressive hints based on attempt number"""
+    return get_problem_context(part, problem_data) + get_hint_instruction(attempt, part, problem_data)
+
+def hint_request(attempt, part, problem_data, answer_line):
+    """Claude request for the hint at this attempt level
+    
+    The system prompt and this part's context are cached upstream; only the
+    student's answer and the hint level are new on each attempt.
+    """
+    route = router.route(AGENT_NAME, 'hint', level=attempt)
+    return {
+        'route': route.name,
+        'model': route.model,
+        'max_tokens': 1500,
+        'system': cacheable_system(SYSTEM_PROMPT, get_problem_context(part, problem_data), model=route.model),
+        'messages': [{
+            "role": "user",
+            "content": f"{answer_line}\nAttempt: {attempt} of 5\n{get_hint_instruction(attempt, part, problem_data)}"
+        }]
+    }
+
+def worked_answer(part, problem_data):
+    """Level-5 hint computed locally - the full step-by-step answer, no Claude call"""
+    steps = explain(plan_for(problem_data), MASK_PART_CONCEPTS[part])
+    return ("📘 <strong>Let's work through it together:</strong>\n\n" + steps
+            + "\n\nType the answer in to lock it in - you've earned it with all that effort! 💪")
+
+def prefetch_key(problem_num, part, attempt):
+    return make_key(problem_num, part, attempt, SYSTEM_PROMPT_VERSION)
+
+def start_prefetch(turn):
+    """Kick off the speculative next-level hint once this reply is on its way"""
+    if 'prefetch' in turn:
+        hint_prefetcher.schedule(**turn['prefetch'])
+
+templates.page('index', HTML_TEMPLATE)
 
 @app.route('/')
 def home():
-    return render_template_string(HTML_TEMPLATE)
+    return templates.serve('index', request)
 
 @app.route('/load_problem', methods=['POST'])
 def load_problem():
@@ -730,19 +850,22 @@ What is your answer?<br><br>
     
     return jsonify({'message': message})
 
-@app.route('/chat', methods=['POST'])
-def chat():
-    data = request.json
+def prepare_turn(data):
+    """Grade one answer and work out what (if anything) to ask Claude
+    
+    Returns (turn, None) or (None, error_message). A turn with a 'response'
+    is answered locally; otherwise 'request' holds the Claude call to make.
+    """
     problem_num = data.get('problem_number')
     part = data.get('part')
     user_answer = data.get('answer', '')
     current_attempt = data.get('attempt', 0)
     
     if not problem_num or not part:
-        return jsonify({'error': 'No active problem/part'}), 400
+        return None, 'No active problem/part'
     
     problem = PROBLEMS[problem_num]
-    correct_answer = problem['answers'][part]
+    correct_answer = ANSWER_KEYS[problem_num][part]
     current_attempt += 1
     
     # Check if correct
@@ -756,390 +879,178 @@ def chat():
         import random
         response_text = random.choice(celebrations)
         
+        turn = {'is_correct': True, 'attempt': current_attempt}
+        hint_prefetcher.discard(prefetch_owner(session))
+        
         # If Part 2 (Default Subnet Mask) is correct, prepare to open matrix
-        address_class = None
         if part == 'part2':
-            address_class = problem['answers']['part1']  # A, B, or C
+            address_class = ANSWER_KEYS[problem_num]['part1']  # A, B, or C
             response_text += f"<br><br>📊 <strong>Opening the Class {address_class} Subnetting Matrix in a new tab...</strong><br>You can switch between tabs to reference the matrix while working!"
             print(f"[DEBUG] Part 2 correct! Opening matrix for Class {address_class}")
+            turn['address_class'] = address_class
         
-        response_data = {
-            'response': response_text,
-            'is_correct': True,
-            'attempt': current_attempt
-        }
-        
-        if address_class:
-            response_data['address_class'] = address_class
-        
-        print(f"[DEBUG] Returning response: {response_data}")
-        return jsonify(response_data)
+        turn['response'] = response_text
+        return turn, None
+    
+    turn = {'is_correct': False, 'attempt': current_attempt}
+    if current_attempt >= 5:
+        # The full worked answer is pure arithmetic - no need to ask Claude
+        turn['response'] = worked_answer(part, problem)
+        metrics.incr(f'{AGENT_NAME}.local_explanations')
+        return turn, None
+    
+    # A known mistake gets its targeted hint locally - no need to ask Claude
+    hint = misconception_hint(problem, MASK_PART_CONCEPTS[part], user_answer, correct_answer)
+    record(AGENT_NAME, hint is not None)
+    if hint is not None:
+        turn['response'] = f"🔎 {hint}"
+        return turn, None
     
     # Generate hint using Claude
     hint_prompt = get_hint_prompt(current_attempt, part, problem)
     
-    messages = [{
-        "role": "user",
-        "content": f"Student's answer: {user_answer}\nAttempt: {current_attempt} of 5\n\n{hint_prompt}"
-    }]
+    # The prompt is fully determined by these values, so repeats can be served from the cache
+    turn['cache_key'] = make_key(canonical(user_answer, correct_answer), current_attempt, hint_prompt,
+                                 SYSTEM_PROMPT_VERSION, router.primary(AGENT_NAME, 'hint', current_attempt))
+    owner = prefetch_owner(session)
+    if current_attempt + 1 < 5:
+        turn['prefetch'] = {
+            'owner': owner,
+            'key': prefetch_key(problem_num, part, current_attempt + 1),
+            'request_kwargs': hint_request(current_attempt + 1, part, problem,
+                                           f"Student's previous answer (incorrect): {user_answer}")
+        }
+    
+    cached_hint = hint_cache.get(turn['cache_key'])
+    if cached_hint is not None:
+        turn['response'] = cached_hint
+        return turn, None
+    
+    # Written about this student's previous answer, so it is theirs alone - never cached
+    prefetched_hint = hint_prefetcher.take(owner, prefetch_key(problem_num, part, current_attempt))
+    if prefetched_hint is not None:
+        turn['response'] = prefetched_hint
+        return turn, None
+    
+    turn['request'] = hint_request(current_attempt, part, problem, f"Student's answer: {user_answer}")
+    return turn, None
+
+def turn_meta(turn):
+    """The JSON fields of a turn, minus the reply text"""
+    meta = {'is_correct': turn['is_correct'], 'attempt': turn['attempt']}
+    if 'address_class' in turn:
+        meta['address_class'] = turn['address_class']
+    return meta
+
+def local_reply(turn):
+    response_data = turn_meta(turn)
+    response_data['response'] = turn['response']
+    print(f"[DEBUG] Returning response: {response_data}")
+    start_prefetch(turn)
+    return jsonify(response_data)
+
+def claude_reply(turn, bot_response):
+    hint_cache.put(turn['cache_key'], bot_response)
+    start_prefetch(turn)
+    response_data = turn_meta(turn)
+    response_data['response'] = bot_response
+    return jsonify(response_data)
+
+def chat_error(turn, e):
+    response_data = turn_meta(turn)
+    if isinstance(e, GatewayBusy):
+        response_data['response'] = str(e)
+        return jsonify(response_data), 503
+    response_data['response'] = f"Sorry, I encountered an error: {str(e)}"
+    return jsonify(response_data)
+
+@app.route('/chat', methods=['POST'])
+def chat():
+    turn, error = prepare_turn(request.json)
+    if error:
+        return jsonify({'error': error}), 400
+    
+    if 'response' in turn:
+        return local_reply(turn)
     
     try:
-        response = client.messages.create(
-            model="claude-sonnet-4-20250514",
-            max_tokens=1500,
-            system=SYSTEM_PROMPT,
-            messages=messages
-        )
-        
-        bot_response = response.content[0].text
-        
-        return jsonify({
-            'response': bot_response,
-            'is_correct': False,
-            'attempt': current_attempt
-        })
-        
+        response = gateway.create(AGENT_NAME, **turn['request'])
+        return claude_reply(turn, response.content[0].text)
+    except Exception as e:
+        return chat_error(turn, e)
+
+async def chat_async():
+    """/chat for the ASGI host (async_chat.py): same JSON, but the Claude call is awaited"""
+    # prepare_turn can wait on this student's hint prefetch - not on the event loop
+    turn, error = await run_off_loop(prepare_turn, request.json)
+    if error:
+        return jsonify({'error': error}), 400
+    
+    if 'response' in turn:
+        return local_reply(turn)
+    
+    try:
+        response = await gateway.acreate(AGENT_NAME, **turn['request'])
+        return claude_reply(turn, response.content[0].text)
     except Exception as e:
-        return jsonify({
-            'response': f"Sorry, I encountered an error: {str(e)}",
-            'is_correct': False,
-            'attempt': current_attempt
-        })
+        return chat_error(turn, e)
+
+@app.route('/chat_stream', methods=['POST'])
+def chat_stream():
+    """Same as /chat, but the hint arrives token-by-token over Server-Sent Events"""
+    turn, error = prepare_turn(request.json)
+    if error:
+        return jsonify({'error': error}), 400
+    
+    if 'response' in turn:
+        start_prefetch(turn)
+        return sse_response(turn_meta(turn), [turn['response']])
+    
+    def on_complete(text):
+        hint_cache.put(turn['cache_key'], text)
+        start_prefetch(turn)
+    
+    try:
+        chunks = gateway.open_stream(AGENT_NAME, **turn['request'])
+    except GatewayBusy as e:
+        # No meta event, so the page keeps its attempt count
+        return jsonify({'error': str(e)}), 503
+    return sse_response(turn_meta(turn), chunks, on_complete=on_complete, agent=AGENT_NAME)
+
+@app.route('/stats')
+def stats():
+    """Latency, call counts and shared LLM gateway gauges for this agent"""
+    snapshot = metrics.snapshot(prefix=AGENT_NAME + '.')
+    snapshot['gateway'] = gateway.stats()
+    snapshot['routing'] = router.stats()
+    snapshot['prefetch'] = hint_prefetcher.stats()
+    return jsonify(snapshot)
 
 @app.route('/reset', methods=['POST'])
 def reset():
     session.clear()
     return jsonify({'status': 'success'})
 
+@app.route('/hint_cache/stats')
+def hint_cache_stats():
+    """Hit/miss counters for the hint cache"""
+    return jsonify(hint_cache.stats())
+
 @app.route('/matrix/<address_class>')
 def show_matrix(address_class):
-    """Display the subnetting matrix for a specific class"""
-    if address_class not in ['A', 'B', 'C']:
+    """Display the subnetting matrix for a specific class (pre-rendered, see subnet_matrix)"""
+    response = matrix_response(address_class, request)
+    if response is None:
         return "Invalid class", 404
-    
-    # Matrix templates for each class
-    if address_class == 'C':
-        return render_template_string(MATRIX_CLASS_C_TEMPLATE)
-    elif address_class == 'B':
-        return render_template_string(MATRIX_CLASS_B_TEMPLATE)
-    else:  # Class A
-        return render_template_string(MATRIX_CLASS_A_TEMPLATE)
-
-# Matrix templates for standalone pages
-MATRIX_CLASS_C_TEMPLATE = """<!DOCTYPE html>
-<html>
-<head>
-    <title>CLASS C Subnetting Matrix</title>
-    <meta charset="UTF-8">
-    <style>
-        * { margin: 0; padding: 0; box-sizing: border-box; }
-        body {
-            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-            background: linear-gradient(135deg, #1e3c72 0%, #2a5298 100%);
-            min-height: 100vh;
-            padding: 20px;
-        }
-        .container {
-            max-width: 1200px;
-            margin: 0 auto;
-            background: white;
-            border-radius: 15px;
-            padding: 30px;
-            box-shadow: 0 10px 40px rgba(0,0,0,0.3);
-        }
-        h1 { color: #1e3c72; margin-bottom: 10px; }
-        .subtitle { color: #666; margin-bottom: 20px; font-size: 1.1em; }
-        table { width: 100%; border-collapse: collapse; margin: 20px 0; }
-        th { background: #1976D2; color: white; padding: 12px; border: 1px solid #ccc; }
-        td { padding: 10px; border: 1px solid #ccc; text-align: center; }
-        tr:nth-child(even) { background: #f5f5f5; }
-        .info-box {
-            background: #e3f2fd;
-            padding: 15px;
-            border-left: 4px solid #1976D2;
-            margin: 20px 0;
-        }
-        .reminder-box {
-            background: #fff3cd;
-            padding: 15px;
-            border-left: 4px solid #ffc107;
-            margin: 20px 0;
-        }
-    </style>
-</head>
-<body>
-    <div class="container">
-        <h1>🌐 CLASS C Subnetting Matrix</h1>
-        <div class="subtitle">Default Mask: 255.255.255.0 | Available Bits: 8 (4th octet only) | Network: N.N.N.H</div>
-        
-        <div class="info-box">
-            <strong>How to Use This Matrix:</strong>
-            <ol style="margin: 10px 0 0 20px;">
-                <li>Find the row where <strong>2^s</strong> meets or exceeds your subnet requirement</li>
-                <li>Find the row where <strong>2^h - 2</strong> meets or exceeds your usable host requirement</li>
-                <li>Both requirements should be on the <strong>SAME ROW</strong></li>
-                <li>Validate: Subnet bits + Host bits = 8 for Class C</li>
-                <li>Read your custom subnet mask and CAM from that row</li>
-            </ol>
-        </div>
-        
-        <table>
-            <tr>
-                <th>Subnets (2^s)</th>
-                <th>Networks</th>
-                <th>Subnet Bits (s)</th>
-                <th>Host Bits (h)</th>
-                <th>Total Addresses (2^h)</th>
-                <th>Usable Hosts (2^h - 2)</th>
-                <th>Prefix</th>
-                <th>Custom Subnet Mask</th>
-                <th>CAM Pattern</th>
-            </tr>
-            <tr><td>2^0</td><td>1</td><td>0</td><td>8</td><td>256</td><td>254</td><td>/24</td><td>255.255.255.0</td><td>N.N.N.hhhhhhhh</td></tr>
-            <tr><td>2^1</td><td>2</td><td>1</td><td>7</td><td>128</td><td>126</td><td>/25</td><td>255.255.255.128</td><td>N.N.N.shhhhhh</td></tr>
-            <tr><td>2^2</td><td>4</td><td>2</td><td>6</td><td>64</td><td>62</td><td>/26</td><td>255.255.255.192</td><td>N.N.N.sshhhhhh</td></tr>
-            <tr><td>2^3</td><td>8</td><td>3</td><td>5</td><td>32</td><td>30</td><td>/27</td><td>255.255.255.224</td><td>N.N.N.ssshhhhh</td></tr>
-            <tr><td>2^4</td><td>16</td><td>4</td><td>4</td><td>16</td><td>14</td><td>/28</td><td>255.255.255.240</td><td>N.N.N.sssshhhh</td></tr>
-            <tr><td>2^5</td><td>32</td><td>5</td><td>3</td><td>8</td><td>6</td><td>/29</td><td>255.255.255.248</td><td>N.N.N.ssssshh</td></tr>
-            <tr><td>2^6</td><td>64</td><td>6</td><td>2</td><td>4</td><td>2</td><td>/30</td><td>255.255.255.252</td><td>N.N.N.sssssshh</td></tr>
-            <tr><td>2^7</td><td>128</td><td>7</td><td>1</td><td>2</td><td>0</td><td>/31</td><td>255.255.255.254</td><td>N.N.N.sssssssh</td></tr>
-            <tr><td>2^8</td><td>256</td><td>8</td><td>0</td><td>1</td><td>-1</td><td>/32</td><td>255.255.255.255</td><td>N.N.N.ssssssss</td></tr>
-        </table>
-        
-        <div class="reminder-box">
-            <strong>🎯 Professor Bodden's Golden Rules:</strong>
-            <ul style="margin: 10px 0 0 20px;">
-                <li><strong>NEVER forget the minus 2!</strong> First and last addresses are unusable</li>
-                <li>Subnet bits + Host bits MUST equal 8 for Class C</li>
-                <li>If you can't get exact match, round UP to next power of 2</li>
-                <li>255 in mask = Network (can't touch), 0 in mask = Host (where you do math)</li>
-                <li>Write things out if you need to see it!</li>
-            </ul>
-        </div>
-        
-        <div style="text-align: center; margin-top: 30px; color: #666;">
-            <p>Keep this tab open to reference while working on your problem!</p>
-        </div>
-    </div>
-</body>
-</html>"""
+    return response
 
-MATRIX_CLASS_B_TEMPLATE = """<!DOCTYPE html>
-<html>
-<head>
-    <title>CLASS B Subnetting Matrix</title>
-    <meta charset="UTF-8">
-    <style>
-        * { margin: 0; padding: 0; box-sizing: border-box; }
-        body {
-            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-            background: linear-gradient(135deg, #1e3c72 0%, #2a5298 100%);
-            min-height: 100vh;
-            padding: 20px;
-        }
-        .container {
-            max-width: 1400px;
-            margin: 0 auto;
-            background: white;
-            border-radius: 15px;
-            padding: 30px;
-            box-shadow: 0 10px 40px rgba(0,0,0,0.3);
-        }
-        h1 { color: #1e3c72; margin-bottom: 10px; }
-        .subtitle { color: #666; margin-bottom: 20px; font-size: 1.1em; }
-        table { width: 100%; border-collapse: collapse; margin: 20px 0; font-size: 0.9em; }
-        th { background: #1976D2; color: white; padding: 10px; border: 1px solid #ccc; }
-        td { padding: 8px; border: 1px solid #ccc; text-align: center; }
-        tr:nth-child(even) { background: #f5f5f5; }
-        .info-box {
-            background: #e3f2fd;
-            padding: 15px;
-            border-left: 4px solid #1976D2;
-            margin: 20px 0;
-        }
-        .reminder-box {
-            background: #fff3cd;
-            padding: 15px;
-            border-left: 4px solid #ffc107;
-            margin: 20px 0;
-        }
-    </style>
-</head>
-<body>
-    <div class="container">
-        <h1>🌐 CLASS B Subnetting Matrix</h1>
-        <div class="subtitle">Default Mask: 255.255.0.0 | Available Bits: 16 (3rd & 4th octets) | Network: N.N.H.H</div>
-        
-        <div class="info-box">
-            <strong>How to Use This Matrix:</strong>
-            <ol style="margin: 10px 0 0 20px;">
-                <li>Find the row where <strong>2^s</strong> meets or exceeds your subnet requirement</li>
-                <li>Find the row where <strong>2^h - 2</strong> meets or exceeds your usable host requirement</li>
-                <li>Both requirements should be on the <strong>SAME ROW</strong></li>
-                <li>Validate: Subnet bits + Host bits = 16 for Class B</li>
-                <li>Read your custom subnet mask and CAM from that row</li>
-            </ol>
-        </div>
-        
-        <table>
-            <tr>
-                <th>Subnets</th>
-                <th>Networks</th>
-                <th>Subnet Bits</th>
-                <th>Host Bits</th>
-                <th>Usable Hosts</th>
-                <th>Prefix</th>
-                <th>Subnet Mask</th>
-                <th>CAM Pattern</th>
-            </tr>
-            <tr><td>2^0</td><td>1</td><td>0</td><td>16</td><td>65,534</td><td>/16</td><td>255.255.0.0</td><td>N.N.hhhhhhhh.hhhhhhhh</td></tr>
-            <tr><td>2^1</td><td>2</td><td>1</td><td>15</td><td>32,766</td><td>/17</td><td>255.255.128.0</td><td>N.N.shhhhhh.hhhhhhhh</td></tr>
-            <tr><td>2^2</td><td>4</td><td>2</td><td>14</td><td>16,382</td><td>/18</td><td>255.255.192.0</td><td>N.N.sshhhhhh.hhhhhhhh</td></tr>
-            <tr><td>2^3</td><td>8</td><td>3</td><td>13</td><td>8,190</td><td>/19</td><td>255.255.224.0</td><td>N.N.ssshhhhh.hhhhhhhh</td></tr>
-            <tr><td>2^4</td><td>16</td><td>4</td><td>12</td><td>4,094</td><td>/20</td><td>255.255.240.0</td><td>N.N.sssshhhh.hhhhhhhh</td></tr>
-            <tr><td>2^5</td><td>32</td><td>5</td><td>11</td><td>2,046</td><td>/21</td><td>255.255.248.0</td><td>N.N.ssssshh.hhhhhhhh</td></tr>
-            <tr><td>2^6</td><td>64</td><td>6</td><td>10</td><td>1,022</td><td>/22</td><td>255.255.252.0</td><td>N.N.sssssshh.hhhhhhhh</td></tr>
-            <tr><td>2^7</td><td>128</td><td>7</td><td>9</td><td>510</td><td>/23</td><td>255.255.254.0</td><td>N.N.sssssssh.hhhhhhhh</td></tr>
-            <tr><td>2^8</td><td>256</td><td>8</td><td>8</td><td>254</td><td>/24</td><td>255.255.255.0</td><td>N.N.ssssssss.hhhhhhhh</td></tr>
-            <tr><td>2^9</td><td>512</td><td>9</td><td>7</td><td>126</td><td>/25</td><td>255.255.255.128</td><td>N.N.ssssssss.shhhhhh</td></tr>
-            <tr><td>2^10</td><td>1,024</td><td>10</td><td>6</td><td>62</td><td>/26</td><td>255.255.255.192</td><td>N.N.ssssssss.sshhhhhh</td></tr>
-            <tr><td>2^11</td><td>2,048</td><td>11</td><td>5</td><td>30</td><td>/27</td><td>255.255.255.224</td><td>N.N.ssssssss.ssshhhhh</td></tr>
-            <tr><td>2^12</td><td>4,096</td><td>12</td><td>4</td><td>14</td><td>/28</td><td>255.255.255.240</td><td>N.N.ssssssss.sssshhhh</td></tr>
-            <tr><td>2^13</td><td>8,192</td><td>13</td><td>3</td><td>6</td><td>/29</td><td>255.255.255.248</td><td>N.N.ssssssss.ssssshh</td></tr>
-            <tr><td>2^14</td><td>16,384</td><td>14</td><td>2</td><td>2</td><td>/30</td><td>255.255.255.252</td><td>N.N.ssssssss.sssssshh</td></tr>
-            <tr><td>2^15</td><td>32,768</td><td>15</td><td>1</td><td>0</td><td>/31</td><td>255.255.255.254</td><td>N.N.ssssssss.sssssssh</td></tr>
-            <tr><td>2^16</td><td>65,536</td><td>16</td><td>0</td><td>-1</td><td>/32</td><td>255.255.255.255</td><td>N.N.ssssssss.ssssssss</td></tr>
-        </table>
-        
-        <div class="reminder-box">
-            <strong>🎯 Professor Bodden's Golden Rules:</strong>
-            <ul style="margin: 10px 0 0 20px;">
-                <li><strong>NEVER forget the minus 2!</strong> First and last addresses are unusable</li>
-                <li>Subnet bits + Host bits MUST equal 16 for Class B</li>
-                <li>If you can't get exact match, round UP to next power of 2</li>
-                <li>255 in mask = Network (can't touch), 0 in mask = Host (where you do math)</li>
-                <li>Write things out if you need to see it!</li>
-            </ul>
-        </div>
-        
-        <div style="text-align: center; margin-top: 30px; color: #666;">
-            <p>Keep this tab open to reference while working on your problem!</p>
-        </div>
-    </div>
-</body>
-</html>"""
-
-MATRIX_CLASS_A_TEMPLATE = """<!DOCTYPE html>
-<html>
-<head>
-    <title>CLASS A Subnetting Matrix</title>
-    <meta charset="UTF-8">
-    <style>
-        * { margin: 0; padding: 0; box-sizing: border-box; }
-        body {
-            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-            background: linear-gradient(135deg, #1e3c72 0%, #2a5298 100%);
-            min-height: 100vh;
-            padding: 20px;
-        }
-        .container {
-            max-width: 1400px;
-            margin: 0 auto;
-            background: white;
-            border-radius: 15px;
-            padding: 30px;
-            box-shadow: 0 10px 40px rgba(0,0,0,0.3);
-        }
-        h1 { color: #1e3c72; margin-bottom: 10px; }
-        .subtitle { color: #666; margin-bottom: 20px; font-size: 1.1em; }
-        table { width: 100%; border-collapse: collapse; margin: 20px 0; font-size: 0.85em; }
-        th { background: #1976D2; color: white; padding: 8px; border: 1px solid #ccc; }
-        td { padding: 6px; border: 1px solid #ccc; text-align: center; }
-        tr:nth-child(even) { background: #f5f5f5; }
-        .info-box {
-            background: #e3f2fd;
-            padding: 15px;
-            border-left: 4px solid #1976D2;
-            margin: 20px 0;
-        }
-        .reminder-box {
-            background: #fff3cd;
-            padding: 15px;
-            border-left: 4px solid #ffc107;
-            margin: 20px 0;
-        }
-    </style>
-</head>
-<body>
-    <div class="container">
-        <h1>🌐 CLASS A Subnetting Matrix</h1>
-        <div class="subtitle">Default Mask: 255.0.0.0 | Available Bits: 24 (2nd, 3rd & 4th octets) | Network: N.H.H.H</div>
-        
-        <div class="info-box">
-            <strong>How to Use This Matrix:</strong>
-            <ol style="margin: 10px 0 0 20px;">
-                <li>Find the row where <strong>2^s</strong> meets or exceeds your subnet requirement</li>
-                <li>Find the row where <strong>2^h - 2</strong> meets or exceeds your usable host requirement</li>
-                <li>Both requirements should be on the <strong>SAME ROW</strong></li>
-                <li>Validate: Subnet bits + Host bits = 24 for Class A</li>
-                <li>Read your custom subnet mask and CAM from that row</li>
-            </ol>
-        </div>
-        
-        <table>
-            <tr>
-                <th>Subnets</th>
-                <th>Networks</th>
-                <th>Subnet Bits</th>
-                <th>Host Bits</th>
-                <th>Usable Hosts</th>
-                <th>Prefix</th>
-                <th>Subnet Mask</th>
-            </tr>
-            <tr><td>2^0</td><td>1</td><td>0</td><td>24</td><td>16,777,214</td><td>/8</td><td>255.0.0.0</td></tr>
-            <tr><td>2^1</td><td>2</td><td>1</td><td>23</td><td>8,388,606</td><td>/9</td><td>255.128.0.0</td></tr>
-            <tr><td>2^2</td><td>4</td><td>2</td><td>22</td><td>4,194,302</td><td>/10</td><td>255.192.0.0</td></tr>
-            <tr><td>2^3</td><td>8</td><td>3</td><td>21</td><td>2,097,150</td><td>/11</td><td>255.224.0.0</td></tr>
-            <tr><td>2^4</td><td>16</td><td>4</td><td>20</td><td>1,048,574</td><td>/12</td><td>255.240.0.0</td></tr>
-            <tr><td>2^5</td><td>32</td><td>5</td><td>19</td><td>524,286</td><td>/13</td><td>255.248.0.0</td></tr>
-            <tr><td>2^6</td><td>64</td><td>6</td><td>18</td><td>262,142</td><td>/14</td><td>255.252.0.0</td></tr>
-            <tr><td>2^7</td><td>128</td><td>7</td><td>17</td><td>131,070</td><td>/15</td><td>255.254.0.0</td></tr>
-            <tr><td>2^8</td><td>256</td><td>8</td><td>16</td><td>65,534</td><td>/16</td><td>255.255.0.0</td></tr>
-            <tr><td>2^9</td><td>512</td><td>9</td><td>15</td><td>32,766</td><td>/17</td><td>255.255.128.0</td></tr>
-            <tr><td>2^10</td><td>1,024</td><td>10</td><td>14</td><td>16,382</td><td>/18</td><td>255.255.192.0</td></tr>
-            <tr><td>2^11</td><td>2,048</td><td>11</td><td>13</td><td>8,190</td><td>/19</td><td>255.255.224.0</td></tr>
-            <tr><td>2^12</td><td>4,096</td><td>12</td><td>12</td><td>4,094</td><td>/20</td><td>255.255.240.0</td></tr>
-            <tr><td>2^13</td><td>8,192</td><td>13</td><td>11</td><td>2,046</td><td>/21</td><td>255.255.248.0</td></tr>
-            <tr><td>2^14</td><td>16,384</td><td>14</td><td>10</td><td>1,022</td><td>/22</td><td>255.255.252.0</td></tr>
-            <tr><td>2^15</td><td>32,768</td><td>15</td><td>9</td><td>510</td><td>/23</td><td>255.255.254.0</td></tr>
-            <tr><td>2^16</td><td>65,536</td><td>16</td><td>8</td><td>254</td><td>/24</td><td>255.255.255.0</td></tr>
-            <tr><td>2^17</td><td>131,072</td><td>17</td><td>7</td><td>126</td><td>/25</td><td>255.255.255.128</td></tr>
-            <tr><td>2^18</td><td>262,144</td><td>18</td><td>6</td><td>62</td><td>/26</td><td>255.255.255.192</td></tr>
-            <tr><td>2^19</td><td>524,288</td><td>19</td><td>5</td><td>30</td><td>/27</td><td>255.255.255.224</td></tr>
-            <tr><td>2^20</td><td>1,048,576</td><td>20</td><td>4</td><td>14</td><td>/28</td><td>255.255.255.240</td></tr>
-            <tr><td>2^21</td><td>2,097,152</td><td>21</td><td>3</td><td>6</td><td>/29</td><td>255.255.255.248</td></tr>
-            <tr><td>2^22</td><td>4,194,304</td><td>22</td><td>2</td><td>2</td><td>/30</td><td>255.255.255.252</td></tr>
-            <tr><td>2^23</td><td>8,388,608</td><td>23</td><td>1</td><td>0</td><td>/31</td><td>255.255.255.254</td></tr>
-            <tr><td>2^24</td><td>16,777,216</td><td>24</td><td>0</td><td>-1</td><td>/32</td><td>255.255.255.255</td></tr>
-        </table>
-        
-        <div class="reminder-box">
-            <strong>🎯 Professor Bodden's Golden Rules:</strong>
-            <ul style="margin: 10px 0 0 20px;">
-                <li><strong>NEVER forget the minus 2!</strong> First and last addresses are unusable</li>
-                <li>Subnet bits + Host bits MUST equal 24 for Class A</li>
-                <li>If you can't get exact match, round UP to next power of 2</li>
-                <li>255 in mask = Network (can't touch), 0 in mask = Host (where you do math)</li>
-                <li>Write things out if you need to see it!</li>
-            </ul>
-        </div>
-        
-        <div style="text-align: center; margin-top: 30px; color: #666;">
-            <p>Keep this tab open to reference while working on your problem!</p>
-        </div>
-    </div>
-</body>
-</html>"""
+@app.route('/matrix/prefix/<int:prefix>')
+def show_prefix_matrix(prefix):
+    """Subnetting matrix starting from any /1-/30 network"""
+    response = matrix_response(prefix, request)
+    if response is None:
+        return "Invalid prefix", 404
+    return response
 
 if __name__ == '__main__':
     print("=" * 70)
@@ -1161,4 +1072,4 @@ if __name__ == '__main__':
     print("Server starting on http://0.0.0.0:5001")
     print("=" * 70)
     
-    app.run(debug=False, host='0.0.0.0', port=5001, use_reloader=False)
+    serve(app, host='0.0.0.0', port=5001, debug=False, use_reloader=False)
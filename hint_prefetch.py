@@ -0,0 +1,196 @@
+"""
+Hint Prefetch - Speculatively generate the next hint level after a wrong answer
+
+The hint ladders are sequential: after attempt N is wrong, the student will
+either get it right or need the level N+1 hint. While they are typing, the
+level N+1 hint is generated in the background and parked in a per-session
+slot; if the next answer is wrong too, the hint is served instantly.
+
+Off by default (it spends tokens on hints that may never be shown):
+- HINT_PREFETCH=1                     enable
+- HINT_PREFETCH_CONCURRENCY (2)       background calls at once; extra work is skipped, never queued
+- HINT_PREFETCH_TOKENS_PER_HOUR (200000)  speculative token budget per agent
+- HINT_PREFETCH_SLOTS (1000) / HINT_PREFETCH_TTL (600s)  parked results
+Prefetch is also skipped whenever the LLM gateway has a wait queue, so real
+requests always go first.
+
+take() waits on an in-flight prefetch, so async handlers run the code that
+calls it through run_off_loop() instead of blocking the event loop.
+"""
+
+import asyncio
+import contextvars
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from llm_gateway import gateway
+
+
+def prefetch_owner(session):
+    """Stable per-browser id for the prefetch slot"""
+    if 'prefetch_id' not in session:
+        session['prefetch_id'] = secrets.token_hex(8)
+    return session['prefetch_id']
+
+
+async def run_off_loop(func, *args):
+    """func(*args) on the event loop's thread pool, in this context (Flask's request and session included)"""
+    context = contextvars.copy_context()
+    return await asyncio.get_running_loop().run_in_executor(None, context.run, func, *args)
+
+
+def usage_tokens(response):
+    usage = getattr(response, 'usage', None)
+    if usage is None:
+        return 0
+    return ((usage.input_tokens or 0) + (usage.output_tokens or 0)
+            + (getattr(usage, 'cache_read_input_tokens', None) or 0)
+            + (getattr(usage, 'cache_creation_input_tokens', None) or 0))
+
+
+class _Slot:
+    def __init__(self, key):
+        self.key = key
+        self.created = time.monotonic()
+        self.done = threading.Event()
+        self.text = None
+        self.tokens = 0
+        self.wasted = False
+
+
+class HintPrefetcher:
+    """One speculative hint slot per session, under a concurrency and token budget"""
+
+    def __init__(self, agent, enabled=None, max_concurrent=None, tokens_per_hour=None, max_slots=None, ttl_seconds=None):
+        self.agent = agent
+        self.enabled = enabled if enabled is not None else os.environ.get('HINT_PREFETCH', '0') == '1'
+        self.max_concurrent = max_concurrent or int(os.environ.get('HINT_PREFETCH_CONCURRENCY', 2))
+        self.tokens_per_hour = tokens_per_hour or int(os.environ.get('HINT_PREFETCH_TOKENS_PER_HOUR', 200000))
+        self.max_slots = max_slots or int(os.environ.get('HINT_PREFETCH_SLOTS', 1000))
+        self.ttl_seconds = ttl_seconds or float(os.environ.get('HINT_PREFETCH_TTL', 600))
+
+        self._slots = OrderedDict()  # owner -> _Slot
+        self._lock = threading.Lock()
+        self._running = threading.BoundedSemaphore(self.max_concurrent)
+        self._executor = None
+        self._window_start = time.monotonic()
+        self._window_tokens = 0
+        self.counts = {'scheduled': 0, 'skipped_busy': 0, 'skipped_budget': 0, 'hits': 0,
+                       'misses': 0, 'wasted': 0, 'wasted_tokens': 0, 'tokens_used': 0, 'errors': 0}
+
+    # ---------------------------------------------------------------- budget
+
+    def _budget_left(self):
+        now = time.monotonic()
+        if now - self._window_start >= 3600:
+            self._window_start, self._window_tokens = now, 0
+        return self._window_tokens < self.tokens_per_hour
+
+    def _waste(self, slot):
+        """Count a parked result that will never be shown (called with the lock held)"""
+        slot.wasted = True
+        if slot.done.is_set():
+            self.counts['wasted'] += 1
+            self.counts['wasted_tokens'] += slot.tokens
+
+    # ---------------------------------------------------------------- API
+
+    def schedule(self, owner, key, request_kwargs):
+        """Start generating the hint for `key` in the background, if allowed"""
+        if not self.enabled:
+            return
+        with self._lock:
+            current = self._slots.get(owner)
+            if current is not None and current.key == key:
+                return  # Already prefetching exactly this hint
+            if not self._budget_left():
+                self.counts['skipped_budget'] += 1
+                return
+            if gateway.stats()['queue_depth'] > 0 or not self._running.acquire(blocking=False):
+                self.counts['skipped_busy'] += 1
+                return
+
+            if current is not None:
+                self._waste(current)
+            slot = _Slot(key)
+            self._slots[owner] = slot
+            self._slots.move_to_end(owner)
+            while len(self._slots) > self.max_slots:
+                _, evicted = self._slots.popitem(last=False)
+                self._waste(evicted)
+            self.counts['scheduled'] += 1
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_concurrent,
+                                                    thread_name_prefix=f'{self.agent}-prefetch')
+
+        self._executor.submit(self._run, slot, request_kwargs)
+
+    def _run(self, slot, request_kwargs):
+        try:
+            response = gateway.create(f'{self.agent}.prefetch', **request_kwargs)
+            text, tokens = response.content[0].text, usage_tokens(response)
+        except Exception:
+            text, tokens = None, 0
+        finally:
+            self._running.release()
+
+        with self._lock:
+            slot.text, slot.tokens = text, tokens
+            self._window_tokens += tokens
+            self.counts['tokens_used'] += tokens
+            if text is None:
+                self.counts['errors'] += 1
+            slot.done.set()
+            if slot.wasted:
+                # Dropped while it was still being generated
+                self.counts['wasted'] += 1
+                self.counts['wasted_tokens'] += tokens
+
+    def take(self, owner, key, wait_seconds=None):
+        """The prefetched hint for `key`, or None (then generate it normally)
+
+        A prefetch still in flight is waited on briefly - it started well
+        before a fresh call would.
+        """
+        if not self.enabled:
+            return None
+        with self._lock:
+            slot = self._slots.pop(owner, None)
+        if slot is None or slot.key != key or time.monotonic() - slot.created > self.ttl_seconds:
+            with self._lock:
+                self.counts['misses'] += 1
+                if slot is not None:
+                    self._waste(slot)
+            return None
+
+        slot.done.wait(wait_seconds if wait_seconds is not None else 30)
+        with self._lock:
+            if slot.text is None:
+                self.counts['misses'] += 1
+                slot.wasted = not slot.done.is_set()  # Counted when it finishes
+                return None
+            self.counts['hits'] += 1
+            return slot.text
+
+    def discard(self, owner):
+        """Drop the session's slot (e.g. the student answered correctly)"""
+        with self._lock:
+            slot = self._slots.pop(owner, None)
+            if slot is not None:
+                self._waste(slot)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.counts['hits'] + self.counts['misses']
+            stats = dict(self.counts)
+            stats.update({
+                'enabled': self.enabled,
+                'parked': len(self._slots),
+                'hit_rate': round(self.counts['hits'] / lookups, 4) if lookups else 0.0,
+                'budget_left': max(0, self.tokens_per_hour - self._window_tokens)
+            })
+            return stats
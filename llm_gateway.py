@@ -0,0 +1,285 @@
+"""
+LLM Gateway - One shared path to Claude for every tutor agent
+
+All agents call gateway.create(...) / gateway.stream(...) instead of holding
+their own Anthropic client. Behind the synchronous API used by the Flask views
+sits a single asyncio event loop (on a daemon thread) with:
+- one AsyncAnthropic client on a pooled, keep-alive HTTP connection pool
+- at most LLM_MAX_IN_FLIGHT upstream calls at a time
+- a bounded wait queue (LLM_MAX_QUEUE); callers beyond it are rejected
+  immediately with GatewayBusy instead of piling up behind Claude
+
+gateway.open_stream(...) is gateway.stream(...) that raises GatewayBusy before
+it returns, so a /chat_stream view can still answer 503 before any SSE.
+
+Identical requests already in flight are coalesced (single_flight.py): the
+duplicates wait on the first call and share its result, counted as
+<agent>.coalesced. Set LLM_SINGLE_FLIGHT=0 to send every call upstream.
+
+Latency is sampled per agent, per model (model.<model>.llm_ms, which drives
+model_router's fallback) and per route (<agent>.route.<route>.llm_ms) when
+the caller passes route=... .
+
+Queue depth, in-flight count and rejections are reported through tutor_metrics
+under the "gateway." prefix; token usage (including prompt-cache reads and
+writes) is counted per agent as <agent>.input_tokens, <agent>.cache_read_tokens,
+<agent>.cache_write_tokens and <agent>.output_tokens, and the full prompt size
+of every call is sampled as <agent>.prompt_tokens.
+"""
+
+import asyncio
+import os
+import queue
+import threading
+import time
+
+import httpx
+from anthropic import AsyncAnthropic, DefaultAsyncHttpxClient
+
+from single_flight import SingleFlight, fingerprint
+from tutor_metrics import metrics
+
+
+class GatewayBusy(Exception):
+    """Raised when the gateway cannot take another request right now"""
+
+
+class LLMGateway:
+    """Bounded-concurrency front door for every Claude call in the process"""
+
+    def __init__(self, max_in_flight=None, max_queue=None, queue_timeout=None, max_connections=None):
+        self.max_in_flight = max_in_flight or int(os.environ.get('LLM_MAX_IN_FLIGHT', 8))
+        self.max_queue = max_queue if max_queue is not None else int(os.environ.get('LLM_MAX_QUEUE', 32))
+        self.queue_timeout = queue_timeout or float(os.environ.get('LLM_QUEUE_TIMEOUT', 30))
+        self.max_connections = max_connections or int(os.environ.get('LLM_MAX_CONNECTIONS', self.max_in_flight))
+        self.single_flight = os.environ.get('LLM_SINGLE_FLIGHT', '1') != '0'
+
+        self._loop = None
+        self._client = None
+        self._slots = None
+        self._flights = SingleFlight()
+        self._in_flight = 0
+        self._waiting = 0
+        self.rejected = 0
+        self._start_lock = threading.Lock()
+
+    # ---------------------------------------------------------------- lifecycle
+
+    def _ensure_started(self):
+        """Start the event loop thread and client on first use (after .env is loaded)"""
+        if self._loop is not None:
+            return
+        with self._start_lock:
+            if self._loop is not None:
+                return
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name='llm-gateway', daemon=True)
+            thread.start()
+            asyncio.run_coroutine_threadsafe(self._setup(), loop).result()
+            self._loop = loop
+
+    async def _setup(self):
+        # Created inside the loop so the semaphore and connection pool belong to it
+        self._slots = asyncio.Semaphore(self.max_in_flight)
+        self._client = AsyncAnthropic(
+            api_key=os.environ.get("ANTHROPIC_API_KEY"),
+            http_client=DefaultAsyncHttpxClient(
+                limits=httpx.Limits(max_connections=self.max_connections,
+                                    max_keepalive_connections=self.max_connections)
+            )
+        )
+
+    # ---------------------------------------------------------------- admission
+
+    def _update_gauges(self):
+        metrics.set_gauge('gateway.in_flight', self._in_flight)
+        metrics.set_gauge('gateway.queue_depth', self._waiting)
+
+    async def _admit(self, agent):
+        """Take an in-flight slot, waiting in the bounded queue if necessary"""
+        if self._slots.locked() and self._waiting >= self.max_queue:
+            self.rejected += 1
+            metrics.incr('gateway.rejected')
+            metrics.incr(f'{agent}.rejected')
+            raise GatewayBusy("The tutor is helping a lot of students right now - please try again in a moment.")
+
+        self._waiting += 1
+        self._update_gauges()
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            metrics.incr('gateway.queue_timeouts')
+            raise GatewayBusy("Timed out waiting for the tutor - please try again.")
+        finally:
+            self._waiting -= 1
+
+        self._in_flight += 1
+        self._update_gauges()
+
+    def _release(self):
+        self._in_flight -= 1
+        self._slots.release()
+        self._update_gauges()
+
+    # ---------------------------------------------------------------- async core
+
+    def _record_usage(self, agent, usage):
+        """Count uncached, cache-read and cache-write input tokens for an agent"""
+        if usage is None:
+            return
+        cache_read = getattr(usage, 'cache_read_input_tokens', None) or 0
+        cache_write = getattr(usage, 'cache_creation_input_tokens', None) or 0
+        metrics.incr(f'{agent}.input_tokens', usage.input_tokens or 0)
+        metrics.incr(f'{agent}.output_tokens', usage.output_tokens or 0)
+        metrics.incr(f'{agent}.cache_read_tokens', cache_read)
+        metrics.incr(f'{agent}.cache_write_tokens', cache_write)
+        metrics.observe(f'{agent}.prompt_tokens', (usage.input_tokens or 0) + cache_read + cache_write)
+
+    def _coalesced(self, agent):
+        metrics.incr('gateway.coalesced')
+        metrics.incr(f'{agent}.coalesced')
+
+    def _record_latency(self, agent, route, model, elapsed_ms):
+        """Per-agent, per-model (read by model_router) and per-route latency"""
+        metrics.observe(f'{agent}.llm_ms', elapsed_ms)
+        metrics.observe(f'model.{model}.llm_ms', elapsed_ms)
+        if route:
+            metrics.observe(f'{agent}.route.{route}.llm_ms', elapsed_ms)
+
+    async def _create(self, agent, route, request_kwargs):
+        if not self.single_flight:
+            return await self._create_upstream(agent, route, request_kwargs)
+        return await self._flights.call(fingerprint(request_kwargs),
+                                        lambda: self._create_upstream(agent, route, request_kwargs),
+                                        on_coalesced=lambda: self._coalesced(agent))
+
+    async def _stream(self, agent, route, request_kwargs, on_admitted=None):
+        """on_admitted() runs once the call holds an in-flight slot (or has joined an identical stream)"""
+        on_admitted = on_admitted or (lambda: None)
+        if not self.single_flight:
+            chunks = self._stream_upstream(agent, route, request_kwargs, on_admitted)
+        else:
+            def coalesced():
+                self._coalesced(agent)
+                on_admitted()
+            chunks = self._flights.stream(fingerprint(request_kwargs),
+                                          lambda: self._stream_upstream(agent, route, request_kwargs, on_admitted),
+                                          on_coalesced=coalesced)
+        async for text in chunks:
+            yield text
+
+    async def _create_upstream(self, agent, route, request_kwargs):
+        await self._admit(agent)
+        started = time.perf_counter()
+        try:
+            response = await self._client.messages.create(**request_kwargs)
+        except Exception:
+            metrics.incr(f'{agent}.llm_errors')
+            raise
+        finally:
+            self._release()
+        metrics.incr(f'{agent}.llm_calls')
+        self._record_latency(agent, route, request_kwargs.get('model'), (time.perf_counter() - started) * 1000)
+        self._record_usage(agent, getattr(response, 'usage', None))
+        return response
+
+    async def _stream_upstream(self, agent, route, request_kwargs, on_admitted=None):
+        await self._admit(agent)
+        if on_admitted:
+            on_admitted()
+        started = time.perf_counter()
+        try:
+            async with self._client.messages.stream(**request_kwargs) as stream:
+                async for text in stream.text_stream:
+                    yield text
+                final = await stream.get_final_message()
+        except Exception:
+            metrics.incr(f'{agent}.llm_errors')
+            raise
+        finally:
+            self._release()
+        metrics.incr(f'{agent}.llm_calls')
+        self._record_latency(agent, route, request_kwargs.get('model'), (time.perf_counter() - started) * 1000)
+        self._record_usage(agent, final.usage)
+
+    # ---------------------------------------------------------------- public API
+
+    def create(self, agent, route=None, **request_kwargs):
+        """Blocking messages.create() for Flask views; raises GatewayBusy when full
+
+        `route` is the model_router route name, used only for latency reporting.
+        """
+        self._ensure_started()
+        future = asyncio.run_coroutine_threadsafe(self._create(agent, route, request_kwargs), self._loop)
+        return future.result()
+
+    async def acreate(self, agent, route=None, **request_kwargs):
+        """Awaitable messages.create() usable from any event loop"""
+        self._ensure_started()
+        coro = self._create(agent, route, request_kwargs)
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            return await coro
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, self._loop))
+
+    def _start_stream(self, agent, route, request_kwargs):
+        """Run the stream on the gateway loop; (queue of (kind, value) events, future)"""
+        self._ensure_started()
+        chunks = queue.Queue()
+
+        async def pump():
+            try:
+                async for text in self._stream(agent, route, request_kwargs, lambda: chunks.put(('admitted', None))):
+                    chunks.put(('token', text))
+                chunks.put(('done', None))
+            except Exception as e:
+                chunks.put(('error', e))
+
+        return chunks, asyncio.run_coroutine_threadsafe(pump(), self._loop)
+
+    def _drain(self, chunks, future):
+        try:
+            while True:
+                kind, value = chunks.get()
+                if kind == 'token':
+                    yield value
+                elif kind == 'error':
+                    raise value
+                elif kind == 'done':
+                    return
+        finally:
+            future.cancel()  # Browser went away mid-stream: stop reading from Claude
+
+    def stream(self, agent, route=None, **request_kwargs):
+        """Blocking iterator over text deltas from messages.stream()"""
+        yield from self._drain(*self._start_stream(agent, route, request_kwargs))
+
+    def open_stream(self, agent, route=None, **request_kwargs):
+        """stream(), returned only once the call is admitted
+
+        GatewayBusy is raised here instead of from the iterator, so a view can
+        still answer 503 (and undo its bookkeeping) before any SSE is sent.
+        """
+        chunks, future = self._start_stream(agent, route, request_kwargs)
+        kind, value = chunks.get()
+        if kind == 'error':
+            future.cancel()
+            raise value
+        return self._drain(chunks, future)
+
+    def stats(self):
+        return {
+            'max_in_flight': self.max_in_flight,
+            'max_queue': self.max_queue,
+            'in_flight': self._in_flight,
+            'queue_depth': self._waiting,
+            'rejected': self.rejected,
+            'single_flight': self._flights.stats()
+        }
+
+
+# Shared gateway - one per process
+gateway = LLMGateway()
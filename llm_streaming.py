@@ -0,0 +1,63 @@
+"""
+LLM Streaming - Server-Sent Events helpers for the agents' /chat_stream endpoints
+
+Protocol (one SSE event per step):
+    event: meta   -> grading info known before Claude answers (is_correct, attempt, ...)
+    event: token  -> {"text": "..."} incremental reply text
+    event: done   -> timings plus anything the agent adds after the reply is complete
+    event: error  -> {"error": "..."} if the upstream call fails mid-stream
+"""
+
+import json
+import time
+
+from flask import Response, stream_with_context
+
+from tutor_metrics import metrics
+
+
+def sse_event(event, data):
+    """Format one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def sse_response(meta, chunks, on_complete=None, agent=None):
+    """Stream `chunks` to the browser as SSE
+
+    on_complete(full_text) runs after the last token; a dict it returns is merged
+    into the done event. When `agent` is given, time-to-first-token and total
+    latency are recorded as <agent>.ttft_ms / <agent>.total_ms.
+    """
+    def generate():
+        yield sse_event('meta', meta)
+
+        started = time.perf_counter()
+        first_token_at = None
+        parts = []
+        try:
+            for chunk in chunks:
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+                parts.append(chunk)
+                yield sse_event('token', {'text': chunk})
+        except Exception as e:
+            if agent:
+                metrics.incr(f'{agent}.stream_errors')
+            yield sse_event('error', {'error': str(e)})
+            return
+
+        finished = time.perf_counter()
+        ttft_ms = ((first_token_at or finished) - started) * 1000
+        total_ms = (finished - started) * 1000
+        if agent:
+            metrics.observe(f'{agent}.ttft_ms', ttft_ms)
+            metrics.observe(f'{agent}.total_ms', total_ms)
+
+        done = {'ttft_ms': round(ttft_ms, 1), 'total_ms': round(total_ms, 1)}
+        if on_complete:
+            done.update(on_complete(''.join(parts)) or {})
+        yield sse_event('done', done)
+
+    return Response(stream_with_context(generate()),
+                    mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
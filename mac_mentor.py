@@ -1,15 +1,45 @@
-from flask import Flask, render_template_string, request, jsonify
-import anthropic
-import os
+from flask import Flask, request, jsonify
 from dotenv import load_dotenv
+from address_validator import describe, extract_candidates, validate
+from compression_middleware import CompressionMiddleware
+from llm_gateway import GatewayBusy, gateway
+from model_router import router
+from oui_index import mac_prefix_value, vendor_lookup
+from serving import serve
+from template_registry import TemplateRegistry
 
-# Load environment variables from .env file
+# Load environment variables from .env file (the shared gateway reads ANTHROPIC_API_KEY)
 load_dotenv()
 
-# Get API key from environment variable
-client = anthropic.Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
+AGENT_NAME = "mac_mentor"
 
 app = Flask(__name__)
+templates = TemplateRegistry(app)
+app.wsgi_app = CompressionMiddleware(app.wsgi_app, AGENT_NAME)
+
+def mac_facts(message):
+    """Locally checked format and vendor facts for each MAC/OUI in the message"""
+    facts = []
+    for candidate in extract_candidates(message, prefixes=True):
+        verdict = validate(candidate)
+        if verdict.kind != 'mac':
+            continue
+        try:
+            is_oui = mac_prefix_value(candidate)[1] == 24
+            found = vendor_lookup(candidate)
+        except ValueError:
+            facts.append(describe(verdict))
+            continue  # Not enough hex digits for a vendor prefix
+        # A bare OUI ("00:50:56") is a vendor question, not a malformed MAC
+        facts.append(f"{candidate} is an OUI - the first 24 bits of a MAC address" if is_oui else describe(verdict))
+        if found:
+            vendor, bits = found
+            facts.append(f"Vendor of {candidate} (IEEE registry, /{bits} prefix): {vendor}")
+        elif verdict.valid and verdict.details['administration'] == 'locally administered':
+            facts.append(f"Vendor of {candidate}: none - it is locally administered, so no vendor was assigned")
+        else:
+            facts.append(f"Vendor of {candidate}: not in the offline OUI index - say it is unknown, do not guess")
+    return '\n'.join(facts)
 
 def mac_mentor_bot(message):
     """MACMentor 1.0 - Your network study buddy"""
@@ -21,12 +51,21 @@ def mac_mentor_bot(message):
     Always check if given strings are valid MAC addresses (12 hex digits) and explain your reasoning clearly.
     """
     
-    response = client.messages.create(
-        model="claude-3-5-haiku-20241022",
+    # Format and vendor are looked up locally so Claude explains them instead of guessing
+    content = message
+    facts = mac_facts(message)
+    if facts:
+        content += "\n\nLOCAL LOOKUP RESULTS (authoritative - use them, do not contradict them):\n" + facts
+    
+    route = router.route(AGENT_NAME, 'chat')
+    response = gateway.create(
+        AGENT_NAME,
+        route=route.name,
+        model=route.model,
         max_tokens=1000,
         system=system_prompt,
         messages=[
-            {"role": "user", "content": message}
+            {"role": "user", "content": content}
         ]
     )
     return response.content[0].text
@@ -191,7 +230,7 @@ HTML_TEMPLATE = """
             document.getElementById('send-btn').disabled = true;
             
             try {
-                const response = await fetch('/chat', {
+                const response = await fetch('chat', {
                     method: 'POST',
                     headers: {
                         'Content-Type': 'application/json',
@@ -220,9 +259,11 @@ HTML_TEMPLATE = """
 </html>
 """
 
+templates.page('index', HTML_TEMPLATE)
+
 @app.route('/')
 def home():
-    return render_template_string(HTML_TEMPLATE)
+    return templates.serve('index', request)
 
 @app.route('/chat', methods=['POST'])
 def chat():
@@ -238,10 +279,12 @@ def chat():
         
         return jsonify({'response': bot_response})
         
+    except GatewayBusy as e:
+        return jsonify({'error': str(e)}), 503
     except Exception as e:
         return jsonify({'error': str(e)})
 
 if __name__ == '__main__':
     print("Starting MACMentor Web Interface...")
     print("Open your browser and go to: http://localhost:5000")
-    app.run(debug=True, host='localhost', port=5000)
+    serve(app, host='localhost', port=5000, debug=True)
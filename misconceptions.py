@@ -0,0 +1,242 @@
+"""
+Misconceptions - Targeted hints for the usual wrong answers, without an LLM call
+
+Most wrong subnetting answers come from a handful of mistakes: forgetting
+the minus 2, a power of two off by one, the default mask where the custom
+one belongs, a block size counted in the wrong octet, subnet zero left out.
+For each worksheet part the value every such mistake produces is computed
+from the SubnetPlan and parsed into a canonical answer_normalizer Answer, so
+checking a wrong answer is one dict lookup. A hit returns a canned hint that
+names the mistake without giving the answer away; a miss (an unexplained
+wrong answer) falls through to Claude. Both are counted per agent:
+<agent>.misconception_hits / misconception_misses, and the
+<agent>.misconception_hit_rate gauge.
+"""
+
+from functools import lru_cache
+
+from answer_normalizer import compile_answer, parse_as
+from subnet_engine import (CLASS_RANGES, DEFAULT_PREFIX, ORDINAL_PATTERN, PREFIX_MASKS, SubnetPlan, address_map, int_to_ip,
+                           ordinal, prefix_to_mask)
+from tutor_metrics import metrics
+
+OCTET_NAMES = ['first', 'second', 'third', 'fourth']
+
+
+# ---------------------------------------------------------------- catalogues
+# Each returns [(wrong value as text, hint)]; values equal to the right answer are dropped later
+
+def class_mistakes(plan, question):
+    first = plan.network >> 24
+    return [(letter, f"Class {letter} covers first octets {CLASS_RANGES[letter]} - look only at the first octet ({first}) "
+                     f"and check which range it falls in.")
+            for letter in CLASS_RANGES]
+
+
+def default_mask_mistakes(plan, question):
+    mistakes = [(plan.custom_mask, "That's the CUSTOM mask (after borrowing bits). The default mask comes from the class "
+                                   "alone, before any subnetting.")]
+    for letter, prefix in DEFAULT_PREFIX.items():
+        mistakes.append((prefix_to_mask(prefix), f"{prefix_to_mask(prefix)} is the Class {letter} default. Which class is "
+                                                 f"{int_to_ip(plan.network)}? Work that out first."))
+    return mistakes
+
+
+def borrowed_bits_mistakes(plan, question):
+    b, needed = plan.borrowed_bits, plan.subnets_needed
+    mistakes = [
+        (b - 1, f"Close! 2^{b - 1} = {1 << max(b - 1, 0)} subnets is fewer than the {needed} you need - you have to round UP "
+                f"to the next power of 2."),
+        (b + 1, f"Close! That borrows one bit too many - find the SMALLEST power of 2 that is at least {needed}."),
+        (plan.host_bits, "That's the number of host bits LEFT OVER. The question asks how many bits you borrow for subnets."),
+        (plan.prefix, "That's the whole prefix length. Borrowed bits are only the extra bits added to the default mask.")
+    ]
+    return mistakes
+
+
+def host_bits_mistakes(plan, question):
+    default_host_bits = 32 - plan.default_prefix
+    return [
+        (default_host_bits, f"That's how many host bits Class {plan.address_class} starts with - don't forget to take away "
+                            f"the bits you borrowed for subnets."),
+        (plan.borrowed_bits, "That's the number of BORROWED (subnet) bits. Host bits are the ones that are left."),
+        (plan.prefix, "That's the number of network + subnet bits (the prefix). Host bits are 32 minus that."),
+        (plan.host_bits + 1, "Off by one - recount how many bits you borrowed and subtract them from the default host bits."),
+        (plan.host_bits - 1, "Off by one - recount how many bits you borrowed and subtract them from the default host bits.")
+    ]
+
+
+def subnet_count_mistakes(plan, question):
+    b = plan.borrowed_bits
+    return [
+        (plan.subnets_needed, f"{plan.subnets_needed} is how many subnets you NEED. Borrowing bits always creates a power "
+                              f"of 2 subnets - how many do your borrowed bits make?"),
+        (plan.subnet_count - 2, "Subtracting 2 is for usable HOSTS. The number of subnets is just 2 to the power of the "
+                                "borrowed bits (subnet zero counts)."),
+        (1 << max(b - 1, 0), f"That's 2^{b - 1} - check how many bits you borrowed."),
+        (1 << (b + 1), f"That's 2^{b + 1} - check how many bits you borrowed."),
+        (b, "That's the number of borrowed bits. Now raise 2 to that power.")
+    ]
+
+
+def total_addresses_mistakes(plan, question):
+    h = plan.host_bits
+    return [
+        (plan.usable_addresses, "You subtracted 2 - that's for USABLE addresses. Total addresses per subnet is the full "
+                                "2^host bits."),
+        (1 << (h - 1), f"That's 2^{h - 1} - recount the host bits."),
+        (1 << (h + 1), f"That's 2^{h + 1} - recount the host bits."),
+        (plan.subnet_count, "That's the number of SUBNETS. Addresses per subnet come from the host bits, not the "
+                            "borrowed bits."),
+        (h, "That's the number of host bits. Now raise 2 to that power.")
+    ]
+
+
+def usable_addresses_mistakes(plan, question):
+    h = plan.host_bits
+    mistakes = [
+        (plan.total_addresses, "Almost! Never forget the minus 2 - the network ID and the broadcast address can't be "
+                               "given to hosts."),
+        (plan.total_addresses - 1, "Subtract 2, not 1 - both the network ID AND the broadcast address are reserved."),
+        ((1 << (h - 1)) - 2, f"That's 2^{h - 1} - 2 - recount the host bits."),
+        ((1 << (h + 1)) - 2, f"That's 2^{h + 1} - 2 - recount the host bits.")
+    ]
+    if plan.hosts_needed:
+        mistakes.append((plan.hosts_needed, f"{plan.hosts_needed} is how many hosts you NEED. How many usable addresses does "
+                                            f"each subnet actually have with {h} host bits?"))
+    return mistakes
+
+
+def custom_mask_mistakes(plan, question):
+    mistakes = [(plan.default_mask, "That's the DEFAULT mask. The custom mask adds the bits you borrowed for subnets.")]
+    for prefix, change in ((plan.prefix - 1, 'one bit too few'), (plan.prefix + 1, 'one bit too many')):
+        if 0 < prefix < 32:
+            mistakes.append((prefix_to_mask(prefix), f"That mask has {change} - it should have {plan.default_prefix} "
+                                                     f"default bits plus the bits you borrowed."))
+    # Right mask octet value, wrong octet
+    octet = plan.interesting_octet
+    value = PREFIX_MASKS[plan.prefix] >> (8 * (3 - octet)) & 255
+    for wrong in (octet - 1, octet + 1):
+        if 0 <= wrong <= 3 and value not in (0, 255):
+            mask = (PREFIX_MASKS[wrong * 8] | (value << (8 * (3 - wrong)))) & 0xFFFFFFFF
+            mistakes.append((int_to_ip(mask), f"Right value ({value}), wrong octet - the borrowed bits continue right after "
+                                              f"the default mask's 255s, in the {OCTET_NAMES[octet]} octet."))
+    return mistakes
+
+
+def prefix_mistakes(plan, question):
+    return [
+        (plan.default_prefix, f"/{plan.default_prefix} is the default prefix. Add the bits you borrowed."),
+        (plan.prefix - 1, "Off by one - default network bits plus borrowed bits."),
+        (plan.prefix + 1, "Off by one - default network bits plus borrowed bits."),
+        (plan.borrowed_bits, "That's just the borrowed bits. The prefix counts ALL network + subnet bits."),
+        (plan.host_bits, "That's the number of host bits. The prefix is the network + subnet bits.")
+    ]
+
+
+def address_map_mistakes(plan, question):
+    mistakes = []
+    for prefix in (plan.prefix - 1, plan.prefix + 1):
+        if plan.default_prefix <= prefix <= 32:
+            mistakes.append((address_map(plan.default_prefix, prefix),
+                             f"Count your s's - there should be exactly one s for every borrowed bit ({plan.default_prefix} "
+                             f"N bits first, then the s bits, then h)."))
+    mistakes.append((address_map(plan.prefix, plan.prefix),
+                     "The borrowed bits are marked s, not N - N is only the default network bits of the class."))
+    return mistakes
+
+
+def nth_subnet_text(question, subnet_id, size):
+    """An nth-subnet answer (whatever the question asks for) for a block at subnet_id"""
+    lowered = question.lower()
+    broadcast = subnet_id + size - 1
+    if 'broadcast' in lowered:
+        return int_to_ip(broadcast)
+    if 'assignable' in lowered or 'usable' in lowered or 'host' in lowered:
+        return f"{int_to_ip(subnet_id + 1)} to {int_to_ip(broadcast - 1)}"
+    if 'range' in lowered:
+        return f"{int_to_ip(subnet_id)} to {int_to_ip(broadcast)}"
+    return int_to_ip(subnet_id)
+
+
+def nth_subnet_mistakes(plan, question):
+    n = int(ORDINAL_PATTERN.search(question).group(1))
+    size = plan.total_addresses
+    subnet_id = plan.network + (n - 1) * size
+    broadcast = subnet_id + size - 1
+    lowered = question.lower()
+    counting = (f"Subnet zero counts as the 1st subnet, so the {ordinal(n)} subnet starts {n - 1} block(s) of {size} after "
+                f"{int_to_ip(plan.network)} - count the blocks again.")
+    mistakes = [(nth_subnet_text(question, subnet_id + size, size), counting)]
+    if n > 1:
+        mistakes.append((nth_subnet_text(question, subnet_id - size, size), counting))
+    octet = plan.interesting_octet
+    for wrong in (octet - 1, octet + 1):
+        if 0 <= wrong <= 3 and (n - 1):
+            wrong_size = plan.block_size << (8 * (3 - wrong))
+            mistakes.append((nth_subnet_text(question, plan.network + (n - 1) * wrong_size, wrong_size),
+                             f"The block size is {plan.block_size}, but it steps the {OCTET_NAMES[octet]} octet (where the "
+                             f"custom mask stops being 255), not the {OCTET_NAMES[wrong]}."))
+    if 'broadcast' in lowered:
+        mistakes.append((int_to_ip(broadcast + 1), "That's the NEXT subnet's ID. The broadcast is the last address of this "
+                                                   "subnet - one before that."))
+        mistakes.append((int_to_ip(subnet_id), "That's the subnet's network ID (its first address). The broadcast is its "
+                                               "LAST address."))
+    elif 'assignable' in lowered or 'usable' in lowered or 'host' in lowered:
+        mistakes.append((f"{int_to_ip(subnet_id)} to {int_to_ip(broadcast)}", "That's the whole subnet range. The network ID "
+                         "and broadcast can't be assigned - take one address off each end."))
+    elif 'range' in lowered:
+        mistakes.append((f"{int_to_ip(subnet_id + 1)} to {int_to_ip(broadcast - 1)}", "That's the ASSIGNABLE range. The "
+                         "subnet range runs from the network ID through the broadcast address."))
+        mistakes.append((f"{int_to_ip(subnet_id)} to {int_to_ip(broadcast + 1)}", "The range ends one address early - the "
+                         "next subnet's ID is not part of this one."))
+    else:
+        mistakes.append((int_to_ip(broadcast), "That's this subnet's broadcast (its last address). The subnet ID is its "
+                                               "FIRST address."))
+    return mistakes
+
+
+CATALOGUES = {
+    'class': class_mistakes,
+    'default_mask': default_mask_mistakes,
+    'borrowed_bits': borrowed_bits_mistakes,
+    'host_bits': host_bits_mistakes,
+    'subnet_count': subnet_count_mistakes,
+    'total_addresses': total_addresses_mistakes,
+    'usable_addresses': usable_addresses_mistakes,
+    'custom_mask': custom_mask_mistakes,
+    'prefix': prefix_mistakes,
+    'address_map': address_map_mistakes,
+    'nth_subnet': nth_subnet_mistakes
+}
+
+
+@lru_cache(maxsize=1024)
+def catalogue(network_address, subnets_needed, hosts_needed, concept, correct, question=None):
+    """{canonical wrong Answer: hint} for one worksheet part (built once per part, then cached)"""
+    plan = SubnetPlan(network_address, subnets_needed, hosts_needed)
+    expected = compile_answer(correct)
+    hints = {}
+    for value, hint in CATALOGUES[concept](plan, question):
+        if isinstance(value, int) and value < 0:
+            continue
+        answer = parse_as(expected.kind, str(value))
+        if answer is not None and answer != expected:
+            hints.setdefault(answer, hint)  # The first (most common) explanation wins
+    return hints
+
+
+def misconception_hint(problem, concept, user_answer, correct, question=None):
+    """Canned hint when the wrong answer is a known mistake, else None"""
+    hints = catalogue(problem['network_address'], problem['subnets_needed'], problem.get('hosts_needed'),
+                      concept, correct, question)
+    parsed = parse_as(compile_answer(correct).kind, user_answer)
+    return hints.get(parsed) if parsed is not None else None
+
+
+def record(agent, hit):
+    """Count a hit (canned hint served) or miss (sent to Claude) and update the hit-rate gauge"""
+    metrics.incr(f'{agent}.misconception_{"hits" if hit else "misses"}')
+    counters = metrics.snapshot(prefix=f'{agent}.misconception_')['counters']
+    hits, misses = counters.get(f'{agent}.misconception_hits', 0), counters.get(f'{agent}.misconception_misses', 0)
+    metrics.set_gauge(f'{agent}.misconception_hit_rate', round(hits / (hits + misses), 3))
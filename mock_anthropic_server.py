@@ -0,0 +1,282 @@
+"""
+Mock Anthropic Server - Local stand-in for the Messages API (POST /v1/messages)
+
+Lets every agent run with no network and no API key, so the Flask side can be
+load-tested and benchmarked on a laptop. Point the agents at it with:
+
+    python mock_anthropic_server.py --port 8765 --latency lognormal:800:0.5
+    export ANTHROPIC_BASE_URL=http://localhost:8765
+    export ANTHROPIC_API_KEY=mock
+
+Supports:
+- non-streaming and streaming (SSE) responses in the real event format
+- latency distributions: fixed:MS, uniform:LO:HI, normal:MEAN:SD, lognormal:MEDIAN:SIGMA
+  (applied before the first token) plus a per-token delay for streams
+- error injection: --rate-429, --rate-529 and --rate-timeout (fraction of requests)
+- canned or templated replies from a JSON file of {"match": regex, "response": template}
+  rules; templates can use {model}, {last_user}, {attempt}, {hint_level} and {agent_hint}
+- usage accounting, including cache reads/writes for cache_control blocks
+
+Counters are at GET /mock/stats.
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+import uuid
+
+from flask import Flask, Response, jsonify, request, stream_with_context
+
+app = Flask(__name__)
+
+DEFAULT_REPLY = ("Good effort! Let's look at this step by step. Which octet of the subnet mask changes "
+                 "here, and what is 256 minus its value? That gives you the block size. (mock reply to: {last_user})")
+
+CONFIG = {
+    'latency': 'fixed:0',
+    'token_delay_ms': 0.0,
+    'rate_429': 0.0,
+    'rate_529': 0.0,
+    'rate_timeout': 0.0,
+    'timeout_seconds': 60.0,
+    'rules': [],
+    'seed': None
+}
+
+STATS = {'requests': 0, 'streams': 0, 'errors_429': 0, 'errors_529': 0, 'timeouts': 0}
+STATS_LOCK = threading.Lock()
+SEEN_CACHE_PREFIXES = set()
+RNG = random.Random()
+
+
+class SafeDict(dict):
+    """format_map() helper that leaves unknown {placeholders} untouched"""
+
+    def __missing__(self, key):
+        return '{' + key + '}'
+
+
+def count(name):
+    with STATS_LOCK:
+        STATS[name] += 1
+
+
+def parse_latency(spec):
+    """Turn 'kind:arg:arg' into a function returning a delay in seconds"""
+    kind, *args = spec.split(':')
+    args = [float(a) for a in args]
+    if kind == 'fixed':
+        return lambda: args[0] / 1000
+    if kind == 'uniform':
+        return lambda: RNG.uniform(args[0], args[1]) / 1000
+    if kind == 'normal':
+        return lambda: max(0.0, RNG.gauss(args[0], args[1])) / 1000
+    if kind == 'lognormal':
+        return lambda: RNG.lognormvariate(math.log(max(args[0], 1e-3)), args[1]) / 1000
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+
+def load_rules(path):
+    """Compile the templated response rules, first match wins"""
+    with open(path, encoding='utf-8') as f:
+        rules = json.load(f)
+    return [(re.compile(rule['match'], re.IGNORECASE | re.DOTALL), rule['response']) for rule in rules]
+
+
+def block_text(content):
+    """Plain text of a string or list of content blocks"""
+    if isinstance(content, str):
+        return content
+    return '\n'.join(block.get('text', '') for block in content if block.get('type', 'text') == 'text')
+
+
+def estimate_tokens(text):
+    return max(1, len(text) // 4)
+
+
+def build_reply(body):
+    """Pick and fill the reply template for this request"""
+    messages = body.get('messages', [])
+    last_user = block_text(messages[-1]['content']) if messages else ''
+    system_text = block_text(body.get('system', ''))
+    prompt = system_text + '\n' + last_user
+
+    fields = SafeDict(
+        model=body.get('model', ''),
+        last_user=' '.join(last_user.split())[:200],
+        attempt=(re.search(r'Attempt:?\s*(\d+)', last_user, re.IGNORECASE) or [None, '?'])[1],
+        hint_level=(re.search(r'Level\s*(\d)', last_user) or [None, '?'])[1],
+        agent_hint=(system_text.strip().splitlines() or [''])[0][:80]
+    )
+    for pattern, template in CONFIG['rules']:
+        if pattern.search(prompt):
+            return template.format_map(fields)
+    return DEFAULT_REPLY.format_map(fields)
+
+
+def usage_for(body, reply):
+    """Token usage, treating cache_control prefixes seen before as cache reads"""
+    usage = {'input_tokens': 0, 'output_tokens': estimate_tokens(reply),
+             'cache_creation_input_tokens': 0, 'cache_read_input_tokens': 0}
+
+    blocks = body.get('system', [])
+    if isinstance(blocks, str):
+        blocks = [{'type': 'text', 'text': blocks}]
+    for message in body.get('messages', []):
+        content = message['content']
+        blocks = blocks + ([{'type': 'text', 'text': content}] if isinstance(content, str) else content)
+
+    prefix, pending = hashlib.sha256(), 0
+    for block in blocks:
+        prefix.update(block.get('text', '').encode('utf-8') + b'\x1f')
+        pending += estimate_tokens(block.get('text', ''))
+        if block.get('cache_control'):
+            key = prefix.hexdigest()
+            with STATS_LOCK:
+                hit = key in SEEN_CACHE_PREFIXES
+                SEEN_CACHE_PREFIXES.add(key)
+            usage['cache_read_input_tokens' if hit else 'cache_creation_input_tokens'] += pending
+            pending = 0
+    usage['input_tokens'] += pending
+    return usage
+
+
+def error_response(status, error_type, message):
+    body = {'type': 'error', 'error': {'type': error_type, 'message': message}}
+    response = jsonify(body)
+    response.status_code = status
+    if status == 429:
+        response.headers['retry-after'] = '1'
+    return response
+
+
+def sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def stream_reply(body, reply, usage):
+    """The Messages API streaming event sequence for one text block"""
+    message_id = f"msg_mock_{uuid.uuid4().hex[:20]}"
+    start_usage = dict(usage, output_tokens=1)
+
+    yield sse('message_start', {'type': 'message_start', 'message': {
+        'id': message_id, 'type': 'message', 'role': 'assistant', 'model': body.get('model', ''),
+        'content': [], 'stop_reason': None, 'stop_sequence': None, 'usage': start_usage}})
+    yield sse('content_block_start', {'type': 'content_block_start', 'index': 0,
+                                      'content_block': {'type': 'text', 'text': ''}})
+    for token in re.findall(r'\S+\s*|\s+', reply):
+        if CONFIG['token_delay_ms']:
+            time.sleep(CONFIG['token_delay_ms'] / 1000)
+        yield sse('content_block_delta', {'type': 'content_block_delta', 'index': 0,
+                                          'delta': {'type': 'text_delta', 'text': token}})
+    yield sse('content_block_stop', {'type': 'content_block_stop', 'index': 0})
+    yield sse('message_delta', {'type': 'message_delta',
+                                'delta': {'stop_reason': 'end_turn', 'stop_sequence': None},
+                                'usage': {'output_tokens': usage['output_tokens']}})
+    yield sse('message_stop', {'type': 'message_stop'})
+
+
+@app.route('/v1/messages', methods=['POST'])
+def messages():
+    body = request.get_json(force=True)
+    count('requests')
+
+    # Error injection happens before any latency, like a real front door rejecting
+    roll = RNG.random()
+    if roll < CONFIG['rate_429']:
+        count('errors_429')
+        return error_response(429, 'rate_limit_error', 'Mock rate limit exceeded')
+    roll -= CONFIG['rate_429']
+    if roll < CONFIG['rate_529']:
+        count('errors_529')
+        return error_response(529, 'overloaded_error', 'Mock server overloaded')
+    roll -= CONFIG['rate_529']
+    if roll < CONFIG['rate_timeout']:
+        count('timeouts')
+        time.sleep(CONFIG['timeout_seconds'])
+        return error_response(504, 'timeout_error', 'Mock request timed out')
+
+    time.sleep(CONFIG['delay']())
+    reply = build_reply(body)
+    usage = usage_for(body, reply)
+
+    if body.get('stream'):
+        count('streams')
+        return Response(stream_with_context(stream_reply(body, reply, usage)),
+                        mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
+
+    return jsonify({
+        'id': f"msg_mock_{uuid.uuid4().hex[:20]}",
+        'type': 'message',
+        'role': 'assistant',
+        'model': body.get('model', ''),
+        'content': [{'type': 'text', 'text': reply}],
+        'stop_reason': 'end_turn',
+        'stop_sequence': None,
+        'usage': usage
+    })
+
+
+@app.route('/v1/messages/count_tokens', methods=['POST'])
+def count_tokens():
+    body = request.get_json(force=True)
+    usage = usage_for(body, '')
+    return jsonify({'input_tokens': usage['input_tokens'] + usage['cache_read_input_tokens']
+                    + usage['cache_creation_input_tokens']})
+
+
+@app.route('/mock/stats')
+def mock_stats():
+    with STATS_LOCK:
+        return jsonify(dict(STATS, cached_prefixes=len(SEEN_CACHE_PREFIXES)))
+
+
+def configure(latency=None, token_delay_ms=None, rate_429=None, rate_529=None, rate_timeout=None,
+              timeout_seconds=None, responses=None, seed=None):
+    """Apply settings (also usable when embedding the mock in a benchmark script)"""
+    updates = {'latency': latency, 'token_delay_ms': token_delay_ms, 'rate_429': rate_429,
+               'rate_529': rate_529, 'rate_timeout': rate_timeout, 'timeout_seconds': timeout_seconds,
+               'seed': seed}
+    CONFIG.update({k: v for k, v in updates.items() if v is not None})
+    if responses:
+        CONFIG['rules'] = load_rules(responses)
+    if CONFIG['seed'] is not None:
+        RNG.seed(CONFIG['seed'])
+    CONFIG['delay'] = parse_latency(CONFIG['latency'])
+
+
+configure()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Local mock of the Anthropic Messages API")
+    parser.add_argument('--host', default=os.environ.get('MOCK_HOST', '127.0.0.1'))
+    parser.add_argument('--port', type=int, default=int(os.environ.get('MOCK_PORT', 8765)))
+    parser.add_argument('--latency', default=os.environ.get('MOCK_LATENCY', 'fixed:0'),
+                        help="fixed:MS | uniform:LO:HI | normal:MEAN:SD | lognormal:MEDIAN:SIGMA")
+    parser.add_argument('--token-delay-ms', type=float, default=float(os.environ.get('MOCK_TOKEN_DELAY_MS', 0)))
+    parser.add_argument('--rate-429', type=float, default=float(os.environ.get('MOCK_RATE_429', 0)))
+    parser.add_argument('--rate-529', type=float, default=float(os.environ.get('MOCK_RATE_529', 0)))
+    parser.add_argument('--rate-timeout', type=float, default=float(os.environ.get('MOCK_RATE_TIMEOUT', 0)))
+    parser.add_argument('--timeout-seconds', type=float, default=float(os.environ.get('MOCK_TIMEOUT_SECONDS', 60)))
+    parser.add_argument('--responses', default=os.environ.get('MOCK_RESPONSES'),
+                        help="JSON file of {\"match\": regex, \"response\": template} rules")
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    configure(latency=args.latency, token_delay_ms=args.token_delay_ms, rate_429=args.rate_429,
+              rate_529=args.rate_529, rate_timeout=args.rate_timeout, timeout_seconds=args.timeout_seconds,
+              responses=args.responses, seed=args.seed)
+
+    print("=" * 60)
+    print("Mock Anthropic Messages API")
+    print(f"Listening on http://{args.host}:{args.port}")
+    print(f"Point the agents at it: ANTHROPIC_BASE_URL=http://localhost:{args.port}")
+    print("=" * 60)
+    app.run(host=args.host, port=args.port, threaded=True, debug=False, use_reloader=False)
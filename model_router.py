@@ -0,0 +1,121 @@
+"""
+Model Router - Pick the Claude model per agent, hint level and message type
+
+Every call site asks the router for a Route instead of hard-coding a model:
+
+    route = router.route(AGENT_NAME, 'hint', level=attempt)
+    gateway.create(AGENT_NAME, route=route.name, model=route.model, ...)
+
+Message kinds: 'hint' (wrong answer, with level 1-5), 'correct' (feedback on a
+right answer), 'question' (free-form question) and 'chat' (general assistant).
+
+Rules are matched in order, first match wins; each may name a faster fallback
+model. When the primary model's recent p95 latency exceeds
+MODEL_FALLBACK_P95_MS, its traffic moves to the fallback - except every
+MODEL_FALLBACK_PROBE_EVERY-th request, which keeps measuring the primary so
+routing recovers once it is fast again.
+
+Override the rules with MODEL_ROUTES=path/to/routes.json, a list like
+    [{"agent": "vlsm", "kind": "question", "model": "...", "fallback": "..."},
+     {"kind": "hint", "levels": [1, 2], "model": "..."}]
+("agent" and "kind" default to any; "levels" to all).
+"""
+
+import json
+import os
+import threading
+from collections import namedtuple
+
+from tutor_metrics import metrics
+
+SONNET = "claude-sonnet-4-20250514"
+HAIKU = "claude-3-5-haiku-20241022"
+
+DEFAULT_RULES = [
+    # Gentle nudges and "what formula applies" - the fast model is plenty
+    {"kind": "hint", "levels": [1, 2], "model": HAIKU},
+    # Worked steps and full explanations
+    {"kind": "hint", "model": SONNET, "fallback": HAIKU},
+    {"kind": "correct", "model": HAIKU},
+    {"kind": "question", "model": SONNET, "fallback": HAIKU},
+    {"kind": "chat", "model": HAIKU}
+]
+
+Route = namedtuple('Route', ['name', 'model'])
+
+
+def model_latency_metric(model):
+    return f'model.{model}.llm_ms'
+
+
+class ModelRouter:
+    """Rule table plus p95-based fallback"""
+
+    def __init__(self, rules=None, p95_threshold_ms=None, window=None, min_samples=None, probe_every=None):
+        self.rules = rules or self._load_rules()
+        self.p95_threshold_ms = p95_threshold_ms or float(os.environ.get('MODEL_FALLBACK_P95_MS', 10000))
+        self.window = window or int(os.environ.get('MODEL_FALLBACK_WINDOW', 50))
+        self.min_samples = min_samples or int(os.environ.get('MODEL_FALLBACK_MIN_SAMPLES', 10))
+        self.probe_every = probe_every or int(os.environ.get('MODEL_FALLBACK_PROBE_EVERY', 10))
+        self._degraded_calls = {}  # model -> requests routed while it is slow
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _load_rules():
+        path = os.environ.get('MODEL_ROUTES')
+        if not path:
+            return DEFAULT_RULES
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+
+    def _match(self, agent, kind, level):
+        for rule in self.rules:
+            if rule.get('agent', agent) != agent or rule.get('kind', kind) != kind:
+                continue
+            if level is not None and 'levels' in rule and level not in rule['levels']:
+                continue
+            return rule
+        return {"model": SONNET}
+
+    def primary(self, agent, kind, level=None):
+        """The rule's primary model, ignoring fallback (stable - safe for cache keys)"""
+        return self._match(agent, kind, level)['model']
+
+    def is_slow(self, model):
+        """True when the model's recent p95 is over the threshold"""
+        if metrics.count(model_latency_metric(model), last=self.window) < self.min_samples:
+            return False
+        p95 = metrics.percentile(model_latency_metric(model), 95, last=self.window)
+        return p95 is not None and p95 > self.p95_threshold_ms
+
+    def route(self, agent, kind, level=None):
+        """The Route (name for latency reporting, model) for one call"""
+        rule = self._match(agent, kind, level)
+        model = rule['model']
+        name = kind if level is None else f'{kind}{min(level, 5)}'
+
+        fallback = rule.get('fallback')
+        if fallback and self.is_slow(model):
+            with self._lock:
+                calls = self._degraded_calls.get(model, 0) + 1
+                self._degraded_calls[model] = calls
+            if calls % self.probe_every:
+                metrics.incr(f'{agent}.route_fallbacks')
+                return Route(f'{name}.{fallback}', fallback)
+        return Route(f'{name}.{model}', model)
+
+    def stats(self):
+        """Current latency and fallback state of every model in the rule table"""
+        models = {rule['model'] for rule in self.rules} | {rule['fallback'] for rule in self.rules if rule.get('fallback')}
+        report = {}
+        for model in sorted(models):
+            report[model] = {
+                'p95_ms': metrics.percentile(model_latency_metric(model), 95, last=self.window),
+                'samples': metrics.count(model_latency_metric(model), last=self.window),
+                'slow': self.is_slow(model)
+            }
+        return {'threshold_p95_ms': self.p95_threshold_ms, 'models': report}
+
+
+# Shared router - one per process
+router = ModelRouter()
@@ -0,0 +1,199 @@
+"""
+OUI Index - Offline MAC vendor lookup from a memory-mapped prefix table
+
+The first 24, 28 or 36 bits of a MAC address identify the vendor the IEEE
+assigned the block to (MA-L, MA-M and MA-S registries). The index is a small
+binary file of sorted prefixes, one section per prefix length, that is
+memory-mapped and searched with bisect - lookups take microseconds and only
+the pages actually touched are ever read into memory.
+
+The project ships a curated seed (oui_vendors.csv) and builds oui_index.bin
+from it on first use. For the full registry, download the IEEE CSVs
+(oui.csv, mam.csv, oui36.csv from standards-oui.ieee.org) and run:
+
+    python oui_index.py build oui.csv mam.csv oui36.csv -o oui_index_full.bin
+    export OUI_INDEX_PATH=oui_index_full.bin
+
+File layout (little-endian): 'OUIX' magic, version, three (offset, count)
+section headers for 36/28/24-bit prefixes, 16-byte records
+(prefix u64, name offset u32, name length u32) sorted by prefix, then the
+UTF-8 vendor names.
+"""
+
+import argparse
+import bisect
+import csv
+import mmap
+import os
+import re
+import struct
+import threading
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SEED_CSV = os.path.join(HERE, 'oui_vendors.csv')
+DEFAULT_INDEX = os.path.join(HERE, 'oui_index.bin')
+
+MAGIC = b'OUIX'
+VERSION = 1
+PREFIX_BITS = (36, 28, 24)  # Longest match first
+HEADER = struct.Struct('<4sH2x' + 'II' * len(PREFIX_BITS))
+RECORD = struct.Struct('<QII')
+
+REGISTRY_BITS = {'MA-L': 24, 'MA-M': 28, 'MA-S': 36}
+MAC_SEPARATORS = re.compile(r'[:.\-\s]')
+HEX_DIGITS = re.compile(r'^[0-9A-Fa-f]{6,12}$')
+
+
+def mac_prefix_value(mac):
+    """(48-bit value, known bits) for a full MAC or just its leading digits ("00:50:56")"""
+    digits = MAC_SEPARATORS.sub('', mac)
+    if not HEX_DIGITS.match(digits):
+        raise ValueError(f"Not a MAC address or OUI: {mac}")
+    return int(digits.ljust(12, '0'), 16), 4 * len(digits)
+
+
+# ---------------------------------------------------------------- building
+
+def read_registry_csv(path):
+    """(prefix bits, prefix value, vendor) rows from an IEEE-format registry CSV"""
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        for row in csv.DictReader(f):
+            assignment = row['Assignment'].strip()
+            bits = REGISTRY_BITS.get(row.get('Registry', '').strip(), 4 * len(assignment))
+            if bits not in PREFIX_BITS or len(assignment) * 4 != bits:
+                continue
+            yield bits, int(assignment, 16), ' '.join(row['Organization Name'].split())
+
+
+def build_index(csv_paths, out_path):
+    """Write a sorted binary index from one or more registry CSVs (later files win on duplicates)"""
+    entries = {}
+    for path in csv_paths:
+        for bits, prefix, vendor in read_registry_csv(path):
+            entries[(bits, prefix)] = vendor
+
+    names = bytearray()
+    sections = []
+    for bits in PREFIX_BITS:
+        records = bytearray()
+        prefixes = sorted(prefix for (b, prefix) in entries if b == bits)
+        for prefix in prefixes:
+            encoded = entries[(bits, prefix)].encode('utf-8')
+            records += RECORD.pack(prefix, len(names), len(encoded))
+            names += encoded
+        sections.append((records, len(prefixes)))
+
+    offset = HEADER.size
+    header_fields = []
+    for records, count in sections:
+        header_fields += [offset, count]
+        offset += len(records)
+
+    tmp_path = f"{out_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, *header_fields))
+        for records, _ in sections:
+            f.write(records)
+        f.write(names)
+    os.replace(tmp_path, out_path)  # Readers never see a half-written index
+    return len(entries)
+
+
+# ---------------------------------------------------------------- lookups
+
+class _Prefixes:
+    """Sequence view of one section's sorted prefixes, for bisect"""
+
+    def __init__(self, buffer, offset, count):
+        self.buffer, self.offset, self.count = buffer, offset, count
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, i):
+        return struct.unpack_from('<Q', self.buffer, self.offset + i * RECORD.size)[0]
+
+
+class OUIIndex:
+    """Read-only, memory-mapped vendor index"""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, *fields = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not an OUI index (version {VERSION})")
+        self.path = path
+        self._sections = {}
+        names_offset = HEADER.size
+        for bits, offset, count in zip(PREFIX_BITS, fields[::2], fields[1::2]):
+            self._sections[bits] = _Prefixes(self._map, offset, count)
+            names_offset = max(names_offset, offset + count * RECORD.size)
+        self._names_offset = names_offset
+
+    def __len__(self):
+        return sum(len(section) for section in self._sections.values())
+
+    def lookup(self, mac):
+        """(vendor, prefix bits) for the longest registered prefix of `mac`, or None"""
+        value, known_bits = mac_prefix_value(mac)
+        for bits in PREFIX_BITS:
+            if bits > known_bits:
+                continue
+            prefixes = self._sections[bits]
+            prefix = value >> (48 - bits)
+            i = bisect.bisect_left(prefixes, prefix)
+            if i < len(prefixes) and prefixes[i] == prefix:
+                _, name_offset, name_length = RECORD.unpack_from(self._map, prefixes.offset + i * RECORD.size)
+                start = self._names_offset + name_offset
+                return self._map[start:start + name_length].decode('utf-8'), bits
+        return None
+
+    def close(self):
+        self._map.close()
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index():
+    """The shared index: OUI_INDEX_PATH if set, else oui_index.bin (rebuilt from the seed CSV when stale)"""
+    global _index
+    with _index_lock:
+        if _index is None:
+            path = os.environ.get('OUI_INDEX_PATH')
+            if not path:
+                path = DEFAULT_INDEX
+                if not os.path.exists(path) or os.path.getmtime(path) < os.path.getmtime(SEED_CSV):
+                    build_index([SEED_CSV], path)
+            _index = OUIIndex(path)
+        return _index
+
+
+def vendor_lookup(mac):
+    """(vendor, prefix bits) or None - see OUIIndex.lookup"""
+    return get_index().lookup(mac)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Build or query the MAC vendor (OUI) index")
+    commands = parser.add_subparsers(dest='command', required=True)
+    build = commands.add_parser('build', help="Build an index from IEEE registry CSVs (oui.csv, mam.csv, oui36.csv)")
+    build.add_argument('csv', nargs='+')
+    build.add_argument('-o', '--output', default=DEFAULT_INDEX)
+    lookup = commands.add_parser('lookup', help="Look up the vendor of one or more MAC addresses")
+    lookup.add_argument('mac', nargs='+')
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        count = build_index(args.csv, args.output)
+        print(f"Wrote {count} prefixes to {args.output}")
+    else:
+        index = get_index()
+        for mac in args.mac:
+            started = time.perf_counter()
+            found = index.lookup(mac)
+            elapsed_us = (time.perf_counter() - started) * 1e6
+            print(f"{mac}: {found[0] + f' (/{found[1]})' if found else 'not in index'}  [{elapsed_us:.1f} us]")
@@ -0,0 +1,68 @@
+"""
+Prompt Cache - Helpers for sending the static prompt text as cacheable content blocks
+
+Blocks marked with cache_control are cached by the API for ~5 minutes, so repeat
+calls during a class session skip re-processing the long SYSTEM_PROMPT and the
+per-problem context. A prefix shorter than the model's minimum (1024 tokens for
+Sonnet, 2048 for Haiku 3.5) is never cached, so given the model, breakpoints are
+only placed once the estimated prefix reaches it - the ~950-token mask hint
+prompts on Haiku go out as plain text blocks.
+"""
+
+from conversation_window import estimate_tokens
+
+EPHEMERAL = {"type": "ephemeral"}
+# Shortest cacheable prefix per model family (first match wins), in tokens
+MIN_CACHEABLE_TOKENS = [('haiku-4-5', 4096), ('haiku', 2048)]
+DEFAULT_MIN_CACHEABLE_TOKENS = 1024
+
+
+def min_cacheable_tokens(model):
+    for family, tokens in MIN_CACHEABLE_TOKENS:
+        if model and family in model:
+            return tokens
+    return DEFAULT_MIN_CACHEABLE_TOKENS
+
+
+def cacheable_text(text):
+    """One text block with a cache breakpoint after it"""
+    return {"type": "text", "text": text, "cache_control": EPHEMERAL}
+
+
+def cacheable_system(*texts, model=None):
+    """System prompt as text blocks, most static first; a block gets a breakpoint once the prefix is long enough to cache"""
+    blocks = []
+    prefix_tokens = 0
+    for text in texts:
+        if not text:
+            continue
+        prefix_tokens += estimate_tokens(text)
+        blocks.append(cacheable_text(text) if prefix_tokens >= min_cacheable_tokens(model)
+                      else {"type": "text", "text": text})
+    return blocks
+
+
+def mark_last_message(messages, model=None, system=()):
+    """Copy of a conversation with a cache breakpoint on its last message
+
+    Each turn writes the whole conversation so far to the cache; the next turn
+    reads that prefix back and only the new messages are processed. With
+    `model`, the breakpoint is left off while system + messages are still
+    under its minimum.
+    """
+    if not messages:
+        return messages
+    prefix_tokens = estimate_tokens(list(system)) + sum(estimate_tokens(m['content']) for m in messages)
+    if prefix_tokens < min_cacheable_tokens(model):
+        return messages
+    marked = list(messages[:-1])
+    last = dict(messages[-1])
+    content = last['content']
+    if isinstance(content, str):
+        last['content'] = [cacheable_text(content)]
+    else:
+        blocks = [dict(block) for block in content]
+        blocks[-1]['cache_control'] = EPHEMERAL
+        last['content'] = blocks
+    marked.append(last)
+    return marked
@@ -0,0 +1,185 @@
+"""
+Question Generator - Unlimited seeded practice questions for every QUIZ_BANK topic
+
+generate(quiz_type, seed) builds one question in the same wording as the
+Canvas QUIZ_BANK entries, with its answer computed up front from integer
+math (subnet_engine), so no LLM is involved in writing or grading it. The
+same (quiz_type, seed) always gives the same question, so a student's
+practice question can be replayed exactly from its seed.
+
+QuestionPool keeps a pre-generated deque per topic; take() pops one in
+constant time and tops the deque up on a background thread when it runs low.
+- QUESTION_POOL_SIZE (256)       questions kept ready per topic
+- QUESTION_POOL_LOW_WATER (64)   refill once a topic drops below this
+- QUESTION_POOL_SEED             first seed (random per process if unset)
+"""
+
+import os
+import random
+import threading
+from collections import deque
+
+from subnet_engine import DEFAULT_PREFIX, PREFIX_MASKS, int_to_ip, prefix_to_mask
+
+# First-octet ranges per class (0 and 127 are left out - they are reserved)
+FIRST_OCTETS = {'A': (1, 126), 'B': (128, 191), 'C': (192, 223), 'D': (224, 239), 'E': (240, 255)}
+
+OCTET_NAMES = ['First', 'Second', 'Third', 'Fourth']
+
+
+def octet_list(names):
+    """['First', 'Second'] -> 'First and Second octets' (QUIZ_BANK wording)"""
+    if len(names) == 1:
+        return f"{names[0]} octet"
+    if len(names) == 2:
+        return f"{names[0]} and {names[1]} octets"
+    return f"{', '.join(names[:-1])}, and {names[-1]} octets"
+
+
+def random_address(rng, cls):
+    first = rng.randint(*FIRST_OCTETS[cls])
+    return (first << 24) | rng.getrandbits(24)
+
+
+def classful_address(rng):
+    """A class A, B or C address and its default prefix"""
+    cls = rng.choice('ABC')
+    return random_address(rng, cls), DEFAULT_PREFIX[cls]
+
+
+# ---------------------------------------------------------------- generators
+# Each takes a random.Random and returns (question text, answer)
+
+def binary_to_decimal(rng):
+    value = rng.randint(0, 255)
+    return f"Convert Binary to Decimal: {value:08b}", str(value)
+
+
+def decimal_to_binary(rng):
+    value = rng.randint(0, 255)
+    return f"Convert Decimal to Binary: {value}", f"{value:08b}"
+
+
+def class_identification(rng):
+    cls = rng.choices('ABCDE', weights=(3, 3, 3, 1, 1))[0]
+    return f"Identify the class type: {int_to_ip(random_address(rng, cls))}", cls
+
+
+def default_subnet_mask(rng):
+    value, prefix = classful_address(rng)
+    return f"Default Subnet Mask for: {int_to_ip(value)}", prefix_to_mask(prefix)
+
+
+def network_portion(rng):
+    value = classful_address(rng)[0]
+    prefix = rng.choice((8, 16, 24))  # Like the Canvas bank, the mask is not always the classful one
+    return (f"Identify network portion: {int_to_ip(value)} with mask {prefix_to_mask(prefix)}",
+            int_to_ip(value & PREFIX_MASKS[prefix]))
+
+
+def host_portion(rng):
+    value = classful_address(rng)[0]
+    prefix = rng.choice((8, 16, 24))
+    return (f"Identify host portion: {int_to_ip(value)} with mask {prefix_to_mask(prefix)}",
+            int_to_ip(value & ~PREFIX_MASKS[prefix] & 0xFFFFFFFF))
+
+
+def network_octets(rng):
+    value, prefix = classful_address(rng)
+    return f"Identify network portion octet: {int_to_ip(value)}", octet_list(OCTET_NAMES[:prefix // 8])
+
+
+def host_octets(rng):
+    value, prefix = classful_address(rng)
+    return f"Identify host portion octet: {int_to_ip(value)}", octet_list(OCTET_NAMES[prefix // 8:])
+
+
+# Keyed exactly like QUIZ_BANK
+GENERATORS = {
+    'binary_to_decimal': binary_to_decimal,
+    'decimal_to_binary': decimal_to_binary,
+    'address_classification_identification': class_identification,
+    'identify_default_subnet_mask': default_subnet_mask,
+    'Identify_network_address_portion': network_portion,
+    'identify_host_address_portion': host_portion,
+    'ipv4_network_identification': network_octets,
+    'ipv4_host_identification': host_octets
+}
+
+
+def generate(quiz_type, seed):
+    """One practice question dict for the topic, fully determined by (quiz_type, seed)"""
+    rng = random.Random(f"{quiz_type}:{seed}")
+    question, answer = GENERATORS[quiz_type](rng)
+    return {'question': f"Practice #{seed}: {question}", 'answer': answer, 'seed': seed, 'generated': True}
+
+
+# ---------------------------------------------------------------- pool
+
+class QuestionPool:
+    """Pre-generated questions per topic, refilled in the background"""
+
+    def __init__(self, size=None, low_water=None, seed=None):
+        self.size = size or int(os.environ.get('QUESTION_POOL_SIZE', 256))
+        self.low_water = min(low_water or int(os.environ.get('QUESTION_POOL_LOW_WATER', 64)), self.size)
+        if seed is None:
+            seed = os.environ.get('QUESTION_POOL_SEED')
+        self.first_seed = int(seed) if seed is not None else random.SystemRandom().randrange(1 << 31)
+
+        self._queues = {quiz_type: deque() for quiz_type in GENERATORS}
+        self._next_seed = dict.fromkeys(GENERATORS, self.first_seed)
+        self._refilling = set()
+        self._lock = threading.Lock()
+        self.counts = {'served': 0, 'generated': 0, 'refills': 0, 'empty': 0}
+        for quiz_type in GENERATORS:
+            self._fill(quiz_type)
+
+    def _fill(self, quiz_type):
+        """Top one topic up to `size` (seeds are reserved under the lock, generated outside it)"""
+        with self._lock:
+            missing = self.size - len(self._queues[quiz_type])
+            start = self._next_seed[quiz_type]
+            self._next_seed[quiz_type] += max(missing, 0)
+        questions = [generate(quiz_type, seed) for seed in range(start, start + max(missing, 0))]
+        with self._lock:
+            self._queues[quiz_type].extend(questions)
+            self.counts['generated'] += len(questions)
+
+    def _refill(self, quiz_type):
+        try:
+            self._fill(quiz_type)
+        finally:
+            with self._lock:
+                self._refilling.discard(quiz_type)
+
+    def take(self, quiz_type):
+        """Next ready question for the topic, or None for a topic with no generator"""
+        if quiz_type not in GENERATORS:
+            return None
+        with self._lock:
+            queue = self._queues[quiz_type]
+            question = queue.popleft() if queue else None
+            if len(queue) < self.low_water and quiz_type not in self._refilling:
+                self._refilling.add(quiz_type)
+                self.counts['refills'] += 1
+                threading.Thread(target=self._refill, args=(quiz_type,), daemon=True).start()
+            if question is None:
+                self.counts['empty'] += 1
+                seed = self._next_seed[quiz_type]
+                self._next_seed[quiz_type] += 1
+            self.counts['served'] += 1
+        # Drained faster than the refill thread could keep up - generate this one inline
+        return question or generate(quiz_type, seed)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': self.size,
+                'low_water': self.low_water,
+                'first_seed': self.first_seed,
+                'ready': {quiz_type: len(queue) for quiz_type, queue in self._queues.items()},
+                **self.counts
+            }
+
+
+question_pool = QuestionPool()
@@ -0,0 +1,230 @@
+"""
+Serving - Run a tutor app under a production WSGI server instead of app.run()
+
+Every agent ends in serve(app, ...) instead of app.run(...). The server is
+chosen with TUTOR_SERVER or --server on the command line:
+- dev       Flask's development server, as before (the default; keeps the
+            agent's own debug/reloader settings)
+- waitress  threaded server, pure Python, works on Windows/Spyder
+            (pip install waitress)
+- gunicorn  pre-fork server, Linux/macOS only (pip install gunicorn); each
+            worker is a separate process with its own gateway, caches and
+            /stats, so LLM_MAX_IN_FLIGHT applies per worker. Per-student
+            state is per worker too: a hint prefetch parked in another
+            worker is simply missed, but Subnet Ranges keeps conversation
+            histories in memory (CONVERSATIONS), so an app that sets
+            app.config['SINGLE_PROCESS'] (and the unified host mounting it)
+            refuses --workers above 1 - scale it with --threads instead
+
+    python vlsm_tutor_agent_5.py --server waitress --threads 16
+    TUTOR_SERVER=gunicorn TUTOR_WORKERS=2 TUTOR_THREADS=16 python mac_mentor.py
+
+Settings (flag / environment, default):
+- --workers  TUTOR_WORKERS    1     gunicorn processes
+- --threads  TUTOR_THREADS    40    request threads (per gunicorn worker); the
+                                    default is LLM_MAX_IN_FLIGHT + LLM_MAX_QUEUE
+- --keepalive TUTOR_KEEPALIVE 5     seconds an idle keep-alive connection stays open
+                                    (waitress: its channel_timeout)
+- --timeout  TUTOR_TIMEOUT    120   gunicorn only: seconds before a stuck worker is
+                                    restarted (above the longest Claude stream);
+                                    waitress has no per-request limit, so setting
+                                    it there prints a warning and does nothing
+- --host / --port override the agent's own
+
+A Claude call blocks its request thread for seconds, so threads - not CPU or
+workers - bound throughput: about threads / (Claude latency) requests per
+second. With enough threads for every in-flight and queued gateway call,
+requests wait in the gateway's bounded queue (503 when full) rather than in
+the server's backlog, and page loads still get a thread. `python serving.py
+bench` measures the curve with the Claude call replaced by
+mock_anthropic_server at a fixed latency.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+
+SERVERS = ('dev', 'waitress', 'gunicorn')
+# One thread for every call the gateway will run or queue
+DEFAULT_THREADS = int(os.environ.get('LLM_MAX_IN_FLIGHT', 8)) + int(os.environ.get('LLM_MAX_QUEUE', 32))
+
+
+def add_arguments(parser):
+    parser.add_argument('--server', choices=SERVERS, default=os.environ.get('TUTOR_SERVER', 'dev'))
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('TUTOR_WORKERS', 1)))
+    parser.add_argument('--threads', type=int, default=int(os.environ.get('TUTOR_THREADS', DEFAULT_THREADS)))
+    parser.add_argument('--keepalive', type=int, default=int(os.environ.get('TUTOR_KEEPALIVE', 5)))
+    # None = not set, so serve() can tell the user when waitress has to ignore it
+    parser.add_argument('--timeout', type=int, default=int(os.environ['TUTOR_TIMEOUT']) if os.environ.get('TUTOR_TIMEOUT') else None)
+    parser.add_argument('--host')
+    parser.add_argument('--port', type=int)
+    return parser
+
+
+def server_options(argv=None):
+    """Serving flags from the command line (unknown arguments are left alone)"""
+    parser = add_arguments(argparse.ArgumentParser(add_help=False))
+    return parser.parse_known_args(sys.argv[1:] if argv is None else argv)[0]
+
+
+def serve(app, host='localhost', port=5000, options=None, single_process=None, **dev_options):
+    """Run `app` (a Flask app or any WSGI callable) on the configured server; dev_options go to the dev server only
+
+    single_process (default: the app's SINGLE_PROCESS config) is why the app
+    must not be split across gunicorn workers.
+    """
+    options = options or server_options()
+    host = options.host or host
+    port = options.port or port
+    if single_process is None:
+        single_process = getattr(app, 'config', {}).get('SINGLE_PROCESS')
+    if single_process and options.server == 'gunicorn' and options.workers > 1:
+        raise SystemExit(f"--workers {options.workers}: {single_process}, so each worker would see only "
+                         f"some of a student's requests - use --workers 1 and raise --threads")
+
+    if options.server == 'waitress':
+        from waitress import serve as waitress_serve
+        if options.timeout is not None:
+            print(f"warning: --timeout {options.timeout} is ignored - waitress has no per-request time limit "
+                  f"(idle connections close after --keepalive {options.keepalive} s)", file=sys.stderr)
+        print(f"waitress on http://{host}:{port} ({options.threads} threads)")
+        # channel_timeout only closes connections with no request in progress: waitress's keep-alive
+        waitress_serve(app, host=host, port=port, threads=options.threads, channel_timeout=options.keepalive,
+                       ident='tutor')
+    elif options.server == 'gunicorn':
+        run_gunicorn(app, host, port, options)
+    elif hasattr(app, 'run'):
+        dev_options.setdefault('threaded', True)
+        app.run(host=host, port=port, **dev_options)
+    else:
+        from werkzeug.serving import run_simple
+        run_simple(host, port, app, threaded=True, **dev_options)
+
+
+def run_gunicorn(app, host, port, options):
+    from gunicorn.app.base import BaseApplication
+
+    config = {
+        'bind': f'{host}:{port}',
+        'workers': options.workers,
+        'threads': options.threads,
+        'worker_class': 'gthread' if options.threads > 1 else 'sync',
+        'keepalive': options.keepalive,
+        'timeout': options.timeout or 120,
+        'graceful_timeout': 30
+    }
+
+    class TutorApplication(BaseApplication):
+        """The already-imported app; workers fork after import, before any Claude call"""
+
+        def load_config(self):
+            for key, value in config.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return app
+
+    print(f"gunicorn on http://{host}:{port} ({options.workers} workers x {options.threads} threads)")
+    TutorApplication().run()
+
+
+# ---------------------------------------------------------------- benchmark
+
+def wait_until_up(url, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=2):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise TimeoutError(f"{url} not up after {timeout} s")
+
+
+def mac_question(n):
+    # Distinct messages, so single-flight doesn't coalesce them into one upstream call
+    return {'message': f'Which vendor owns 00:1A:2B:{n >> 8 & 255:02X}:{n & 255:02X}:00? (#{n})'}
+
+
+def run_load(url, requests, concurrency, make_body=mac_question, is_ok=lambda reply: 'error' not in reply):
+    """POST `requests` distinct chat bodies from `concurrency` clients; (req/s, p50 ms, p95 ms, errors)"""
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    counter = iter(range(requests))
+
+    def client():
+        while True:
+            with lock:
+                n = next(counter, None)
+            if n is None:
+                return
+            body = json.dumps(make_body(n))
+            started = time.perf_counter()
+            try:
+                request = urllib.request.Request(url, body.encode(), {'Content-Type': 'application/json'})
+                with urllib.request.urlopen(request, timeout=120) as response:
+                    ok = response.status == 200 and is_ok(json.loads(response.read()))
+            except OSError:
+                ok = False
+            with lock:
+                latencies.append((time.perf_counter() - started) * 1000)
+                errors[0] += not ok
+
+    started = time.perf_counter()
+    clients = [threading.Thread(target=client) for _ in range(concurrency)]
+    for thread in clients:
+        thread.start()
+    for thread in clients:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return (requests / elapsed, latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.95) - 1], errors[0])
+
+
+def bench(latency_ms=500, requests=192, concurrency=32, base_port=5200):
+    """Throughput vs server configuration for MACMentor's /chat against a fixed-latency fake Claude"""
+    here = os.path.dirname(os.path.abspath(__file__))
+    mock_port = base_port
+    env = dict(os.environ, ANTHROPIC_BASE_URL=f'http://127.0.0.1:{mock_port}', ANTHROPIC_API_KEY='mock',
+               LLM_MAX_IN_FLIGHT='256', LLM_MAX_QUEUE='256')  # Measure the server, not the gateway limit
+    mock = subprocess.Popen([sys.executable, 'mock_anthropic_server.py', '--port', str(mock_port),
+                             '--latency', f'fixed:{latency_ms}'], cwd=here, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    configs = [('dev', 1, 1), ('waitress', 1, 4), ('waitress', 1, 8), ('waitress', 1, 16), ('waitress', 1, 32),
+               ('gunicorn', 1, 8), ('gunicorn', 2, 8), ('gunicorn', 4, 8), ('gunicorn', 1, 32)]
+    print(f"MACMentor /chat, fake Claude {latency_ms} ms, {requests} requests from {concurrency} clients\n")
+    print(f"{'server':10} {'workers':>7} {'threads':>7} {'req/s':>7} {'p50 ms':>8} {'p95 ms':>8} {'errors':>6}")
+    try:
+        wait_until_up(f'http://127.0.0.1:{mock_port}/mock/stats')
+        for port, (server, workers, threads) in enumerate(configs, base_port + 1):
+            code = (f"import mac_mentor, serving; serving.serve(mac_mentor.app, '127.0.0.1', {port}, "
+                    f"serving.server_options(['--server', '{server}', '--workers', '{workers}', '--threads', '{threads}']))")
+            process = subprocess.Popen([sys.executable, '-c', code], cwd=here, env=env,
+                                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            try:
+                wait_until_up(f'http://127.0.0.1:{port}/')
+                throughput, p50, p95, errors = run_load(f'http://127.0.0.1:{port}/chat', requests, concurrency)
+                shown = 'n/a' if server == 'dev' else threads
+                print(f"{server:10} {workers:7} {shown:>7} {throughput:7.1f} {p50:8.0f} {p95:8.0f} {errors:6}")
+            finally:
+                process.terminate()
+                process.wait()
+    finally:
+        mock.terminate()
+        mock.wait()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Throughput vs WSGI server configuration")
+    parser.add_argument('command', choices=['bench'])
+    parser.add_argument('--latency-ms', type=int, default=500)
+    parser.add_argument('--requests', type=int, default=192)
+    parser.add_argument('--concurrency', type=int, default=32)
+    args = parser.parse_args()
+    bench(args.latency_ms, args.requests, args.concurrency)
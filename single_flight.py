@@ -0,0 +1,129 @@
+"""
+Single Flight - Coalesce identical in-flight Claude requests
+
+When a whole class opens the same part at once, many students send the exact
+same prompt within a second or two. The first caller for a fingerprint (the
+leader) makes the upstream call; everyone who arrives while it is still running
+waits on that call and shares its result instead of sending a duplicate.
+
+Everything here runs on the LLM gateway's event loop.
+"""
+
+import asyncio
+import hashlib
+import json
+
+
+def fingerprint(request_kwargs):
+    """Stable hash of a messages request (model, system, messages, limits, ...)"""
+    encoded = json.dumps(request_kwargs, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+class _Flight:
+    """One upstream stream being replayed to every subscriber"""
+
+    def __init__(self):
+        self.chunks = []
+        self.finished = False
+        self.error = None
+        self.subscribers = 0
+        self.task = None
+        self.changed = asyncio.Condition()
+
+    async def publish(self, chunk=None, finished=False, error=None):
+        async with self.changed:
+            if chunk is not None:
+                self.chunks.append(chunk)
+            self.finished = self.finished or finished
+            self.error = self.error or error
+            self.changed.notify_all()
+
+
+class SingleFlight:
+    """Per-fingerprint de-duplication for one-shot calls and token streams"""
+
+    def __init__(self):
+        self._calls = {}    # fingerprint -> asyncio.Task
+        self._streams = {}  # fingerprint -> _Flight
+        self.leaders = 0
+        self.coalesced = 0
+
+    async def call(self, key, make_call, on_coalesced=None):
+        """Await make_call(), or the identical call already in flight"""
+        task = self._calls.get(key)
+        if task is None:
+            self.leaders += 1
+            task = asyncio.ensure_future(make_call())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._calls.pop(key, None))
+        else:
+            self.coalesced += 1
+            if on_coalesced:
+                on_coalesced()
+        # shield: a caller that goes away must not cancel the call for the others
+        return await asyncio.shield(task)
+
+    async def stream(self, key, make_stream, on_coalesced=None):
+        """Async iterator over make_stream()'s chunks, shared with identical streams
+
+        Late subscribers get the chunks produced so far first. The upstream
+        stream is cancelled once nobody is listening any more.
+        """
+        flight = self._streams.get(key)
+        if flight is None:
+            self.leaders += 1
+            flight = _Flight()
+            self._streams[key] = flight
+            flight.task = asyncio.ensure_future(self._pump(key, flight, make_stream))
+        else:
+            self.coalesced += 1
+            if on_coalesced:
+                on_coalesced()
+
+        flight.subscribers += 1
+        try:
+            position = 0
+            while True:
+                async with flight.changed:
+                    await flight.changed.wait_for(
+                        lambda: position < len(flight.chunks) or flight.finished or flight.error)
+                    pending = flight.chunks[position:]
+                    finished, error = flight.finished, flight.error
+                position += len(pending)
+                for chunk in pending:
+                    yield chunk
+                if position == len(flight.chunks):
+                    if error:
+                        raise error
+                    if finished:
+                        return
+        finally:
+            flight.subscribers -= 1
+            if flight.subscribers == 0 and not flight.finished:
+                if self._streams.get(key) is flight:
+                    del self._streams[key]
+                flight.task.cancel()
+
+    async def _pump(self, key, flight, make_stream):
+        try:
+            async for chunk in make_stream():
+                await flight.publish(chunk)
+            await flight.publish(finished=True)
+        except asyncio.CancelledError:
+            await flight.publish(error=ConnectionAbortedError("Upstream stream cancelled"))
+            raise
+        except Exception as e:
+            await flight.publish(error=e)
+        finally:
+            # New arrivals start a fresh flight once this one is over
+            if self._streams.get(key) is flight:
+                del self._streams[key]
+
+    def stats(self):
+        total = self.leaders + self.coalesced
+        return {
+            'upstream_calls': self.leaders,
+            'coalesced': self.coalesced,
+            'coalesce_rate': round(self.coalesced / total, 4) if total else 0.0
+        }
@@ -0,0 +1,289 @@
+"""
+Subnet Engine - Integer-math IPv4 subnetting for the tutor answer keys
+
+Every value the subnetting worksheets ask for - class, default mask, borrowed
+bits, host bits, subnet count, block size, the nth subnet's ID / broadcast /
+usable range and the N.N.N.sssshhhh address map - derived from 32-bit
+integers and precomputed /0-/32 prefix tables. No LLM involved, so answers
+and level-5 explanations are produced locally in microseconds.
+
+Worksheet layouts:
+- range_answer_key(problem)  -> part1..part12 (subnet_range_tutor_agent_5)
+- mask_answer_key(problem)   -> part1..part10 (custom_subnet_mask_assignments)
+"""
+
+import re
+
+# Precomputed prefix tables, indexed by prefix length 0-32
+PREFIX_MASKS = tuple((0xFFFFFFFF << (32 - p)) & 0xFFFFFFFF for p in range(33))
+PREFIX_WILDCARDS = tuple(mask ^ 0xFFFFFFFF for mask in PREFIX_MASKS)
+PREFIX_SIZES = tuple(1 << (32 - p) for p in range(33))
+
+DEFAULT_PREFIX = {'A': 8, 'B': 16, 'C': 24}
+CLASS_RANGES = {'A': '1-126', 'B': '128-191', 'C': '192-223', 'D': '224-239', 'E': '240-255'}
+
+ORDINAL_PATTERN = re.compile(r'(\d+)(?:st|nd|rd|th)\s+subnet', re.IGNORECASE)
+
+
+def ip_to_int(address):
+    """Dotted quad -> 32-bit integer"""
+    octets = [int(octet) for octet in address.strip().split('.')]
+    if len(octets) != 4 or any(octet < 0 or octet > 255 for octet in octets):
+        raise ValueError(f"Not an IPv4 address: {address}")
+    return (octets[0] << 24) | (octets[1] << 16) | (octets[2] << 8) | octets[3]
+
+
+def int_to_ip(value):
+    """32-bit integer -> dotted quad"""
+    return f"{value >> 24 & 255}.{value >> 16 & 255}.{value >> 8 & 255}.{value & 255}"
+
+
+def prefix_to_mask(prefix):
+    return int_to_ip(PREFIX_MASKS[prefix])
+
+
+def address_class(value):
+    """Classful address class from the first octet"""
+    first = value >> 24
+    if first < 128:
+        return 'A'
+    if first < 192:
+        return 'B'
+    if first < 224:
+        return 'C'
+    if first < 240:
+        return 'D'
+    return 'E'
+
+
+def bits_needed(count):
+    """Smallest b with 2**b >= count"""
+    return max(0, int(count) - 1).bit_length()
+
+
+def address_map(default_prefix, prefix):
+    """N.N.N.sssshhhh notation for a split - whole network/host octets collapse to N/H"""
+    octets = []
+    for index in range(4):
+        bits = ''
+        for bit in range(index * 8, index * 8 + 8):
+            bits += 'N' if bit < default_prefix else ('s' if bit < prefix else 'h')
+        if bits == 'N' * 8:
+            octets.append('N')
+        elif bits == 'h' * 8:
+            octets.append('H')
+        else:
+            octets.append(bits)
+    return '.'.join(octets)
+
+
+def ordinal(n):
+    if 10 <= n % 100 <= 20:
+        return f"{n}th"
+    return f"{n}{ {1: 'st', 2: 'nd', 3: 'rd'}.get(n % 10, 'th')}"
+
+
+class SubnetPlan:
+    """A classful network split into equal subnets by borrowing host bits"""
+
+    def __init__(self, network_address, subnets_needed, hosts_needed=None):
+        self.network = ip_to_int(network_address)
+        self.address_class = address_class(self.network)
+        if self.address_class not in DEFAULT_PREFIX:
+            raise ValueError(f"Class {self.address_class} addresses are not subnetted")
+        if subnets_needed < 0:
+            raise ValueError(f"{subnets_needed} subnets needed - the count cannot be negative")
+
+        self.subnets_needed = subnets_needed
+        self.hosts_needed = hosts_needed
+        self.default_prefix = DEFAULT_PREFIX[self.address_class]
+        self.borrowed_bits = bits_needed(subnets_needed)
+        self.prefix = self.default_prefix + self.borrowed_bits
+        self.host_bits = 32 - self.prefix
+        if self.host_bits < 2:
+            raise ValueError(f"{subnets_needed} subnets leave no usable hosts")
+        if hosts_needed is not None and PREFIX_SIZES[self.prefix] - 2 < hosts_needed:
+            raise ValueError(f"{subnets_needed} subnets of {hosts_needed} hosts do not fit in {network_address}")
+
+        self.subnet_count = 1 << self.borrowed_bits
+        self.total_addresses = PREFIX_SIZES[self.prefix]
+        self.usable_addresses = self.total_addresses - 2
+        # The octet where the subnet/host boundary falls, and the block size in it
+        self.interesting_octet = min(3, self.prefix // 8) if self.prefix % 8 else max(0, self.prefix // 8 - 1)
+        self.block_size = (self.total_addresses >> (8 * (3 - self.interesting_octet))) or 1
+
+    @property
+    def default_mask(self):
+        return prefix_to_mask(self.default_prefix)
+
+    @property
+    def custom_mask(self):
+        return prefix_to_mask(self.prefix)
+
+    def subnet_id(self, n):
+        """Network address of the nth subnet (1-based, subnet zero is the 1st)"""
+        if not 1 <= n <= self.subnet_count:
+            raise ValueError(f"There is no {ordinal(n)} subnet (only {self.subnet_count})")
+        return self.network + (n - 1) * self.total_addresses
+
+    def broadcast(self, n):
+        return self.subnet_id(n) + self.total_addresses - 1
+
+    def subnet_range(self, n):
+        return f"{int_to_ip(self.subnet_id(n))} to {int_to_ip(self.broadcast(n))}"
+
+    def usable_range(self, n):
+        return f"{int_to_ip(self.subnet_id(n) + 1)} to {int_to_ip(self.broadcast(n) - 1)}"
+
+    def address_map(self):
+        return address_map(self.default_prefix, self.prefix)
+
+
+# ---------------------------------------------------------------- worksheets
+
+def nth_subnet_answer(plan, question):
+    """Answer a "What is the <n>th subnet ..." question"""
+    match = ORDINAL_PATTERN.search(question)
+    if not match:
+        raise ValueError(f"No subnet number in question: {question}")
+    n = int(match.group(1))
+    lowered = question.lower()
+    if 'broadcast' in lowered:
+        return int_to_ip(plan.broadcast(n))
+    if 'assignable' in lowered or 'usable' in lowered or 'host' in lowered:
+        return plan.usable_range(n)
+    if 'range' in lowered:
+        return plan.subnet_range(n)
+    return int_to_ip(plan.subnet_id(n))
+
+
+def plan_for(problem):
+    return SubnetPlan(problem['network_address'], problem['subnets_needed'], problem.get('hosts_needed'))
+
+
+def range_answer_key(problem):
+    """part1..part12 for a subnet range problem"""
+    plan = plan_for(problem)
+    key = {
+        'part1': plan.address_class,
+        'part2': plan.default_mask,
+        'part3': str(plan.borrowed_bits),
+        'part4': str(plan.host_bits),
+        'part5': str(plan.subnet_count),
+        'part6': str(plan.total_addresses),
+        'part7': str(plan.usable_addresses),
+        'part8': plan.custom_mask
+    }
+    for number in range(9, 13):
+        question = problem['questions'][f'q{number}']
+        key[f'part{number}'] = nth_subnet_answer(plan, question)
+    return key
+
+
+def mask_answer_key(problem):
+    """part1..part10 for a custom subnet mask problem"""
+    plan = plan_for(problem)
+    return {
+        'part1': plan.address_class,
+        'part2': plan.default_mask,
+        'part3': str(plan.borrowed_bits),
+        'part4': str(plan.host_bits),
+        'part5': str(plan.subnet_count),
+        'part6': str(plan.total_addresses),
+        'part7': str(plan.usable_addresses),
+        'part8': plan.custom_mask,
+        'part9': str(plan.prefix),
+        'part10': plan.address_map()
+    }
+
+
+def key_mismatches(problems, answer_key):
+    """[(problem_id, part, typed, derived)] wherever a hand-typed key disagrees with the engine"""
+    mismatches = []
+    for problem_id, problem in problems.items():
+        derived = answer_key(problem)
+        for part, typed in problem['answers'].items():
+            if part in derived and typed.strip() != derived[part]:
+                mismatches.append((problem_id, part, typed, derived[part]))
+    return mismatches
+
+
+def derive_answer_keys(problems, answer_key):
+    """{problem_id: derived key}, warning about any hand-typed key that disagrees"""
+    for problem_id, part, typed, derived in key_mismatches(problems, answer_key):
+        print(f"[WARN] Problem {problem_id} {part}: typed answer {typed!r} != subnet engine {derived!r} (using the engine's)")
+    return {problem_id: answer_key(problem) for problem_id, problem in problems.items()}
+
+
+# ---------------------------------------------------------------- explanations
+
+def explain(plan, concept, question=None):
+    """Step-by-step worked answer (plain text, one step per line) for one concept
+
+    concept: class, default_mask, borrowed_bits, host_bits, subnet_count,
+    total_addresses, usable_addresses, custom_mask, prefix, address_map, nth_subnet
+    """
+    first_octet = plan.network >> 24
+    default_host_bits = 32 - plan.default_prefix
+    powers = ', '.join(f"2^{b}={1 << b}" for b in range(max(0, plan.borrowed_bits - 1), plan.borrowed_bits + 1))
+
+    if concept == 'class':
+        return (f"The first octet is {first_octet}.\n"
+                f"Class {plan.address_class} covers first octets {CLASS_RANGES[plan.address_class]}.\n"
+                f"Answer: Class {plan.address_class}")
+    if concept == 'default_mask':
+        return (f"Class {plan.address_class} uses the first {plan.default_prefix} bits for the network (/{plan.default_prefix}).\n"
+                f"Answer: {plan.default_mask}")
+    if concept == 'borrowed_bits':
+        return (f"We need {plan.subnets_needed} subnets, so find the smallest power of 2 that is at least {plan.subnets_needed}: {powers}.\n"
+                f"2^{plan.borrowed_bits} = {plan.subnet_count} >= {plan.subnets_needed}\n"
+                f"Answer: borrow {plan.borrowed_bits} bits")
+    if concept == 'host_bits':
+        return (f"Class {plan.address_class} starts with {default_host_bits} host bits.\n"
+                f"{default_host_bits} - {plan.borrowed_bits} borrowed = {plan.host_bits}\n"
+                f"Answer: {plan.host_bits} host bits")
+    if concept == 'subnet_count':
+        return (f"Borrowed bits: {plan.borrowed_bits}\n"
+                f"2^{plan.borrowed_bits} = {plan.subnet_count}\n"
+                f"Answer: {plan.subnet_count} subnets")
+    if concept == 'total_addresses':
+        return (f"Host bits: {plan.host_bits}\n"
+                f"2^{plan.host_bits} = {plan.total_addresses}\n"
+                f"Answer: {plan.total_addresses} addresses per subnet")
+    if concept == 'usable_addresses':
+        return (f"Total addresses per subnet: 2^{plan.host_bits} = {plan.total_addresses}\n"
+                f"Never forget the minus 2 (network ID and broadcast): {plan.total_addresses} - 2 = {plan.usable_addresses}\n"
+                f"Answer: {plan.usable_addresses} usable addresses")
+    if concept == 'custom_mask':
+        octet = PREFIX_MASKS[plan.prefix] >> (8 * (3 - plan.interesting_octet)) & 255
+        return (f"Network bits: {plan.default_prefix} default + {plan.borrowed_bits} borrowed = /{plan.prefix}\n"
+                f"The mask octet where the borrowed bits end is {octet} (256 - {octet} = block size {plan.block_size}).\n"
+                f"Answer: {plan.custom_mask}")
+    if concept == 'prefix':
+        return (f"{plan.default_prefix} default network bits + {plan.borrowed_bits} borrowed bits\n"
+                f"Answer: {plan.prefix}")
+    if concept == 'address_map':
+        return (f"N = network bits ({plan.default_prefix}), s = borrowed subnet bits ({plan.borrowed_bits}), "
+                f"h = host bits ({plan.host_bits}); a whole octet of host bits is written H.\n"
+                f"Answer: {plan.address_map()}")
+    if concept == 'nth_subnet':
+        n = int(ORDINAL_PATTERN.search(question).group(1))
+        subnet_id, broadcast = plan.subnet_id(n), plan.broadcast(n)
+        return (f"Custom mask {plan.custom_mask} gives a block size of {plan.block_size} in octet {plan.interesting_octet + 1}"
+                f" ({plan.total_addresses} addresses per subnet).\n"
+                f"Subnet zero is the 1st subnet, so the {ordinal(n)} subnet starts {n - 1} blocks in: "
+                f"{int_to_ip(plan.network)} + {n - 1} x {plan.total_addresses} = {int_to_ip(subnet_id)}\n"
+                f"Its broadcast is the address just before the next subnet: {int_to_ip(broadcast)}\n"
+                f"Usable hosts are everything in between: {int_to_ip(subnet_id + 1)} to {int_to_ip(broadcast - 1)}\n"
+                f"Answer: {nth_subnet_answer(plan, question)}")
+    raise ValueError(f"Unknown concept: {concept}")
+
+
+# Which concept each worksheet part asks about
+RANGE_PART_CONCEPTS = {
+    'part1': 'class', 'part2': 'default_mask', 'part3': 'borrowed_bits', 'part4': 'host_bits',
+    'part5': 'subnet_count', 'part6': 'total_addresses', 'part7': 'usable_addresses',
+    'part8': 'custom_mask', 'part9': 'nth_subnet', 'part10': 'nth_subnet',
+    'part11': 'nth_subnet', 'part12': 'nth_subnet'
+}
+MASK_PART_CONCEPTS = dict(list(RANGE_PART_CONCEPTS.items())[:8], part9='prefix', part10='address_map')
@@ -0,0 +1,159 @@
+"""
+Subnet Matrix - Subnetting matrix pages generated from prefix arithmetic
+
+Every row of a matrix (2^s subnets, host bits, 2^h - 2 usable hosts, block
+size, prefix, custom mask, CAM pattern) follows from the starting prefix, so
+the pages are generated here instead of being typed out by hand: one per
+class (A, B, C) and one per starting prefix /1-/30 ("subnetting a /20").
+All of them are rendered to bytes once at import with a strong ETag; a
+matrix open is a dict lookup, and browsers revalidate with If-None-Match
+(304, no body) or skip the request entirely while max-age lasts.
+"""
+
+from subnet_engine import DEFAULT_PREFIX, PREFIX_MASKS, PREFIX_SIZES, address_map, prefix_to_mask
+from template_registry import page_response, static_page
+
+# The pages only change when this file does, so browsers may keep them for a day
+CACHE_SECONDS = 86400
+OCTET_ORDINALS = ['1st', '2nd', '3rd', '4th']
+
+PAGE = """<!DOCTYPE html>
+<html>
+<head>
+    <title>{title}</title>
+    <meta charset="UTF-8">
+    <style>
+        * {{ margin: 0; padding: 0; box-sizing: border-box; }}
+        body {{
+            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
+            background: linear-gradient(135deg, #1e3c72 0%, #2a5298 100%);
+            min-height: 100vh;
+            padding: 20px;
+        }}
+        .container {{
+            max-width: 1400px;
+            margin: 0 auto;
+            background: white;
+            border-radius: 15px;
+            padding: 30px;
+            box-shadow: 0 10px 40px rgba(0,0,0,0.3);
+        }}
+        h1 {{ color: #1e3c72; margin-bottom: 10px; }}
+        .subtitle {{ color: #666; margin-bottom: 20px; font-size: 1.1em; }}
+        table {{ width: 100%; border-collapse: collapse; margin: 20px 0; font-size: 0.9em; }}
+        th {{ background: #1976D2; color: white; padding: 10px; border: 1px solid #ccc; }}
+        td {{ padding: 8px; border: 1px solid #ccc; text-align: center; }}
+        tr:nth-child(even) {{ background: #f5f5f5; }}
+        .info-box {{
+            background: #e3f2fd;
+            padding: 15px;
+            border-left: 4px solid #1976D2;
+            margin: 20px 0;
+        }}
+        .reminder-box {{
+            background: #fff3cd;
+            padding: 15px;
+            border-left: 4px solid #ffc107;
+            margin: 20px 0;
+        }}
+    </style>
+</head>
+<body>
+    <div class="container">
+        <h1>🌐 {title}</h1>
+        <div class="subtitle">Default Mask: {mask} | Available Bits: {bits} ({octets}) | Network: {network_map}</div>
+
+        <div class="info-box">
+            <strong>How to Use This Matrix:</strong>
+            <ol style="margin: 10px 0 0 20px;">
+                <li>Find the row where <strong>2^s</strong> meets or exceeds your subnet requirement</li>
+                <li>Find the row where <strong>2^h - 2</strong> meets or exceeds your usable host requirement</li>
+                <li>Both requirements should be on the <strong>SAME ROW</strong></li>
+                <li>Validate: Subnet bits + Host bits = {bits} for {scope}</li>
+                <li>Read your custom subnet mask and CAM from that row</li>
+            </ol>
+        </div>
+
+        <table>
+            <tr>
+                <th>Subnets (2^s)</th>
+                <th>Networks</th>
+                <th>Subnet Bits (s)</th>
+                <th>Host Bits (h)</th>
+                <th>Total Addresses (2^h)</th>
+                <th>Usable Hosts (2^h - 2)</th>
+                <th>Block Size</th>
+                <th>Prefix</th>
+                <th>Custom Subnet Mask</th>
+                <th>CAM Pattern</th>
+            </tr>
+{rows}
+        </table>
+
+        <div class="reminder-box">
+            <strong>🎯 Professor Bodden's Golden Rules:</strong>
+            <ul style="margin: 10px 0 0 20px;">
+                <li><strong>NEVER forget the minus 2!</strong> First and last addresses are unusable</li>
+                <li>Subnet bits + Host bits MUST equal {bits} for {scope}</li>
+                <li>If you can't get exact match, round UP to next power of 2</li>
+                <li>255 in mask = Network (can't touch), 0 in mask = Host (where you do math)</li>
+                <li>Write things out if you need to see it!</li>
+            </ul>
+        </div>
+
+        <div style="text-align: center; margin-top: 30px; color: #666;">
+            <p>Keep this tab open to reference while working on your problem!</p>
+        </div>
+    </div>
+</body>
+</html>"""
+
+
+def block_size(prefix):
+    """Block size in the octet where the mask stops being 255 ("64 (4th)")"""
+    octet = (prefix - 1) // 8
+    value = PREFIX_MASKS[prefix] >> (8 * (3 - octet)) & 255
+    return f"{256 - value} ({OCTET_ORDINALS[octet]})"
+
+
+def matrix_rows(default_prefix):
+    """One row per number of borrowed bits, from 0 up to a /32"""
+    rows = []
+    for borrowed in range(33 - default_prefix):
+        prefix = default_prefix + borrowed
+        host_bits = 32 - prefix
+        usable = f"{PREFIX_SIZES[prefix] - 2:,}" if host_bits >= 2 else '—'
+        cells = [f"2^{borrowed}", f"{1 << borrowed:,}", borrowed, host_bits, f"{PREFIX_SIZES[prefix]:,}", usable,
+                 block_size(prefix), f"/{prefix}", prefix_to_mask(prefix), address_map(default_prefix, prefix)]
+        rows.append('            <tr>' + ''.join(f'<td>{cell}</td>' for cell in cells) + '</tr>')
+    return '\n'.join(rows)
+
+
+def render_matrix(default_prefix, title, scope):
+    """Matrix page HTML for subnetting a /default_prefix"""
+    host_octets = sorted({bit // 8 for bit in range(default_prefix, 32)})
+    names = [OCTET_ORDINALS[i] for i in host_octets]
+    octets = f"{', '.join(names[:-1])} & {names[-1]} octets" if len(names) > 1 else f"{names[0]} octet only"
+    return PAGE.format(title=title, scope=scope, mask=prefix_to_mask(default_prefix), bits=32 - default_prefix,
+                       octets=octets, network_map=address_map(default_prefix, default_prefix),
+                       rows=matrix_rows(default_prefix))
+
+
+def build_pages():
+    """{'A': page, 'B': ..., 'C': ..., 1: page, ... 30: page}"""
+    pages = {letter: static_page(render_matrix(prefix, f"CLASS {letter} Subnetting Matrix", f"Class {letter}"))
+             for letter, prefix in DEFAULT_PREFIX.items()}
+    for prefix in range(1, 31):
+        pages[prefix] = static_page(render_matrix(prefix, f"/{prefix} Subnetting Matrix", f"a /{prefix}"))
+    return pages
+
+
+MATRIX_PAGES = build_pages()
+
+
+def matrix_response(key, request):
+    """The cached page for a class letter or starting prefix (304 when the browser's copy is current), or None"""
+    page = MATRIX_PAGES.get(key)
+    if page is None:
+        return None
+    return page_response(page, request, max_age=CACHE_SECONDS)
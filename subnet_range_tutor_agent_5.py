@@ -3,19 +3,49 @@ Subnet Range Tutor Agent - Mentoring students through subnet range calculations
 6 problems with 12 parts each - Progressive 5-level mentoring system
 """
 
-from flask import Flask, render_template_string, request, jsonify, session
-from anthropic import Anthropic
+from flask import Flask, request, jsonify, session
 import os
+import re
 import secrets
+import threading
+from collections import OrderedDict
+from answer_normalizer import grade
+from compression_middleware import CompressionMiddleware
+from conversation_window import ConversationWindow, estimate_tokens
+from llm_gateway import GatewayBusy, gateway
+from llm_streaming import sse_response
+from misconceptions import misconception_hint, record
+from model_router import router
+from prompt_cache import cacheable_system, mark_last_message
+from serving import serve
+from subnet_engine import RANGE_PART_CONCEPTS, derive_answer_keys, explain, plan_for, range_answer_key
+from template_registry import TemplateRegistry
+from tutor_metrics import metrics
 
 app = Flask(__name__)
 app.secret_key = secrets.token_hex(16)
+templates = TemplateRegistry(app)
 app.config['SESSION_TYPE'] = 'filesystem'
 app.config['SESSION_COOKIE_SAMESITE'] = 'Lax'
 app.config['SESSION_COOKIE_HTTPONLY'] = True
 
-# Initialize Anthropic client
-client = Anthropic(api_key=os.environ.get("ANTHROPIC_API_KEY"))
+AGENT_NAME = "subnet_ranges"
+app.wsgi_app = CompressionMiddleware(app.wsgi_app, AGENT_NAME)
+
+# Conversation history lives server-side, keyed by an id in the session cookie.
+# This keeps the cookie under the browser's 4 KB limit and lets /chat_stream
+# record Claude's reply after the response headers have already been sent.
+CONVERSATIONS = OrderedDict()
+CONVERSATIONS_LOCK = threading.Lock()
+MAX_CONVERSATIONS = 1000
+# ...in this process, so it can't be split across gunicorn workers (see serving.py)
+app.config['SINGLE_PROCESS'] = "Subnet Ranges keeps conversation histories in process memory"
+
+# A message with one of these is a question for Claude, never an answer attempt
+QUESTION_WORDS = re.compile(r'\b(what|how|why|when|where|can|could|help|explain)\b', re.IGNORECASE)
+
+# Only the recent turns (plus a digest of older parts) are sent to Claude
+history_window = ConversationWindow()
 
 # The 6 Subnet Range Problems with all 12 parts
 PROBLEMS = {
@@ -192,6 +222,16 @@ PART_DESCRIPTIONS = {
     "part12": ""  # Varies by problem
 }
 
+# Grading uses keys computed by the subnet engine; the typed keys above are cross-checked at startup
+ANSWER_KEYS = derive_answer_keys(PROBLEMS, range_answer_key)
+
+def worked_answer(problem_data, part):
+    """Level-5 mentoring computed locally - the full step-by-step answer, no Claude call"""
+    question = problem_data['questions'].get(part.replace('part', 'q'))
+    steps = explain(plan_for(problem_data), RANGE_PART_CONCEPTS[part], question)
+    return ("📘 <strong>Level 5 - let's work through it together:</strong><br><br>" + steps.replace('\n', '<br>')
+            + "<br><br>Type the answer in to lock it in, then move on to the next part! 💪")
+
 # System Prompt - 5-Level Mentoring System
 SYSTEM_PROMPT = """You are a patient and encouraging subnet range tutor helping students master subnet calculations and range determination. Your goal is to guide students to discover answers themselves through a 5-level progressive mentoring system.
 
@@ -258,23 +298,45 @@ FORMULA REMINDERS:
 
 Be enthusiastic, patient, and remember: the goal is understanding, not just correct answers!"""
 
-def call_claude(messages):
+def claude_request(messages, route):
+    """Keyword arguments for a Claude call with this conversation history
+    
+    The system prompt and the conversation so far are cached upstream, so each
+    turn only pays full price for the newest context message.
+    """
+    system = cacheable_system(SYSTEM_PROMPT, model=route.model)
+    return {
+        'route': route.name,
+        'model': route.model,
+        'max_tokens': 2000,
+        'system': system,
+        'messages': mark_last_message(messages, route.model, system)
+    }
+
+def call_claude(messages, route):
     """Call Claude API with conversation history"""
     try:
-        response = client.messages.create(
-            model="claude-sonnet-4-20250514",
-            max_tokens=2000,
-            system=SYSTEM_PROMPT,
-            messages=messages
-        )
+        response = gateway.create(AGENT_NAME, **claude_request(messages, route))
+        return response.content[0].text
+    except GatewayBusy:
+        raise  # Nothing to record in the history - the student just needs to retry
+    except Exception as e:
+        return f"Error calling Claude API: {str(e)}"
+
+async def acall_claude(messages, route):
+    """call_claude() for the ASGI host - awaits the reply instead of blocking a thread"""
+    try:
+        response = await gateway.acreate(AGENT_NAME, **claude_request(messages, route))
         return response.content[0].text
+    except GatewayBusy:
+        raise
     except Exception as e:
         return f"Error calling Claude API: {str(e)}"
 
 @app.route('/')
 def index():
     """Main page - problem selection"""
-    return render_template_string(INDEX_TEMPLATE)
+    return templates.serve('index', request)
 
 @app.route('/problem/<int:problem_id>')
 def problem(problem_id):
@@ -287,131 +349,104 @@ def problem(problem_id):
     session['problem_id'] = problem_id
     session['current_part'] = 'part1'
     session['attempts'] = {}
-    session['conversation'] = []
+    session['conversation_id'], _ = new_conversation()
     session.modified = True
     
     print(f"Session initialized for problem {problem_id}")
     print(f"Session data: {dict(session)}")
     
     problem_data = PROBLEMS[problem_id]
-    return render_template_string(PROBLEM_TEMPLATE, 
-                                 problem=problem_data, 
-                                 problem_id=problem_id)
+    return templates.render('problem', problem=problem_data, problem_id=problem_id)
 
-@app.route('/chat', methods=['POST'])
-def chat():
-    """Handle chat messages"""
-    print("=" * 50)
-    print("CHAT ENDPOINT CALLED")
-    print("=" * 50)
+def new_conversation():
+    """Start an empty server-side history; returns (id, history)
     
-    try:
-        data = request.json
-        print(f"Request data: {data}")
-        
-        user_message = data.get('message', '').strip()
-        print(f"User message: {user_message}")
-        
-        if not user_message:
-            print("Empty message received")
-            return jsonify({'error': 'Empty message'}), 400
-        
-        problem_id = session.get('problem_id')
-        print(f"Problem ID from session: {problem_id}")
-        
-        current_part = session.get('current_part', 'part1')
-        print(f"Current part: {current_part}")
-        
-        if problem_id not in PROBLEMS:
-            print(f"Invalid problem ID: {problem_id}")
-            return jsonify({'error': 'Invalid problem'}), 400
-        
-        problem_data = PROBLEMS[problem_id]
-        
-        # Initialize attempts for current part if not exists
-        if 'attempts' not in session:
-            session['attempts'] = {}
-        if current_part not in session['attempts']:
-            session['attempts'][current_part] = 0
-        
-        # Get correct answer for current part
-        correct_answer = problem_data['answers'][current_part]
-        print(f"Correct answer: {correct_answer}")
-        
-        # Normalize answers for comparison (remove spaces, commas, make lowercase)
-        def normalize_answer(ans):
-            return ans.lower().strip().replace(' ', '').replace(',', '').replace('-', '')
-        
-        user_answer_normalized = normalize_answer(user_message)
-        correct_answer_normalized = normalize_answer(correct_answer)
-        
-        print(f"User answer normalized: {user_answer_normalized}")
-        print(f"Correct answer normalized: {correct_answer_normalized}")
-        
-        # Determine if it's an answer attempt
-        is_answer_attempt = False
-        is_correct = False
-        
-        # Check various matching scenarios
-        # 1. Exact match after normalization
-        if user_answer_normalized == correct_answer_normalized:
-            is_answer_attempt = True
-            is_correct = True
-            print("Match: Exact normalized match")
-        # 2. Correct answer is contained in user's answer
-        elif correct_answer_normalized in user_answer_normalized:
-            is_answer_attempt = True
-            is_correct = True
-            print("Match: Correct answer contained in user answer")
-        # 3. User answer is contained in correct answer (for single letters/numbers)
-        elif len(correct_answer_normalized) <= 3 and user_answer_normalized == correct_answer_normalized:
-            is_answer_attempt = True
-            is_correct = True
-            print("Match: Short answer exact match")
-        # 4. For ranges, check if both endpoints match
-        elif 'to' in correct_answer.lower():
-            # Extract the two IPs/numbers from both answers
-            correct_parts = [p.strip() for p in correct_answer.lower().split('to')]
-            if 'to' in user_message.lower():
-                user_parts = [p.strip() for p in user_message.lower().split('to')]
-                # Normalize and compare both parts
-                if len(correct_parts) == 2 and len(user_parts) == 2:
-                    part1_match = normalize_answer(user_parts[0]) == normalize_answer(correct_parts[0])
-                    part2_match = normalize_answer(user_parts[1]) == normalize_answer(correct_parts[1])
-                    if part1_match and part2_match:
-                        is_answer_attempt = True
-                        is_correct = True
-                        print("Match: Range answer match")
-                    else:
-                        is_answer_attempt = True
-                        print(f"No match: Range mismatch - part1:{part1_match}, part2:{part2_match}")
-            else:
-                # User didn't provide range format
-                is_answer_attempt = len(user_message.split()) <= 10  # Assume it's an attempt if reasonably short
-        # 5. Check if message looks like an answer (short, no question words)
-        elif len(user_message.split()) <= 8 and '?' not in user_message and not any(q in user_message.lower() for q in ['what', 'how', 'why', 'when', 'where', 'can', 'could', 'help']):
-            is_answer_attempt = True
-            print("Detected as answer attempt (short message, no question words)")
-        
-        print(f"Is answer attempt: {is_answer_attempt}")
-        print(f"Is correct: {is_correct}")
-        
-        # Build context for Claude
-        part_description = PART_DESCRIPTIONS.get(current_part, '')
-        if current_part in ['part9', 'part10', 'part11', 'part12']:
-            part_description = problem_data['questions'].get(current_part.replace('part', 'q'), '')
-        
-        # Increment attempts if wrong answer
-        if is_answer_attempt and not is_correct:
-            session['attempts'][current_part] = session['attempts'].get(current_part, 0) + 1
-            session.modified = True
-        
-        current_attempts = session['attempts'][current_part]
-        print(f"Current attempts: {current_attempts}")
-        
-        # Build context message for Claude
-        if is_correct:
-            context_message = f"""
+    The list is handed back from under the lock - looked up afterwards, a
+    concurrent eviction could already have dropped it.
+    """
+    conversation_id = secrets.token_hex(8)
+    conversation = []
+    with CONVERSATIONS_LOCK:
+        CONVERSATIONS[conversation_id] = conversation
+        while len(CONVERSATIONS) > MAX_CONVERSATIONS:
+            CONVERSATIONS.popitem(last=False)  # Drop the least recently used history
+    return conversation_id, conversation
+
+def get_conversation():
+    """History for the current session (created on first use)"""
+    conversation_id = session.get('conversation_id')
+    with CONVERSATIONS_LOCK:
+        if conversation_id in CONVERSATIONS:
+            CONVERSATIONS.move_to_end(conversation_id)
+            return CONVERSATIONS[conversation_id]
+    session['conversation_id'], conversation = new_conversation()
+    return conversation
+
+def prepare_turn(data):
+    """Grade the message, update attempts and build the Claude request
+    
+    Returns (turn, None) or (None, error_message). The user's context message
+    is only added to the history by finish_turn, once Claude has replied.
+    """
+    print(f"Request data: {data}")
+    
+    user_message = data.get('message', '').strip()
+    print(f"User message: {user_message}")
+    
+    if not user_message:
+        print("Empty message received")
+        return None, 'Empty message'
+    
+    problem_id = session.get('problem_id')
+    print(f"Problem ID from session: {problem_id}")
+    
+    current_part = session.get('current_part', 'part1')
+    print(f"Current part: {current_part}")
+    
+    if problem_id not in PROBLEMS:
+        print(f"Invalid problem ID: {problem_id}")
+        return None, 'Invalid problem'
+    
+    problem_data = PROBLEMS[problem_id]
+    
+    # Initialize attempts for current part if not exists
+    if 'attempts' not in session:
+        session['attempts'] = {}
+    if current_part not in session['attempts']:
+        session['attempts'][current_part] = 0
+    
+    # Get correct answer for current part
+    correct_answer = ANSWER_KEYS[problem_id][current_part]
+    print(f"Correct answer: {correct_answer}")
+    
+    # Parse the answer as the same kind of value as the key (IP, range, class, number...)
+    parsed, is_correct = grade(user_message, correct_answer)
+    print(f"Parsed answer: {parsed}")
+    
+    # An answer of the right kind is an attempt, and so is any short message - unless it is a question
+    is_question = '?' in user_message or bool(QUESTION_WORDS.search(user_message))
+    is_correct = is_correct and not is_question
+    is_answer_attempt = not is_question and (parsed is not None or len(user_message.split()) <= 8)
+    
+    print(f"Is answer attempt: {is_answer_attempt}")
+    print(f"Is correct: {is_correct}")
+    
+    # Build context for Claude
+    part_description = PART_DESCRIPTIONS.get(current_part, '')
+    if current_part in ['part9', 'part10', 'part11', 'part12']:
+        part_description = problem_data['questions'].get(current_part.replace('part', 'q'), '')
+    
+    # Increment attempts if wrong answer
+    if is_answer_attempt and not is_correct:
+        session['attempts'][current_part] = session['attempts'].get(current_part, 0) + 1
+        session.modified = True
+    
+    current_attempts = session['attempts'][current_part]
+    print(f"Current attempts: {current_attempts}")
+    
+    # Build context message for Claude
+    if is_correct:
+        context_message = f"""
 GREAT NEWS! The student answered correctly!
 
 CURRENT PROBLEM: {problem_data['name']}
@@ -428,8 +463,8 @@ The student got it RIGHT! Please:
 2. Briefly explain why this answer is correct
 3. Ask if they're ready to move to the next part (they can say "next" or "yes")
 """
-        else:
-            context_message = f"""
+    else:
+        context_message = f"""
 CURRENT PROBLEM: {problem_data['name']}
 Subnets Needed: {problem_data['subnets_needed']}
 Hosts Needed: {problem_data['hosts_needed']}
@@ -455,46 +490,170 @@ Remember the 5-LEVEL MENTORING SYSTEM:
 
 {"Current mentoring level: " + str(min(current_attempts, 5)) if is_answer_attempt else "Answer their question helpfully"}
 """
-        
-        # Add to conversation history
-        if 'conversation' not in session:
-            session['conversation'] = []
-        
-        session['conversation'].append({
-            'role': 'user',
-            'content': context_message
-        })
-        
-        print("Calling Claude API...")
-        # Get Claude's response
-        claude_response = call_claude(session['conversation'])
-        print(f"Claude response: {claude_response[:100]}...")
-        
-        # Add Claude's response to history
-        session['conversation'].append({
-            'role': 'assistant',
-            'content': claude_response
-        })
-        
+    
+    conversation = get_conversation()
+    user_entry = {
+        'role': 'user',
+        'content': context_message,
+        # Bookkeeping for the digest of older turns - not sent to Claude
+        'part': current_part,
+        'label': PART_DESCRIPTIONS.get(current_part, ''),
+        'is_correct': is_correct,
+        'is_attempt': is_answer_attempt
+    }
+    
+    messages, dropped = history_window.build(conversation, user_entry)
+    metrics.observe(f'{AGENT_NAME}.window_tokens', sum(estimate_tokens(m['content']) for m in messages))
+    if dropped:
+        metrics.incr(f'{AGENT_NAME}.history_trimmed')
+    
+    turn = {
+        'current_part': current_part,
+        'attempts': current_attempts,
+        'is_correct': is_correct,
+        'counted_attempt': is_answer_attempt and not is_correct,
+        'conversation': conversation,
+        'user_entry': user_entry,
+        'messages': messages
+    }
+    
+    hint = None
+    if is_answer_attempt and not is_correct and current_attempts < 5:
+        # A known mistake gets its targeted hint locally - no need to ask Claude
+        hint = misconception_hint(problem_data, RANGE_PART_CONCEPTS[current_part], user_message, correct_answer,
+                                  problem_data['questions'].get(current_part.replace('part', 'q')))
+        record(AGENT_NAME, hint is not None)
+    
+    if is_answer_attempt and not is_correct and current_attempts >= 5:
+        # The full worked answer is pure arithmetic - no need to ask Claude
+        turn['response'] = worked_answer(problem_data, current_part)
+        metrics.incr(f'{AGENT_NAME}.local_explanations')
+    elif hint is not None:
+        turn['response'] = f"🔎 {hint}"
+    elif is_correct:
+        turn['route'] = router.route(AGENT_NAME, 'correct')
+    elif is_answer_attempt:
+        turn['route'] = router.route(AGENT_NAME, 'hint', level=max(current_attempts, 1))
+    else:
+        turn['route'] = router.route(AGENT_NAME, 'question')
+    return turn, None
+
+def finish_turn(turn, claude_response):
+    """Record the exchange in the session's history"""
+    turn['conversation'].append(turn['user_entry'])
+    turn['conversation'].append({
+        'role': 'assistant',
+        'content': claude_response
+    })
+
+def undo_attempt(turn):
+    """Give the attempt back when no reply was produced (e.g. the gateway was busy)"""
+    if turn['counted_attempt']:
+        session['attempts'][turn['current_part']] -= 1
         session.modified = True
+
+def turn_meta(turn):
+    """The JSON fields of a turn, minus the reply text"""
+    return {
+        'current_part': turn['current_part'],
+        'attempts': turn['attempts'],
+        'is_correct': turn['is_correct']
+    }
+
+def chat_reply(turn, claude_response):
+    """Record the exchange and build the /chat JSON"""
+    print(f"Claude response: {claude_response[:100]}...")
+    
+    finish_turn(turn, claude_response)
+    
+    response_data = turn_meta(turn)
+    response_data['response'] = claude_response
+    
+    print(f"Sending response: {response_data}")
+    print("=" * 50)
+    
+    return jsonify(response_data)
+
+def chat_error(e):
+    if isinstance(e, GatewayBusy):
+        return jsonify({'error': str(e)}), 503
+    print(f"ERROR in chat endpoint: {str(e)}")
+    import traceback
+    traceback.print_exc()
+    return jsonify({'error': str(e)}), 500
+
+@app.route('/chat', methods=['POST'])
+def chat():
+    """Handle chat messages"""
+    print("=" * 50)
+    print("CHAT ENDPOINT CALLED")
+    print("=" * 50)
+    
+    try:
+        turn, error = prepare_turn(request.json)
+        if error:
+            return jsonify({'error': error}), 400
         
-        response_data = {
-            'response': claude_response,
-            'current_part': current_part,
-            'attempts': current_attempts,
-            'is_correct': is_correct
-        }
+        if 'response' in turn:
+            claude_response = turn['response']
+        else:
+            print("Calling Claude API...")
+            # Get Claude's response
+            claude_response = call_claude(turn['messages'], turn['route'])
+        return chat_reply(turn, claude_response)
         
-        print(f"Sending response: {response_data}")
-        print("=" * 50)
+    except GatewayBusy as e:
+        undo_attempt(turn)  # "Busy, try again" must not cost one of the five attempts
+        return chat_error(e)
+    except Exception as e:
+        return chat_error(e)
+
+async def chat_async():
+    """/chat for the ASGI host (async_chat.py): same JSON, but the Claude call is awaited"""
+    try:
+        turn, error = prepare_turn(request.json)
+        if error:
+            return jsonify({'error': error}), 400
         
-        return jsonify(response_data)
+        if 'response' in turn:
+            claude_response = turn['response']
+        else:
+            claude_response = await acall_claude(turn['messages'], turn['route'])
+        return chat_reply(turn, claude_response)
         
+    except GatewayBusy as e:
+        undo_attempt(turn)  # "Busy, try again" must not cost one of the five attempts
+        return chat_error(e)
     except Exception as e:
-        print(f"ERROR in chat endpoint: {str(e)}")
-        import traceback
-        traceback.print_exc()
-        return jsonify({'error': str(e)}), 500
+        return chat_error(e)
+
+@app.route('/chat_stream', methods=['POST'])
+def chat_stream():
+    """Same as /chat, but Claude's reply arrives token-by-token over Server-Sent Events"""
+    turn, error = prepare_turn(request.json)
+    if error:
+        return jsonify({'error': error}), 400
+    
+    def on_complete(text):
+        finish_turn(turn, text)
+    
+    if 'response' in turn:
+        return sse_response(turn_meta(turn), [turn['response']], on_complete=on_complete)
+    
+    try:
+        chunks = gateway.open_stream(AGENT_NAME, **claude_request(turn['messages'], turn['route']))
+    except GatewayBusy as e:
+        undo_attempt(turn)  # Answered before the SSE headers, so the session cookie carries the refund
+        return chat_error(e)
+    return sse_response(turn_meta(turn), chunks, on_complete=on_complete, agent=AGENT_NAME)
+
+@app.route('/stats')
+def stats():
+    """Latency, call counts and shared LLM gateway gauges for this agent"""
+    snapshot = metrics.snapshot(prefix=AGENT_NAME + '.')
+    snapshot['gateway'] = gateway.stats()
+    snapshot['routing'] = router.stats()
+    return jsonify(snapshot)
 
 @app.route('/next_part', methods=['POST'])
 def next_part():
@@ -620,7 +779,7 @@ INDEX_TEMPLATE = """<!DOCTYPE html>
         </div>
 
         <div class="problems-grid">
-            <div class="problem-card" onclick="location.href='/problem/1'">
+            <div class="problem-card" onclick="location.href='problem/1'">
                 <div class="problem-number">Problem 1</div>
                 <div class="problem-details">
                     <div><strong>Network:</strong> 210.220.3.0</div>
@@ -630,7 +789,7 @@ INDEX_TEMPLATE = """<!DOCTYPE html>
                 <button class="start-button">Start Problem 1</button>
             </div>
 
-            <div class="problem-card" onclick="location.href='/problem/2'">
+            <div class="problem-card" onclick="location.href='problem/2'">
                 <div class="problem-number">Problem 2</div>
                 <div class="problem-details">
                     <div><strong>Network:</strong> 196.23.45.0</div>
@@ -640,7 +799,7 @@ INDEX_TEMPLATE = """<!DOCTYPE html>
                 <button class="start-button">Start Problem 2</button>
             </div>
 
-            <div class="problem-card" onclick="location.href='/problem/3'">
+            <div class="problem-card" onclick="location.href='problem/3'">
                 <div class="problem-number">Problem 3</div>
                 <div class="problem-details">
                     <div><strong>Network:</strong> 172.33.0.0</div>
@@ -650,7 +809,7 @@ INDEX_TEMPLATE = """<!DOCTYPE html>
                 <button class="start-button">Start Problem 3</button>
             </div>
 
-            <div class="problem-card" onclick="location.href='/problem/4'">
+            <div class="problem-card" onclick="location.href='problem/4'">
                 <div class="problem-number">Problem 4</div>
                 <div class="problem-details">
                     <div><strong>Network:</strong> 188.16.0.0</div>
@@ -660,7 +819,7 @@ INDEX_TEMPLATE = """<!DOCTYPE html>
                 <button class="start-button">Start Problem 4</button>
             </div>
 
-            <div class="problem-card" onclick="location.href='/problem/5'">
+            <div class="problem-card" onclick="location.href='problem/5'">
                 <div class="problem-number">Problem 5</div>
                 <div class="problem-details">
                     <div><strong>Network:</strong> 112.0.0.0</div>
@@ -670,7 +829,7 @@ INDEX_TEMPLATE = """<!DOCTYPE html>
                 <button class="start-button">Start Problem 5</button>
             </div>
 
-            <div class="problem-card" onclick="location.href='/problem/6'">
+            <div class="problem-card" onclick="location.href='problem/6'">
                 <div class="problem-number">Problem 6</div>
                 <div class="problem-details">
                     <div><strong>Network:</strong> 10.0.0.0</div>
@@ -836,7 +995,7 @@ PROBLEM_TEMPLATE = """<!DOCTYPE html>
 <body>
     <div class="container">
         <div class="sidebar">
-            <a href="/" class="back-button">← Back to Problems</a>
+            <a href="{{ request.script_root }}/" class="back-button">← Back to Problems</a>
             
             <h2>{{ problem.name }}</h2>
             
@@ -960,31 +1119,17 @@ PROBLEM_TEMPLATE = """<!DOCTYPE html>
             addMessage(message, 'user');
             input.value = '';
             
-            console.log('Sending fetch request to /chat');
+            console.log('Sending stream request to /chat_stream');
             
             // Send to server
-            fetch('/chat', {
-                method: 'POST',
-                headers: { 
-                    'Content-Type': 'application/json'
-                },
-                body: JSON.stringify({ message: message })
-            })
-            .then(response => {
-                console.log('Response received:', response);
-                if (!response.ok) {
-                    throw new Error('Network response was not ok: ' + response.status);
-                }
-                return response.json();
-            })
-            .then(data => {
+            streamReply(message, data => {
                 console.log('Data:', data);
-                addMessage(data.response, 'assistant');
                 attemptCount = data.attempts;
                 updateAttemptCounter();
-                
+            })
+            .then(data => {
                 // If answer is correct, prepare for next part
-                if (data.is_correct) {
+                if (data && data.is_correct) {
                     isWaitingForNext = true;
                     addNextPartButton();
                 }
@@ -995,6 +1140,79 @@ PROBLEM_TEMPLATE = """<!DOCTYPE html>
             });
         }
 
+        // Stream the tutor's reply into a new chat bubble; resolves with the meta event
+        function streamReply(message, onMeta) {
+            let meta = null;
+            let replyDiv = null;
+            let replyText = '';
+            
+            return streamChat('{{ request.script_root }}/chat_stream', { message: message }, {
+                meta: data => {
+                    meta = data;
+                    if (onMeta) onMeta(data);
+                },
+                token: data => {
+                    if (!replyDiv) {
+                        replyDiv = addMessage('', 'assistant');
+                    }
+                    replyText += data.text;
+                    replyDiv.innerHTML = '<strong>🤖 AI Tutor:</strong><br><br>' + replyText;
+                    const messagesDiv = document.getElementById('chatMessages');
+                    messagesDiv.scrollTop = messagesDiv.scrollHeight;
+                },
+                error: data => {
+                    addMessage('Error: ' + data.error, 'assistant');
+                },
+                done: data => {
+                    console.log('Time to first token (ms):', data.ttft_ms, 'Total (ms):', data.total_ms);
+                }
+            })
+            .then(() => meta);
+        }
+
+        // POST to a Server-Sent Events endpoint and hand each event to handlers[event]
+        function streamChat(url, payload, handlers) {
+            return fetch(url, {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify(payload)
+            })
+            .then(response => {
+                console.log('Response received:', response);
+                if (response.status === 503) {
+                    // Busy: refused before any event, so the attempt wasn't counted
+                    return response.json().then(data => handlers.error(data));
+                }
+                if (!response.ok || !response.body) {
+                    throw new Error('Network response was not ok: ' + response.status);
+                }
+                const reader = response.body.getReader();
+                const decoder = new TextDecoder();
+                let buffer = '';
+                
+                function pump() {
+                    return reader.read().then(result => {
+                        if (result.done) return;
+                        buffer += decoder.decode(result.value, { stream: true });
+                        let boundary;
+                        while ((boundary = buffer.indexOf('\\n\\n')) !== -1) {
+                            const block = buffer.slice(0, boundary);
+                            buffer = buffer.slice(boundary + 2);
+                            let eventName = 'message';
+                            let eventData = '';
+                            block.split('\\n').forEach(line => {
+                                if (line.startsWith('event: ')) eventName = line.slice(7);
+                                else if (line.startsWith('data: ')) eventData += line.slice(6);
+                            });
+                            if (handlers[eventName]) handlers[eventName](JSON.parse(eventData));
+                        }
+                        return pump();
+                    });
+                }
+                return pump();
+            });
+        }
+
         function addNextPartButton() {
             const messagesDiv = document.getElementById('chatMessages');
             const buttonDiv = document.createElement('div');
@@ -1005,7 +1223,7 @@ PROBLEM_TEMPLATE = """<!DOCTYPE html>
         }
 
         function moveToNextPart() {
-            fetch('/next_part', {
+            fetch('{{ request.script_root }}/next_part', {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/json' }
             })
@@ -1050,6 +1268,7 @@ PROBLEM_TEMPLATE = """<!DOCTYPE html>
             
             messagesDiv.appendChild(messageDiv);
             messagesDiv.scrollTop = messagesDiv.scrollHeight;
+            return messageDiv;
         }
 
         function updateAttemptCounter() {
@@ -1085,21 +1304,16 @@ PROBLEM_TEMPLATE = """<!DOCTYPE html>
                 const part = this.dataset.part;
                 addMessage('Can you help me with ' + this.textContent + '?', 'user');
                 
-                fetch('/chat', {
-                    method: 'POST',
-                    headers: { 'Content-Type': 'application/json' },
-                    body: JSON.stringify({ message: 'Can you help me with ' + this.textContent + '?' })
-                })
-                .then(response => response.json())
-                .then(data => {
-                    addMessage(data.response, 'assistant');
-                });
+                streamReply('Can you help me with ' + this.textContent + '?');
             });
         });
     </script>
 </body>
 </html>"""
 
+templates.page('index', INDEX_TEMPLATE)
+templates.compile('problem', PROBLEM_TEMPLATE)
+
 if __name__ == '__main__':
     print("=" * 70)
     print("Subnet Range Tutor - Progressive 5-Level Mentoring")
@@ -1120,4 +1334,4 @@ if __name__ == '__main__':
     print("Server starting on http://0.0.0.0:5002")
     print("=" * 70)
     
-    app.run(debug=False, host='0.0.0.0', port=5002, use_reloader=False)
+    serve(app, host='0.0.0.0', port=5002, debug=False, use_reloader=False)
@@ -0,0 +1,107 @@
+"""
+Template Registry - Compile each page template once, pre-render the static ones
+
+render_template_string() lexes, parses and compiles its source into Python
+code on every call. The agents' index pages are 10-30 KB of inline HTML with
+no per-request variables, so the output never changes:
+- page(name, source)     renders once at import to UTF-8 bytes with a strong
+                         ETag; serve(name, request) returns those bytes, or
+                         an empty 304 when the browser's If-None-Match matches
+- compile(name, source)  compiles once; render(name, **context) only runs
+                         the compiled template (Flask context processors
+                         still apply)
+
+    python template_registry.py     # per-request CPU: render_template_string vs serve
+"""
+
+import hashlib
+import time
+from collections import namedtuple
+
+from flask import Response
+
+StaticPage = namedtuple('StaticPage', ['body', 'etag'])
+
+
+def static_page(html):
+    """Encode once and fingerprint the bytes for the ETag"""
+    body = html.encode('utf-8')
+    return StaticPage(body, hashlib.sha256(body).hexdigest()[:32])
+
+
+def page_response(page, request, max_age=None):
+    """Response for a StaticPage, 304 when If-None-Match matches
+
+    Without max_age the browser must revalidate every time (the page can
+    change on the next deploy); with it the page may be reused that long.
+    """
+    response = Response(page.body, mimetype='text/html')
+    response.set_etag(page.etag)
+    if max_age:
+        response.cache_control.public = True
+        response.cache_control.max_age = max_age
+    else:
+        response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+
+class TemplateRegistry:
+    """One app's compiled templates and pre-rendered pages"""
+
+    def __init__(self, app):
+        self.app = app
+        self._templates = {}
+        self.pages = {}
+
+    def compile(self, name, source):
+        self._templates[name] = self.app.jinja_env.from_string(source)
+        return self._templates[name]
+
+    def render(self, name, **context):
+        """Render a compiled template like render_template_string would"""
+        self.app.update_template_context(context)
+        return self._templates[name].render(context)
+
+    def page(self, name, source):
+        """Pre-render a template with no per-request variables"""
+        with self.app.app_context():
+            self.pages[name] = static_page(self.compile(name, source).render())
+        return self.pages[name]
+
+    def serve(self, name, request, max_age=None):
+        return page_response(self.pages[name], request, max_age)
+
+
+# ---------------------------------------------------------------- benchmark
+
+def per_request_us(call, repeat):
+    started = time.process_time()
+    for _ in range(repeat):
+        call()
+    return (time.process_time() - started) / repeat * 1e6
+
+
+def benchmark(repeat=500):
+    """CPU microseconds per index request: the old render_template_string path vs the registry"""
+    import importlib
+
+    from flask import render_template_string, request
+
+    agents = [('basicNetworkAddressingV4_NO_API_KEY', 'HTML_TEMPLATE'), ('custom_subnet_mask_assignments', 'HTML_TEMPLATE'),
+              ('subnet_range_tutor_agent_5', 'INDEX_TEMPLATE'), ('vlsm_tutor_agent_5', 'HTML_TEMPLATE'),
+              ('NetworkAnalyzer', 'HTML_TEMPLATE'), ('mac_mentor', 'HTML_TEMPLATE')]
+    print(f"{'agent':40} {'KB':>5} {'render_template_string':>22} {'registry':>9} {'304':>7}")
+    for module_name, template_name in agents:
+        module = importlib.import_module(module_name)
+        source = getattr(module, template_name)
+        page = module.templates.pages['index']
+        with module.app.test_request_context('/'):
+            before = per_request_us(lambda: Response(render_template_string(source)), repeat)
+            after = per_request_us(lambda: module.templates.serve('index', request), repeat)
+        with module.app.test_request_context('/', headers={'If-None-Match': f'"{page.etag}"'}):
+            revalidated = per_request_us(lambda: module.templates.serve('index', request), repeat)
+        print(f"{module_name:40} {len(page.body) / 1024:5.1f} {before:19.0f} us {after:6.0f} us {revalidated:4.0f} us")
+
+
+if __name__ == '__main__':
+    benchmark()
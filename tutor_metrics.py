@@ -0,0 +1,70 @@
+"""
+Tutor Metrics - In-process counters, gauges and latency samples for the tutor agents
+Each agent exposes its own slice of the registry at /stats
+"""
+
+import threading
+from collections import defaultdict, deque
+
+
+class Metrics:
+    """Thread-safe registry of counters, gauges and recent latency samples"""
+
+    def __init__(self, window=1000):
+        self.window = window
+        self._counters = defaultdict(int)
+        self._gauges = {}
+        self._samples = defaultdict(lambda: deque(maxlen=self.window))
+        self._lock = threading.Lock()
+
+    def incr(self, name, amount=1):
+        with self._lock:
+            self._counters[name] += amount
+
+    def set_gauge(self, name, value):
+        with self._lock:
+            self._gauges[name] = value
+
+    def observe(self, name, value):
+        """Record one sample (e.g. a latency in ms); only the last `window` are kept"""
+        with self._lock:
+            self._samples[name].append(value)
+
+    def _recent(self, name, last):
+        samples = list(self._samples.get(name, ()))
+        return samples[-last:] if last else samples
+
+    def count(self, name, last=None):
+        """Number of recent samples (at most `last`)"""
+        with self._lock:
+            return len(self._recent(name, last))
+
+    def percentile(self, name, pct, last=None):
+        """Percentile of the recent samples (or only the `last` few), None if nothing was recorded yet"""
+        with self._lock:
+            samples = sorted(self._recent(name, last))
+        if not samples:
+            return None
+        index = min(len(samples) - 1, int(round(pct / 100.0 * (len(samples) - 1))))
+        return samples[index]
+
+    def snapshot(self, prefix=''):
+        """Plain-dict view of everything whose name starts with prefix"""
+        with self._lock:
+            counters = {k: v for k, v in self._counters.items() if k.startswith(prefix)}
+            gauges = {k: v for k, v in self._gauges.items() if k.startswith(prefix)}
+            samples = {k: sorted(v) for k, v in self._samples.items() if k.startswith(prefix) and v}
+
+        latencies = {}
+        for name, values in samples.items():
+            latencies[name] = {
+                'count': len(values),
+                'p50': round(values[len(values) // 2], 2),
+                'p95': round(values[min(len(values) - 1, int(len(values) * 0.95))], 2),
+                'max': round(values[-1], 2)
+            }
+        return {'counters': counters, 'gauges': gauges, 'latencies': latencies}
+
+
+# Shared registry - one per process
+metrics = Metrics()
@@ -0,0 +1,199 @@
+"""
+Unified Host - Every tutor app in one process, mounted under path prefixes
+
+RUN_THIS_FIXED_LAUNCHER.py starts one Python process per agent plus one for
+the menu, and each imports Flask, anthropic and the shared modules again and
+holds its own gateway, hint cache and metrics. Here the same apps are mounted
+in a single WSGI process with DispatcherMiddleware:
+
+    /agent1    IPv4 Basics                 /agent4    VLSM
+    /agent2    Custom Subnet Masks         /analyzer  NetworkAnalyzer
+    /agent3    Subnet Ranges               /mac       MACMentor
+
+so they share one LLM gateway (one pooled client, one in-flight limit and
+queue, one single-flight table), one metrics registry and the subnet engine
+tables. The pages call their endpoints with relative URLs, so they work
+mounted or standalone; each app's session cookie is scoped to its prefix.
+
+    python unified_host.py [--port 5000]    # menu at http://localhost:5000
+    python unified_host.py --server waitress --threads 40
+    python unified_host.py measure          # startup time and RSS: one process vs one per app
+"""
+
+import argparse
+import importlib
+import os
+import subprocess
+import sys
+import time
+import urllib.request
+
+from flask import Flask, request
+from werkzeug.middleware.dispatcher import DispatcherMiddleware
+from werkzeug.utils import redirect
+
+from compression_middleware import CompressionMiddleware
+from serving import add_arguments, serve
+from template_registry import TemplateRegistry
+
+# (prefix, module, title)
+MOUNTS = [
+    ('/agent1', 'basicNetworkAddressingV4_NO_API_KEY', 'IPv4 Basics'),
+    ('/agent2', 'custom_subnet_mask_assignments', 'Custom Subnet Masks'),
+    ('/agent3', 'subnet_range_tutor_agent_5', 'Subnet Ranges'),
+    ('/agent4', 'vlsm_tutor_agent_5', 'VLSM'),
+    ('/analyzer', 'NetworkAnalyzer', 'NetworkAnalyzer'),
+    ('/mac', 'mac_mentor', 'MACMentor')
+]
+
+MENU_HTML = """<!DOCTYPE html>
+<html>
+<head>
+    <title>Networking Tutor Suite</title>
+    <meta charset="UTF-8">
+    <style>
+        body { font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif; background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); min-height: 100vh; padding: 40px 20px; margin: 0; }
+        .container { max-width: 900px; margin: 0 auto; }
+        h1 { color: white; text-align: center; margin-bottom: 30px; }
+        .agents { display: grid; grid-template-columns: repeat(auto-fit, minmax(250px, 1fr)); gap: 20px; }
+        .agent { background: white; border-radius: 12px; padding: 25px; text-decoration: none; color: #333; box-shadow: 0 6px 20px rgba(0,0,0,0.2); }
+        .agent:hover { transform: translateY(-3px); }
+        .agent h2 { color: #667eea; margin: 0 0 8px; }
+        .agent span { color: #888; font-family: monospace; }
+    </style>
+</head>
+<body>
+    <div class="container">
+        <h1>🌐 Networking Tutor Suite</h1>
+        <div class="agents">
+{cards}
+        </div>
+    </div>
+</body>
+</html>"""
+
+
+def add_trailing_slash(app):
+    """Redirect /agent1 to /agent1/ so the page's relative URLs resolve under the prefix"""
+    def redirecting(environ, start_response):
+        if not environ.get('PATH_INFO'):
+            location = environ.get('SCRIPT_NAME', '') + '/'
+            if environ.get('QUERY_STRING'):
+                location += '?' + environ['QUERY_STRING']
+            return redirect(location, 308)(environ, start_response)
+        return app(environ, start_response)
+    return redirecting
+
+
+def menu_app():
+    app = Flask(__name__)
+    templates = TemplateRegistry(app)
+    cards = '\n'.join(f'            <a class="agent" href="{prefix}/"><h2>{title}</h2><span>{prefix}/</span></a>'
+                      for prefix, _, title in MOUNTS)
+    templates.page('index', MENU_HTML.replace('{cards}', cards))
+    app.add_url_rule('/', 'index', lambda: templates.serve('index', request))
+    app.wsgi_app = CompressionMiddleware(app.wsgi_app, 'unified_host')
+    return app
+
+
+def build_application():
+    """The menu at / and every agent app under its prefix, in this process"""
+    mounts = {}
+    for prefix, module_name, _ in MOUNTS:
+        app = importlib.import_module(module_name).app
+        app.config['SESSION_COOKIE_PATH'] = prefix  # Sessions don't clobber each other on one host
+        mounts[prefix] = add_trailing_slash(app.wsgi_app)
+    return DispatcherMiddleware(menu_app().wsgi_app, mounts)
+
+
+# ---------------------------------------------------------------- measurement
+
+def rss_mb(pid):
+    """Resident set size of one process in MB (Linux /proc, or psutil where installed)"""
+    try:
+        import psutil
+        return psutil.Process(pid).memory_info().rss / 2 ** 20
+    except ImportError:
+        pass
+    try:
+        with open(f'/proc/{pid}/status') as status:
+            for line in status:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def wait_until_up(urls, timeout=60):
+    """Poll until every URL answers 200; seconds taken"""
+    started = time.perf_counter()
+    pending = list(urls)
+    while pending:
+        if time.perf_counter() - started > timeout:
+            raise TimeoutError(f"Not up after {timeout} s: {pending}")
+        try:
+            with urllib.request.urlopen(pending[0], timeout=2) as response:
+                if response.status == 200:
+                    pending.pop(0)
+                    continue
+        except OSError:
+            pass
+        time.sleep(0.05)
+    return time.perf_counter() - started
+
+
+def measure(base_port=5100):
+    """Start the apps one process each (as the launcher does), then all in one unified host; compare"""
+    here = os.path.dirname(os.path.abspath(__file__))
+    results = {}
+
+    # The menu stands in for the launcher's own process (importing the launcher would spawn the agents)
+    apps = [('unified_host', 'menu_app()')] + [(module_name, 'app') for _, module_name, _ in MOUNTS]
+    processes = []
+    urls = []
+    for port, (module_name, app) in enumerate(apps, base_port):
+        code = f"import {module_name}; {module_name}.{app}.run(port={port}, use_reloader=False)"
+        processes.append(subprocess.Popen([sys.executable, '-c', code], cwd=here,
+                                          stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL))
+        urls.append(f'http://localhost:{port}/')
+    try:
+        startup = wait_until_up(urls)
+        results['one process per app'] = (len(processes), startup, [rss_mb(p.pid) for p in processes])
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait()
+
+    port = base_port + len(apps)
+    process = subprocess.Popen([sys.executable, __file__, '--port', str(port)], cwd=here,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        startup = wait_until_up([f'http://localhost:{port}/'] + [f'http://localhost:{port}{prefix}/' for prefix, _, _ in MOUNTS])
+        results['unified host'] = (1, startup, [rss_mb(process.pid)])
+    finally:
+        process.terminate()
+        process.wait()
+
+    print(f"{'layout':22} {'processes':>9} {'startup':>9} {'RSS':>10}")
+    for layout, (count, startup, rss) in results.items():
+        total = f"{sum(rss):7.1f} MB" if None not in rss else '   n/a'
+        print(f"{layout:22} {count:9} {startup:7.2f} s {total:>10}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="All tutor apps in one process")
+    parser.add_argument('command', nargs='?', choices=['serve', 'measure'], default='serve')
+    args = add_arguments(parser).parse_args()
+
+    if args.command == 'measure':
+        measure()
+    else:
+        application = build_application()
+        host, port = args.host or 'localhost', args.port or 5000
+        print(f"Networking Tutor Suite on http://{host}:{port}/")
+        for prefix, _, title in MOUNTS:
+            print(f"  {title:20} http://{host}:{port}{prefix}/")
+        single_process = [importlib.import_module(module_name).app.config.get('SINGLE_PROCESS')
+                          for _, module_name, _ in MOUNTS]
+        serve(application, host, port, args, single_process='; '.join(filter(None, single_process)))
@@ -0,0 +1,177 @@
+"""
+VLSM Engine - Allocate and check variable-length subnets with integer math
+
+allocate(base, requirements) sorts the host requirements largest first and
+hands out aligned blocks from the start of the base network - the method the
+VLSM worksheets teach - giving every subnet's CIDR, mask, range and
+broadcast. check_allocation() grades any student-submitted allocation for
+alignment, fit and overlap in O(n log n) (one sort, then a sweep).
+
+Requirements are (name, hosts_needed) pairs; the base is "a.b.c.d/p" or a
+bare address, which gets its classful default prefix.
+"""
+
+import bisect
+
+from subnet_engine import DEFAULT_PREFIX, PREFIX_MASKS, PREFIX_SIZES, address_class, int_to_ip, ip_to_int, prefix_to_mask
+
+# Smallest subnet handed out - a point-to-point link still needs 2 usable hosts
+MAX_PREFIX = 30
+
+
+def parse_cidr(text, default_prefix=True):
+    """'a.b.c.d/p' -> (network int, prefix); a bare address gets its classful prefix when allowed"""
+    address, _, prefix = text.strip().partition('/')
+    value = ip_to_int(address)
+    if not prefix:
+        if not default_prefix:
+            raise ValueError(f"{text.strip()} is missing its /prefix")
+        cls = address_class(value)
+        if cls not in DEFAULT_PREFIX:
+            raise ValueError(f"Class {cls} addresses have no default prefix")
+        return value, DEFAULT_PREFIX[cls]
+    prefix = int(prefix)
+    if not 0 <= prefix <= 32:
+        raise ValueError(f"/{prefix} is not a valid prefix length (0-32)")
+    return value, prefix
+
+
+def prefix_for_hosts(hosts):
+    """Longest prefix whose block holds hosts + 2 addresses (network ID and broadcast)"""
+    return min(MAX_PREFIX, 32 - (int(hosts) + 1).bit_length())
+
+
+class VlsmSubnet:
+    """One allocated (or submitted) block"""
+
+    def __init__(self, name, hosts_needed, network, prefix):
+        self.name = name
+        self.hosts_needed = hosts_needed
+        self.network = network
+        self.prefix = prefix
+
+    @property
+    def size(self):
+        return PREFIX_SIZES[self.prefix]
+
+    @property
+    def broadcast(self):
+        return self.network + self.size - 1
+
+    @property
+    def usable_hosts(self):
+        return self.size - 2
+
+    @property
+    def cidr(self):
+        return f"{int_to_ip(self.network)}/{self.prefix}"
+
+    @property
+    def mask(self):
+        return prefix_to_mask(self.prefix)
+
+    @property
+    def host_range(self):
+        return f"{int_to_ip(self.network + 1)} - {int_to_ip(self.broadcast - 1)}"
+
+    def as_dict(self):
+        return {
+            'name': self.name,
+            'hosts_needed': self.hosts_needed,
+            'cidr': self.cidr,
+            'mask': self.mask,
+            'block_size': self.size,
+            'usable_hosts': self.usable_hosts,
+            'host_range': self.host_range,
+            'broadcast': int_to_ip(self.broadcast)
+        }
+
+
+def allocate(base, requirements):
+    """VlsmSubnets for the requirements, largest first, in the order they were given
+
+    Ties keep their given order. Raises ValueError when they don't all fit.
+    """
+    base_network, base_prefix = parse_cidr(base)
+    base_network &= PREFIX_MASKS[base_prefix]
+    base_end = base_network + PREFIX_SIZES[base_prefix]
+
+    order = sorted(range(len(requirements)), key=lambda i: -int(requirements[i][1]))
+    subnets = [None] * len(requirements)
+    cursor = base_network
+    for i in order:
+        name, hosts = requirements[i]
+        prefix = prefix_for_hosts(hosts)
+        if prefix < base_prefix:
+            raise ValueError(f"{name} needs {hosts} hosts - more than the whole /{base_prefix}")
+        size = PREFIX_SIZES[prefix]
+        cursor = (cursor + size - 1) & PREFIX_MASKS[prefix]  # Next block boundary
+        if cursor + size > base_end:
+            raise ValueError(f"Not enough room left in {int_to_ip(base_network)}/{base_prefix} for {name} ({hosts} hosts)")
+        subnets[i] = VlsmSubnet(name, hosts, cursor, prefix)
+        cursor += size
+    return subnets
+
+
+def subnet_issues(subnet, base_network, base_prefix):
+    """Problems with one subnet on its own: alignment, inside the base network, enough hosts"""
+    issues = []
+    if subnet.prefix > 32 or subnet.prefix < base_prefix:
+        return [f"/{subnet.prefix} cannot be carved out of a /{base_prefix}"]
+    if subnet.network & ~PREFIX_MASKS[subnet.prefix] & 0xFFFFFFFF:
+        boundary = subnet.network & PREFIX_MASKS[subnet.prefix]
+        issues.append(f"{int_to_ip(subnet.network)} is not on a /{subnet.prefix} boundary - /{subnet.prefix} blocks "
+                      f"are {subnet.size} addresses, so the nearest one starts at {int_to_ip(boundary)}")
+    if subnet.network & PREFIX_MASKS[base_prefix] != base_network:
+        issues.append(f"{subnet.cidr} is outside the {int_to_ip(base_network)}/{base_prefix} network")
+    if subnet.hosts_needed is not None and subnet.usable_hosts < int(subnet.hosts_needed):
+        issues.append(f"/{subnet.prefix} gives only {subnet.usable_hosts} usable hosts, but {subnet.name} needs "
+                      f"{subnet.hosts_needed} (use /{prefix_for_hosts(subnet.hosts_needed)})")
+    return issues
+
+
+def check_allocation(base, requirements, submitted):
+    """[issues] per requirement, in order, for a submitted allocation (one CIDR string per requirement)
+
+    Every subnet is checked on its own, then all of them are sorted by start
+    address and swept once for overlaps - O(n log n) overall. A requirement
+    with no issues gets an empty list; a missing subnet is an issue, and
+    extra subnets get entries of their own past the end of the requirements.
+    """
+    base_network, base_prefix = parse_cidr(base)
+    base_network &= PREFIX_MASKS[base_prefix]
+
+    issues = [[] for _ in range(max(len(requirements), len(submitted)))]
+    subnets = []  # (index, VlsmSubnet)
+    for i, (name, hosts) in enumerate(requirements):
+        if i >= len(submitted):
+            issues[i].append(f"no subnet was submitted for {name}")
+            continue
+        try:
+            network, prefix = parse_cidr(submitted[i], default_prefix=False)
+        except ValueError as e:
+            issues[i].append(str(e))
+            continue
+        subnet = VlsmSubnet(name, hosts, network, prefix)
+        issues[i] += subnet_issues(subnet, base_network, base_prefix)
+        subnets.append((i, subnet))
+    for i in range(len(requirements), len(submitted)):
+        issues[i].append(f"{submitted[i]} is extra - there are only {len(requirements)} requirements")
+
+    furthest = None  # (index, block reaching furthest so far)
+    for i, subnet in sorted(subnets, key=lambda entry: entry[1].network):
+        if furthest is not None and subnet.network <= furthest[1].broadcast:
+            j, other = furthest
+            issues[i].append(f"{subnet.cidr} overlaps {other.name} ({other.cidr})")
+            issues[j].append(f"{other.cidr} overlaps {subnet.name} ({subnet.cidr})")
+        if furthest is None or subnet.broadcast > furthest[1].broadcast:
+            furthest = (i, subnet)
+    return issues
+
+
+def overlapping(subnet, taken):
+    """The block in `taken` (non-overlapping VlsmSubnets sorted by network) that `subnet` overlaps, or None"""
+    i = bisect.bisect_right([other.network for other in taken], subnet.broadcast) - 1
+    if i >= 0 and taken[i].broadcast >= subnet.network:
+        return taken[i]
+    return None
@@ -16,16 +16,34 @@ Setup in Spyder:
 4. Open browser: http://localhost:5002
 """
 
-from flask import Flask, render_template_string, request, jsonify, session
-from anthropic import Anthropic
+from flask import Flask, request, jsonify, session
 import os
+import re
 import secrets
+from compression_middleware import CompressionMiddleware
+from llm_gateway import GatewayBusy, gateway
+from llm_streaming import sse_response
+from model_router import router
+from prompt_cache import cacheable_system, mark_last_message
+from serving import serve
+from subnet_engine import ip_to_int
+from template_registry import TemplateRegistry
+from tutor_metrics import metrics
+from vlsm_engine import VlsmSubnet, allocate, check_allocation, overlapping, parse_cidr, subnet_issues
 
 app = Flask(__name__)
 app.secret_key = secrets.token_hex(16)
+templates = TemplateRegistry(app)
 
-# Initialize Anthropic client
-client = Anthropic(api_key=os.environ.get("ANTHROPIC_API_KEY"))
+AGENT_NAME = "vlsm"
+app.wsgi_app = CompressionMiddleware(app.wsgi_app, AGENT_NAME)
+
+# An answer attempt is just an IPv4 address, with or without /prefix ("my answer is" allowed in front);
+# a question that mentions an address ("why does 10.0.0.0 start at .0?") goes to Claude
+ANSWER_PATTERN = re.compile(r'^\s*(?:(?:my |the )?answer(?: is)?:?|is it|it\'s|it is|i think(?: it\'s| it is)?)?\s*'
+                            r'(\d{1,3}(?:\.\d{1,3}){3})\s*(?:/\s*(\d{1,2}))?\s*[.!?]*\s*$', re.IGNORECASE)
+# "hint", "hint please", "give me a hint", ... - served from the part's hint ladder
+HINT_REQUEST_PATTERN = re.compile(r'^\s*(?:(?:can i |could i )?(?:get |have |give me )?(?:a |another |next |the next )?hint|help)\s*(?:please|pls)?\s*[.!?]*\s*$', re.IGNORECASE)
 
 # VLSM Problems with Visual Diagrams
 PROBLEMS = {
@@ -350,6 +368,21 @@ PROBLEMS = {
     }
 }
 
+def derive_allocations():
+    """{problem_num: {part_num: VlsmSubnet}} from the VLSM engine, cross-checked against the typed answers"""
+    allocations = {}
+    for problem_num, problem in PROBLEMS.items():
+        parts = problem['parts']
+        subnets = allocate(problem['network'], [(part['subnet'], part['hosts_needed']) for part in parts.values()])
+        allocations[problem_num] = dict(zip(parts, subnets))
+        for part_num, subnet in allocations[problem_num].items():
+            if parts[part_num]['answer'] != subnet.cidr:
+                print(f"[WARN] VLSM problem {problem_num} part {part_num}: typed answer {parts[part_num]['answer']!r} != VLSM engine {subnet.cidr!r} (using the engine's)")
+    return allocations
+
+# Grading uses the engine's allocation; the typed answers above are cross-checked at startup
+ALLOCATIONS = derive_allocations()
+
 # System Prompt
 SYSTEM_PROMPT = """You are a patient Cisco networking tutor teaching VLSM through sequential parts.
 
@@ -624,7 +657,7 @@ HTML_TEMPLATE = """<!DOCTYPE html>
         }
 
         function loadProblemDetails(problemNum) {
-            fetch('/get_problem/' + problemNum)
+            fetch('get_problem/' + problemNum)
                 .then(function(response) { return response.json(); })
                 .then(function(data) {
                     document.getElementById('problem-details').innerHTML = data.html;
@@ -635,7 +668,7 @@ HTML_TEMPLATE = """<!DOCTYPE html>
         }
 
         function loadPart(problemNum, partNum) {
-            fetch('/get_part/' + problemNum + '/' + partNum)
+            fetch('get_part/' + problemNum + '/' + partNum)
                 .then(function(response) { return response.json(); })
                 .then(function(data) {
                     const chatContainer = document.getElementById('chat-container');
@@ -660,44 +693,96 @@ HTML_TEMPLATE = """<!DOCTYPE html>
             sendBtn.disabled = true;
             sendBtn.innerHTML = '<span class="loading"></span>';
             
-            fetch('/chat', {
-                method: 'POST',
-                headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({
-                    message: message,
-                    problem_num: currentProblem,
-                    current_part: currentPart,
-                    history: conversationHistory
-                })
-            })
-            .then(function(response) { return response.json(); })
-            .then(function(data) {
-                addMessage(data.response, 'assistant');
-                conversationHistory = data.history;
-                
-                if (data.next_part) {
-                    var nextPartNum = data.next_part;
-                    
-                    var continueMsg = '<div style="background: linear-gradient(135deg, #11998e 0%, #38ef7d 100%); color: white; padding: 20px; border-radius: 10px; text-align: center; margin: 20px 0;">' +
-                        '<div style="font-size: 1.2em; font-weight: bold; margin-bottom: 15px;">✅ Correct! Great job!</div>' +
-                        '<button id="continueBtn" onclick="continueToNextPart(' + nextPartNum + ')" style="background: white; color: #11998e; border: none; padding: 12px 30px; border-radius: 8px; font-size: 1.1em; font-weight: bold; cursor: pointer; box-shadow: 0 4px 6px rgba(0,0,0,0.1); transition: transform 0.2s;">Continue to Part ' + nextPartNum + ' →</button>' +
-                        '</div>';
-                    addMessage(continueMsg, 'assistant');
+            var replyDiv = null;
+            var replyText = '';
+            var nextPartNum = null;
+            
+            streamChat('chat_stream', {
+                message: message,
+                problem_num: currentProblem,
+                current_part: currentPart,
+                history: conversationHistory
+            }, {
+                meta: function(data) {
+                    nextPartNum = data.next_part;
+                },
+                token: function(data) {
+                    // Render the reply as it arrives instead of waiting for the whole answer
+                    if (!replyDiv) {
+                        replyDiv = addMessage('', 'assistant');
+                    }
+                    replyText += data.text;
+                    replyDiv.innerHTML = replyText.replace(/\\n/g, '<br>');
+                    const chatContainer = document.getElementById('chat-container');
+                    chatContainer.scrollTop = chatContainer.scrollHeight;
+                },
+                error: function(data) {
+                    console.error('Error:', data.error);
+                    addMessage('Sorry, error occurred. Try again.', 'assistant');
+                },
+                done: function(data) {
+                    conversationHistory = data.history;
+                    console.log('Time to first token (ms):', data.ttft_ms, 'Total (ms):', data.total_ms);
                     
-                    currentPart = nextPartNum;
+                    if (nextPartNum) {
+                        var continueMsg = '<div style="background: linear-gradient(135deg, #11998e 0%, #38ef7d 100%); color: white; padding: 20px; border-radius: 10px; text-align: center; margin: 20px 0;">' +
+                            '<div style="font-size: 1.2em; font-weight: bold; margin-bottom: 15px;">✅ Correct! Great job!</div>' +
+                            '<button id="continueBtn" onclick="continueToNextPart(' + nextPartNum + ')" style="background: white; color: #11998e; border: none; padding: 12px 30px; border-radius: 8px; font-size: 1.1em; font-weight: bold; cursor: pointer; box-shadow: 0 4px 6px rgba(0,0,0,0.1); transition: transform 0.2s;">Continue to Part ' + nextPartNum + ' →</button>' +
+                            '</div>';
+                        addMessage(continueMsg, 'assistant');
+                        
+                        currentPart = nextPartNum;
+                    }
                 }
-                
-                sendBtn.disabled = false;
-                sendBtn.innerHTML = 'Send';
             })
             .catch(function(error) {
                 console.error('Error:', error);
                 addMessage('Sorry, error occurred. Try again.', 'assistant');
+            })
+            .finally(function() {
                 sendBtn.disabled = false;
                 sendBtn.innerHTML = 'Send';
             });
         }
 
+        // POST to a Server-Sent Events endpoint and hand each event to handlers[event]
+        function streamChat(url, payload, handlers) {
+            return fetch(url, {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify(payload)
+            })
+            .then(function(response) {
+                if (!response.ok || !response.body) {
+                    throw new Error('Stream request failed: ' + response.status);
+                }
+                const reader = response.body.getReader();
+                const decoder = new TextDecoder();
+                var buffer = '';
+                
+                function pump() {
+                    return reader.read().then(function(result) {
+                        if (result.done) return;
+                        buffer += decoder.decode(result.value, { stream: true });
+                        var boundary;
+                        while ((boundary = buffer.indexOf('\\n\\n')) !== -1) {
+                            const block = buffer.slice(0, boundary);
+                            buffer = buffer.slice(boundary + 2);
+                            var eventName = 'message';
+                            var eventData = '';
+                            block.split('\\n').forEach(function(line) {
+                                if (line.indexOf('event: ') === 0) eventName = line.slice(7);
+                                else if (line.indexOf('data: ') === 0) eventData += line.slice(6);
+                            });
+                            if (handlers[eventName]) handlers[eventName](JSON.parse(eventData));
+                        }
+                        return pump();
+                    });
+                }
+                return pump();
+            });
+        }
+
         function addMessage(text, sender) {
             const chatContainer = document.getElementById('chat-container');
             const messageDiv = document.createElement('div');
@@ -705,6 +790,7 @@ HTML_TEMPLATE = """<!DOCTYPE html>
             messageDiv.innerHTML = text.replace(/\\n/g, '<br>');
             chatContainer.appendChild(messageDiv);
             chatContainer.scrollTop = chatContainer.scrollHeight;
+            return messageDiv;
         }
 
         function continueToNextPart(partNum) {
@@ -721,9 +807,11 @@ HTML_TEMPLATE = """<!DOCTYPE html>
 </body>
 </html>"""
 
+templates.page('index', HTML_TEMPLATE)
+
 @app.route('/')
 def index():
-    return render_template_string(HTML_TEMPLATE)
+    return templates.serve('index', request)
 
 @app.route('/get_problem/<int:problem_num>')
 def get_problem(problem_num):
@@ -774,14 +862,82 @@ def get_part(problem_num, part_num):
         return jsonify({"error": "Part not found"}), 404
     
     session[f'problem_{problem_num}_part'] = part_num
+    session.pop(attempts_key(problem_num, part_num), None)
     
     message = f'<strong>📋 Problem {problem_num} - Part {part_num}</strong><br><strong>{part["subnet"]}</strong><br><br><div style="background:#fff3cd;padding:15px;border-radius:5px;margin:10px 0"><strong>Question:</strong> {part["question"]}</div><strong>Format:</strong> X.X.X.X/XX<br><em>Example: 192.168.1.0/25</em><br><br>Type your answer or ask for hint!'
     
     return jsonify({"message": message})
 
-@app.route('/chat', methods=['POST'])
-def chat():
-    data = request.json
+def attempts_key(problem_num, part_num):
+    return f'problem_{problem_num}_part_{part_num}_attempts'
+
+def grade_answer(user_message, problem_num, part_num):
+    """Deterministic CIDR grading - returns (is_answer_attempt, is_correct, issues)
+    
+    issues says what is wrong with a wrong answer: alignment, size, or overlap
+    with the subnets of the earlier parts.
+    """
+    subnet = ALLOCATIONS[problem_num][part_num]
+    match = ANSWER_PATTERN.match(user_message)
+    if not match:
+        return False, False, []
+    
+    address, prefix = match.group(1), match.group(2)
+    try:
+        network = ip_to_int(address)
+    except ValueError:
+        return True, False, [f"{address} is not a valid IPv4 address - each octet must be 0-255"]
+    if prefix is None:
+        return True, False, [f"{address} is missing its /prefix - the answer format is X.X.X.X/XX"]
+    if (network, int(prefix)) == (subnet.network, subnet.prefix):
+        return True, True, []
+    
+    submitted = VlsmSubnet(subnet.name, subnet.hosts_needed, network, int(prefix))
+    issues = subnet_issues(submitted, *parse_cidr(PROBLEMS[problem_num]['network']))
+    if issues:
+        return True, False, issues
+    
+    earlier = sorted((s for n, s in ALLOCATIONS[problem_num].items() if n < part_num), key=lambda s: s.network)
+    clash = overlapping(submitted, earlier)
+    if clash:
+        issues.append(f"{submitted.cidr} overlaps {clash.name} ({clash.cidr}), which is already allocated")
+    elif submitted.prefix < subnet.prefix:
+        issues.append(f"/{submitted.prefix} fits, but it is bigger than needed - VLSM uses the smallest block that holds {subnet.hosts_needed} hosts")
+    else:
+        issues.append(f"/{submitted.prefix} is the right size - but VLSM packs the subnets in order, so this one starts right where the previous subnet ends")
+    return True, False, issues
+
+def local_reply(problem_num, current_part, part, user_message):
+    """Answer attempts and hint requests from the part's own hint ladder
+    
+    Returns (reply, is_correct), or None for free-form questions that need Claude.
+    The attempt level is tracked in the session, not trusted from the client.
+    """
+    is_attempt, is_correct, issues = grade_answer(user_message, problem_num, current_part)
+    if not is_attempt and not HINT_REQUEST_PATTERN.match(user_message):
+        return None
+    
+    if is_correct:
+        metrics.incr(f'{AGENT_NAME}.local_correct')
+        return f"🎉 Correct! {ALLOCATIONS[problem_num][current_part].cidr} is the {part['subnet']} subnet.\n\n{part['hint_level_5']}", True
+    
+    key = attempts_key(problem_num, current_part)
+    attempts = session.get(key, 0) + 1
+    session[key] = attempts
+    level = min(attempts, 5)
+    
+    metrics.incr(f'{AGENT_NAME}.local_hints')
+    if is_attempt:
+        checks = ''.join(f"🔎 {issue}\n" for issue in issues)
+        return f"Not quite - that's attempt {attempts}.\n{checks}\n💡 Hint {level}: {part[f'hint_level_{level}']}", False
+    return f"💡 Hint {level}: {part[f'hint_level_{level}']}", False
+
+def prepare_turn(data):
+    """Grade the answer and work out the reply for one chat turn
+    
+    Returns (turn, None) or (None, (error_message, status)). A turn with a
+    'response' was answered locally; otherwise 'request' holds the Claude call.
+    """
     user_message = data.get('message', '')
     problem_num = data.get('problem_num', 1)
     current_part = data.get('current_part', 1)
@@ -789,11 +945,11 @@ def chat():
     
     problem = PROBLEMS.get(problem_num)
     if not problem:
-        return jsonify({"error": "Not found"}), 404
+        return None, ("Not found", 404)
     
     part = problem['parts'].get(current_part)
     if not part:
-        return jsonify({"error": "Part not found"}), 404
+        return None, ("Part not found", 404)
     
     part_context = f"""PROBLEM: {problem['name']} - Part {current_part}
 Network: {problem['network']} (Class {problem['network_class']})
@@ -801,7 +957,7 @@ Network: {problem['network']} (Class {problem['network_class']})
 PART: {part['subnet']}
 Question: {part['question']}
 Hosts: {part['hosts_needed']}
-Correct Answer: {part['answer']}
+Correct Answer: {ALLOCATIONS[problem_num][current_part].cidr}
 
 HINTS:
 L1: {part['hint_level_1']}
@@ -810,52 +966,182 @@ L3: {part['hint_level_3']}
 L4: {part['hint_level_4']}
 L5: {part['hint_level_5']}
 
-Check answer against: {part['answer']}
-If correct: celebrate, explain briefly
-If wrong: explain, offer hint
-Use specific hints above!"""
+Answers and hint requests are graded separately - the student is asking a question.
+Answer it using the specific hints above, without giving away: {ALLOCATIONS[problem_num][current_part].cidr}"""
+    
+    turn = {
+        'problem_num': problem_num,
+        'user_message': user_message,
+        'history': history,
+        'next_part': None
+    }
+    
+    # Answers and hint requests never need a network round trip
+    local = local_reply(problem_num, current_part, part, user_message)
+    if local is not None:
+        turn['response'], is_correct = local
+        if is_correct and current_part < len(problem['parts']):
+            turn['next_part'] = current_part + 1
+        return turn, None
     
     messages = []
     for msg in history:
         messages.append({"role": msg["role"], "content": msg["content"]})
     
-    messages.append({"role": "user", "content": f"{part_context}\n\nStudent: {user_message}"})
+    messages.append({"role": "user", "content": f"Student: {user_message}"})
     
-    try:
-        response = client.messages.create(
-            model="claude-sonnet-4-20250514",
-            max_tokens=2000,
-            system=SYSTEM_PROMPT,
-            messages=messages
-        )
-        
-        assistant_response = response.content[0].text
-        
-        next_part = None
-        user_answer = user_message.strip().lower().replace(" ", "")
-        correct_answer = part['answer'].lower().replace(" ", "")
-        
-        if correct_answer in user_answer or user_answer == correct_answer:
-            total_parts = len(problem['parts'])
-            if current_part < total_parts:
-                next_part = current_part + 1
-                session[f'problem_{problem_num}_part'] = next_part
-        
-        history.append({"role": "user", "content": user_message})
-        history.append({"role": "assistant", "content": assistant_response})
-        
+    route = router.route(AGENT_NAME, 'question')
+    # The part context rides in the system prompt so it is cached upstream
+    # alongside SYSTEM_PROMPT, shared by every student on this part
+    system = cacheable_system(SYSTEM_PROMPT, part_context, model=route.model)
+    turn['request'] = {
+        'route': route.name,
+        'model': route.model,
+        'max_tokens': 2000,
+        'system': system,
+        'messages': mark_last_message(messages, route.model, system)
+    }
+    return turn, None
+
+def save_progress(turn):
+    """Remember the unlocked part once the answer was graded correct"""
+    if turn['next_part']:
+        session[f"problem_{turn['problem_num']}_part"] = turn['next_part']
+
+def finish_turn(turn, assistant_response):
+    """Extend the client-held history with this exchange"""
+    turn['history'].append({"role": "user", "content": turn['user_message']})
+    turn['history'].append({"role": "assistant", "content": assistant_response})
+
+def chat_reply(turn, assistant_response):
+    """The /chat JSON for a finished turn"""
+    save_progress(turn)
+    finish_turn(turn, assistant_response)
+    return jsonify({
+        "response": assistant_response,
+        "history": turn['history'],
+        "next_part": turn['next_part']
+    })
+
+def chat_error(turn, e):
+    if isinstance(e, GatewayBusy):
         return jsonify({
-            "response": assistant_response,
-            "history": history,
-            "next_part": next_part
-        })
-        
+            "response": str(e),
+            "history": turn['history']
+        }), 503
+    print(f"Error: {e}")
+    return jsonify({
+        "response": "Error occurred. Try again.",
+        "history": turn['history']
+    }), 500
+
+@app.route('/chat', methods=['POST'])
+def chat():
+    turn, error = prepare_turn(request.json)
+    if error:
+        message, status = error
+        return jsonify({"error": message}), status
+    
+    if 'response' in turn:
+        return chat_reply(turn, turn['response'])
+    
+    try:
+        response = gateway.create(AGENT_NAME, **turn['request'])
+        return chat_reply(turn, response.content[0].text)
     except Exception as e:
-        print(f"Error: {e}")
-        return jsonify({
-            "response": "Error occurred. Try again.",
-            "history": history
-        }), 500
+        return chat_error(turn, e)
+
+async def chat_async():
+    """/chat for the ASGI host (async_chat.py): same JSON, but the Claude call is awaited"""
+    turn, error = prepare_turn(request.json)
+    if error:
+        message, status = error
+        return jsonify({"error": message}), status
+    
+    if 'response' in turn:
+        return chat_reply(turn, turn['response'])
+    
+    try:
+        response = await gateway.acreate(AGENT_NAME, **turn['request'])
+        return chat_reply(turn, response.content[0].text)
+    except Exception as e:
+        return chat_error(turn, e)
+
+@app.route('/chat_stream', methods=['POST'])
+def chat_stream():
+    """Same as /chat, but Claude's reply arrives token-by-token over Server-Sent Events"""
+    turn, error = prepare_turn(request.json)
+    if error:
+        message, status = error
+        return jsonify({"error": message}), status
+    
+    # Save progress now - the session cookie goes out with the response headers,
+    # before any tokens are streamed
+    save_progress(turn)
+    
+    def on_complete(text):
+        finish_turn(turn, text)
+        return {"history": turn['history']}
+    
+    if 'response' in turn:
+        return sse_response({"next_part": turn['next_part']}, [turn['response']], on_complete=on_complete)
+    
+    return sse_response({"next_part": turn['next_part']}, gateway.stream(AGENT_NAME, **turn['request']),
+                        on_complete=on_complete, agent=AGENT_NAME)
+
+def allocation_request(data):
+    """(network, requirements, allocation or None) from a /check_allocation body - ValueError says what is wrong"""
+    if not isinstance(data, dict):
+        raise ValueError('Expected a JSON object with "network" and "requirements"')
+    network = data.get('network')
+    if not isinstance(network, str):
+        raise ValueError('network must be a string such as "10.0.0.0/16"')
+    if not isinstance(data.get('requirements'), list) or not data['requirements']:
+        raise ValueError('requirements must be a non-empty list of {"name", "hosts"}')
+    
+    requirements = []
+    for number, req in enumerate(data['requirements'], 1):
+        if not isinstance(req, dict) or not isinstance(req.get('name'), str):
+            raise ValueError(f'requirement {number} needs a "name" string')
+        hosts = req.get('hosts')
+        if isinstance(hosts, str) and hosts.strip().isdigit():
+            hosts = int(hosts)
+        if isinstance(hosts, bool) or not isinstance(hosts, int) or hosts < 1:
+            raise ValueError(f'requirement {number} ({req["name"]}): hosts must be a whole number of at least 1')
+        requirements.append((req['name'], hosts))
+    
+    allocation = data.get('allocation')
+    if allocation is not None and (not isinstance(allocation, list)
+                                   or not all(isinstance(text, str) for text in allocation)):
+        raise ValueError("allocation must be a list of CIDR strings, one per requirement")
+    return network, requirements, allocation
+
+@app.route('/check_allocation', methods=['POST'])
+def check_allocation_route():
+    """Allocate (and optionally grade) any VLSM scenario - no Claude call
+    
+    Takes {"network": "10.0.0.0/16", "requirements": [{"name": "LAN A", "hosts": 100}, ...],
+    "allocation": ["10.0.0.0/25", ...]} - "allocation" (one CIDR per requirement) is optional;
+    "issues" then lists each requirement's problems in the same order.
+    """
+    try:
+        network, requirements, allocation = allocation_request(request.get_json(silent=True))
+        plan = allocate(network, requirements)
+        result = {"plan": [subnet.as_dict() for subnet in plan]}
+        if allocation is not None:
+            result['issues'] = check_allocation(network, requirements, allocation)
+            result['correct'] = not any(result['issues'])
+        return jsonify(result)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+@app.route('/stats')
+def stats():
+    """Latency, call counts and shared LLM gateway gauges for this agent"""
+    snapshot = metrics.snapshot(prefix=AGENT_NAME + '.')
+    snapshot['gateway'] = gateway.stats()
+    snapshot['routing'] = router.stats()
+    return jsonify(snapshot)
 
 if __name__ == '__main__':
     print("=" * 70)
@@ -886,4 +1172,4 @@ if __name__ == '__main__':
     print("Open browser to: http://localhost:5002")
     print("=" * 70)
     
-    app.run(debug=False, host='0.0.0.0', port=5002, use_reloader=False)
+    serve(app, host='0.0.0.0', port=5002, debug=False, use_reloader=False)